@@ -0,0 +1,392 @@
+"""
+图片、字体与音效资源的统一加载入口.
+
+每个 (文件名, 大小, 旋转角度) 的组合只解码、缩放一次，所有调用方共享同一个 Surface.
+游戏启动后可在后台线程中按清单预先加载，主线程用到时直接取用.
+字体按 (文件名, 字号) 共享，音效同样只解码一次，由 sound_bank 统一分发.
+
+调用 open_bundle 后优先从资源包(bundle.Bundle)中取用预先缩放的图片、预先解码的音效与字体，
+资源包中没有的资源仍从 img、sounds、font 文件夹读取.
+"""
+
+import os
+import threading
+from math import cos, radians, sin
+from random import random
+from time import perf_counter
+
+import pygame as pg
+
+from bundle import Bundle
+from config import Grid, Perf
+from typing_lib import *
+from utils import get_path, load_image
+
+ImageKey = tuple[str, Union[None, tuple[int, int]], float]
+
+# 游戏中会用到的图片，菜单显示期间在后台线程中预先加载
+MANIFEST: list[tuple] = [
+    ("background.png", (max(Grid.window_size), max(Grid.window_size))),
+    ("color_hit_icon.png", (300, 300)),
+    ("pin.png", Grid.pin_size),
+    ("pause.png", Grid.pause_size),
+    ("go_on.png", Grid.pause_size),
+    ("heart.png", Grid.heart_size),
+    ("heart.png", Grid.heart_bonus_size, 180),
+    ("balk.png", Grid.balk_size),
+    ("star.png", (40, 40)),
+]
+
+# 游戏中会用到的音效及其音量
+SOUNDS: dict[str, float] = {
+    "button_pressed.wav": 0.4,
+    "shoot.wav": 0.2,
+    "metal_hit.wav": 0.2,
+    "bonus.wav": 0.4,
+    "level_win.wav": 0.4,
+}
+# 游戏中会用到的字体
+FONTS = ("ARIALBOLD.TTF", "ARIALREGULAR.TTF", "TabletGothicBold.OTF")
+# 占用保留声道的音效，不会因声道不足而延迟或被丢弃
+RESERVED_SOUNDS = ("shoot.wav", "metal_hit.wav")
+
+
+class AssetRegistry:
+    """
+    图片资源表，可在多个线程中同时使用.
+    """
+
+    def __init__(self):
+        self.images: dict[ImageKey, Surface] = {}
+        self.fonts: dict[tuple[str, int], pg.font.Font] = {}
+        self.pending: dict[ImageKey, threading.Event] = {}
+        self.lock = threading.Lock()
+        self.timings: dict[ImageKey, tuple[float, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bundle: Union[None, Bundle] = None
+
+    @staticmethod
+    def make_key(
+        img_name: str, img_size: Union[None, Vect2] = None, angle: float = 0
+    ) -> ImageKey:
+        size = (round(img_size[0]), round(img_size[1])) if img_size else None
+        return (img_name, size, angle % 360)
+
+    def load(self, key: ImageKey) -> Surface:
+        """
+        解码并变换图片，记录耗时. 资源包中有该图片时直接取用.
+
+        Args:
+            key (ImageKey): (文件名, 大小, 旋转角度).
+
+        Returns:
+            Surface: 变换后的图片.
+        """
+        start = perf_counter()
+        image = self.bundle.image(key) if self.bundle is not None else None
+        if image is None:
+            img_name, size, angle = key
+            image = load_image(img_name, size)
+            if angle:
+                image = pg.transform.rotozoom(image, angle, 1)
+        self.timings[key] = (perf_counter() - start, threading.current_thread().name)
+        return image
+
+    def image(
+        self, img_name: str, img_size: Union[None, Vect2] = None, angle: float = 0
+    ) -> Surface:
+        """
+        获取图片，相同的参数只加载一次. 若该图片正由另一线程加载，等待其完成后返回同一个 Surface.
+
+        Args:
+            img_name (str): 图片文件名.
+            img_size (Union[None, Vect2], optional): 输出图片的大小. 默认为 None，输出为原始大小.
+            angle (float, optional): 逆时针旋转角度. 默认为 0.
+
+        Returns:
+            Surface: 共享的图片，调用方不应修改.
+        """
+        key = self.make_key(img_name, img_size, angle)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                self.hits += 1
+                return image
+            event = self.pending.get(key)
+            owner = event is None
+            if owner:
+                event = self.pending[key] = threading.Event()
+        if not owner:
+            event.wait()
+            return self.image(img_name, img_size, angle)
+
+        self.misses += 1
+        try:
+            self.images[key] = self.load(key)
+        finally:
+            with self.lock:
+                del self.pending[key]
+            event.set()
+        return self.images[key]
+
+    def font(self, font_name: str, size: int) -> pg.font.Font:
+        """
+        获取字体，相同的 (文件名, 字号) 只打开一次. 字体只应在主线程中使用.
+
+        Args:
+            font_name (str): font 文件夹中的字体文件名.
+            size (int): 字号.
+
+        Returns:
+            pg.font.Font: 共享的字体.
+        """
+        key = (font_name, size)
+        font = self.fonts.get(key)
+        if font is None:
+            file = self.bundle.font(font_name) if self.bundle is not None else None
+            if file is None:
+                file = get_path("font", font_name)
+            font = self.fonts[key] = pg.font.Font(file, size)
+        return font
+
+    def preload(self, manifest: Sequence[tuple] = MANIFEST) -> threading.Thread:
+        """
+        在后台线程中加载清单中的图片.
+
+        Args:
+            manifest (Sequence[tuple], optional): 每项为 image 方法的参数. 默认为 MANIFEST.
+
+        Returns:
+            threading.Thread: 执行加载的后台线程.
+        """
+
+        def run():
+            for args in manifest:
+                self.image(*args)
+
+        thread = threading.Thread(target=run, name="asset-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def report(self) -> list[dict]:
+        """
+        返回各图片的加载耗时，按耗时从大到小排列.
+        在主线程中加载的图片位于关键路径上，会阻塞当前帧.
+
+        Returns:
+            list[dict]: 每项包含 name、size、angle、seconds、thread、critical.
+        """
+        main = threading.main_thread().name
+        rows = [
+            {
+                "name": key[0],
+                "size": key[1],
+                "angle": key[2],
+                "seconds": seconds,
+                "thread": thread,
+                "critical": thread == main,
+            }
+            for key, (seconds, thread) in self.timings.items()
+        ]
+        return sorted(rows, key=lambda row: row["seconds"], reverse=True)
+
+
+registry = AssetRegistry()
+
+
+def get_image(
+    img_name: str, img_size: Union[None, Vect2] = None, angle: float = 0
+) -> Surface:
+    """
+    从 registry 获取共享的图片.
+
+    Args:
+        img_name (str): 要获取的图片的文件名.
+        img_size (Union[None, Vect2], optional): 输出图片的大小. 默认为 None，输出为原始大小.
+        angle (float, optional): 逆时针旋转角度. 默认为 0.
+
+    Returns:
+        Surface: 共享的图片，调用方不应修改.
+    """
+    return registry.image(img_name, img_size, angle)
+
+
+def get_font(font_name: str, size: int) -> pg.font.Font:
+    """
+    从 registry 获取共享的字体.
+    """
+    return registry.font(font_name, size)
+
+
+def get_back() -> tuple[Surface, Rect]:
+    """
+    获取背景图片，并随机地将其旋转一定角度，缩放以填满可视区域.
+
+    Returns:
+        Surface: 背景图片.
+        Rect: 背景图片的矩形区域.
+    """
+    s = max(Grid.window_size[0], Grid.window_size[1])
+    background = get_image("background.png", (s, s))
+    theta = random() * 360
+    scale = random() + abs(cos(radians(theta))) + abs(sin(radians(theta)))
+    back = pg.transform.rotozoom(background, theta, scale)
+    back_rect = back.get_rect(center=Grid.window_size / 2)
+    return back, back_rect
+
+
+def init_mixer():
+    """
+    以较小的缓冲区预设混音器参数，降低音效延迟. 需在 pg.init 之前调用.
+    """
+    pg.mixer.pre_init(Perf.mixer_frequency, -16, 2, Perf.mixer_buffer)
+
+
+class Effect:
+    """
+    共享的音效，可绑定一个保留声道.
+    """
+
+    __slots__ = ("sound", "channel")
+
+    def __init__(self, sound: pg.mixer.Sound, channel: Union[None, pg.mixer.Channel]):
+        self.sound = sound
+        self.channel = channel
+
+    def play(self):
+        if self.channel is None:
+            self.sound.play()
+        else:
+            self.channel.play(self.sound)
+
+
+class SoundBank:
+    """
+    音效表，每个音效文件只解码一次，所有调用方共享同一个 Effect.
+    """
+
+    def __init__(self):
+        self.effects: dict[str, Effect] = {}
+        self.reserved: dict[str, int] = {}
+        self.bundle: Union[None, Bundle] = None
+
+    def reserve(self, names: Sequence[str] = RESERVED_SOUNDS):
+        """
+        为指定的音效各保留一个声道，普通音效不会占用这些声道.
+
+        Args:
+            names (Sequence[str], optional): 音效文件名. 默认为 RESERVED_SOUNDS.
+        """
+        pg.mixer.set_reserved(len(names))
+        self.reserved = {name: i for i, name in enumerate(names)}
+        for name, effect in self.effects.items():
+            if name in self.reserved:
+                effect.channel = pg.mixer.Channel(self.reserved[name])
+
+    def get(self, name: str, volume: Union[None, float] = None) -> Effect:
+        """
+        获取音效，第一次获取时解码. 资源包中有该音效且混音器格式相同时直接取用 PCM 数据.
+
+        Args:
+            name (str): sounds 文件夹中的音效文件名.
+            volume (Union[None, float], optional): 音量，所有共享者使用同一音量. 默认为 None，使用 SOUNDS 中的设置.
+
+        Returns:
+            Effect: 共享的音效.
+        """
+        effect = self.effects.get(name)
+        if effect is None:
+            pcm = self.bundle.sound(name) if self.bundle is not None else None
+            if pcm is None:
+                sound = pg.mixer.Sound(get_path("sounds", name))
+            else:
+                sound = pg.mixer.Sound(buffer=pcm)
+            channel = None
+            if name in self.reserved:
+                channel = pg.mixer.Channel(self.reserved[name])
+            effect = self.effects[name] = Effect(sound, channel)
+            volume = SOUNDS.get(name, 1.0) if volume is None else volume
+        if volume is not None:
+            effect.sound.set_volume(volume)
+        return effect
+
+    def preload(self, sounds: Sequence[str] = tuple(SOUNDS)):
+        """
+        解码清单中的全部音效.
+
+        Args:
+            sounds (Sequence[str], optional): 音效文件名. 默认为 SOUNDS 中的全部音效.
+        """
+        for name in sounds:
+            self.get(name)
+
+
+sound_bank = SoundBank()
+
+
+class Music:
+    """
+    背景音乐. 混音器未初始化或音乐文件不存在时不播放，不影响游戏的其他部分.
+    """
+
+    def __init__(self):
+        self.loaded: Union[None, str] = None
+
+    def load(self, name: str, volume: float):
+        """
+        加载背景音乐，替换之前的音乐.
+
+        Args:
+            name (str): sounds 文件夹中的音乐文件名.
+            volume (float): 音量.
+        """
+        self.loaded = None
+        if not pg.mixer.get_init():
+            return
+        path = get_path("sounds", name)
+        if not os.path.isfile(path):
+            pg.mixer.music.unload()
+            return
+        pg.mixer.music.load(path)
+        pg.mixer.music.set_volume(volume)
+        self.loaded = name
+
+    def play(self, loops: int = -1):
+        """
+        从头播放已加载的背景音乐，没有加载时什么都不做.
+
+        Args:
+            loops (int, optional): 重复次数. 默认为 -1，即无限循环.
+        """
+        if self.loaded is not None:
+            pg.mixer.music.play(loops=loops)
+
+
+music = Music()
+
+
+def open_bundle(path: str = Perf.asset_bundle) -> Union[None, Bundle]:
+    """
+    打开资源包，之后 registry 与 sound_bank 优先从中取用资源. 需在混音器初始化之后、加载资源之前调用.
+
+    Args:
+        path (str, optional): 资源包文件. 默认为 Perf.asset_bundle.
+
+    Returns:
+        Union[None, Bundle]: 资源包，文件不存在或版本不符时为 None，此时仍读取原始文件.
+    """
+    path = get_path(path)
+    if not os.path.exists(path):
+        return None
+    try:
+        bundle = Bundle(path)
+    except (OSError, ValueError):
+        return None
+    registry.bundle = sound_bank.bundle = bundle
+    return bundle
@@ -0,0 +1,283 @@
+"""
+大批量生成 level 与自动对局，统计关卡生成器的分布.
+
+用于调整 Setting.pin_num、utils.ordered_colors 中的概率与 DiscState.get_num_of_balks 中的上限，
+不再需要靠手动游戏判断难度. 工作分成固定大小的任务交给 multiprocessing 进程池，每个任务的种子由总种子与
+任务编号派生，结果与进程数、任务完成的顺序无关; 各进程只返回直方图与耗时数组，汇总的开销很小.
+
+在游戏根目录(img、font、sounds 所在的目录)下运行:
+
+    python src/batch.py --count 100000              # level 1 ~ 8 各生成 100000 个
+    python src/batch.py --plays 2000 --pin-num 12   # 另外进行 2000 局自动对局
+    python src/batch.py --json levels.json          # 同时保存完整的直方图
+
+统计的项目: 扇形(颜色)数、飞镖数、障碍物数、道具数、旋转速度、抽取随机数的次数与生成耗时.
+原先的拒绝采样循环已由 sampler 中有界的抽样取代，抽取随机数的次数即对应原来的循环迭代次数.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import argparse
+import json
+import multiprocessing
+import sys
+from collections import Counter
+from random import Random
+from time import perf_counter
+
+import numpy as np
+
+from config import Setting
+from sim import Level, run, shoot_when_ready
+from typing_lib import *
+
+# 每个 level 统计的整数项目
+LEVEL_METRICS = ("pies", "pins", "balks", "bonus", "speed", "draws")
+# 每局自动对局统计的整数项目
+PLAY_METRICS = ("level", "score", "steps")
+
+# 一个任务: (种类, 种子, level, 数量)，自动对局的 level 为 0
+Task = tuple[str, int, int, int]
+
+
+class CountingRandom(Random):
+    """
+    记录抽取次数的随机数生成器. randint、sample、shuffle 等最终都调用 random 或 getrandbits.
+    """
+
+    def __init__(self, seed: object):
+        super().__init__(seed)
+        self.draws = 0
+
+    def random(self) -> float:
+        self.draws += 1
+        return super().random()
+
+    def getrandbits(self, k: int) -> int:
+        self.draws += 1
+        return super().getrandbits(k)
+
+
+def init_worker(pin_num: int):
+    Setting.pin_num = pin_num
+
+
+def generate_levels(seed: int, number: int, count: int) -> dict:
+    """
+    以同一个随机数生成器连续生成 count 个 level.
+
+    Returns:
+        dict: 各项目的直方图(Counter)，以及 time 为每个 level 的生成耗时(s)数组.
+    """
+    rng = CountingRandom(seed)
+    hists = {name: Counter() for name in LEVEL_METRICS}
+    times = np.empty(count)
+    for i in range(count):
+        rng.draws = 0
+        start = perf_counter()
+        level = Level(number, rng)
+        times[i] = perf_counter() - start
+        items = level.disc.items
+        hists["pies"][len(level.disc.diff_colors)] += 1
+        hists["pins"][len(level.colors)] += 1
+        hists["balks"][sum(item.kind == "balk" for item in items)] += 1
+        hists["bonus"][sum(item.kind in ("heart", "star") for item in items)] += 1
+        hists["speed"][level.setting.rotation_speed] += 1
+        hists["draws"][rng.draws] += 1
+    return {**hists, "time": times}
+
+
+def play_games(seed: int, count: int, max_steps: int = 200000) -> dict:
+    """
+    以最简单的策略(飞镖静止时立即发射)进行 count 局游戏，直到游戏结束.
+
+    Returns:
+        dict: 到达的 level、得分与步数的直方图，以及 time 为每局的耗时(s)数组.
+    """
+    hists = {name: Counter() for name in PLAY_METRICS}
+    times = np.empty(count)
+    rng = Random(seed)
+    for i in range(count):
+        start = perf_counter()
+        sim = run(
+            shoot_when_ready,
+            levels=10**9,
+            max_steps=max_steps,
+            seed=rng.getrandbits(64),
+        )
+        times[i] = perf_counter() - start
+        hists["level"][sim.level] += 1
+        hists["score"][sim.score] += 1
+        hists["steps"][sim.steps] += 1
+    return {**hists, "time": times}
+
+
+def work(task: Task) -> tuple[Task, dict]:
+    kind, seed, number, count = task
+    if kind == "levels":
+        return task, generate_levels(seed, number, count)
+    return task, play_games(seed, count)
+
+
+def make_tasks(
+    seed: int, max_level: int, count: int, plays: int, chunk: int
+) -> list[Task]:
+    """
+    将工作分成固定大小的任务，任务的种子由总种子与任务编号派生.
+    """
+    tasks = []
+    for number in range(1, max_level + 1):
+        for start in range(0, count, chunk):
+            tasks.append(("levels", 0, number, min(chunk, count - start)))
+    # 一局的耗时约为生成一个 level 的数百倍
+    play_chunk = max(chunk // 200, 1)
+    for start in range(0, plays, play_chunk):
+        tasks.append(("plays", 0, 0, min(play_chunk, plays - start)))
+    return [
+        (kind, Random(f"{seed}:{i}").getrandbits(64), number, n)
+        for i, (kind, _, number, n) in enumerate(tasks)
+    ]
+
+
+def merge(total: dict, part: dict):
+    for name, value in part.items():
+        if name == "time":
+            total.setdefault(name, []).append(value)
+        else:
+            total.setdefault(name, Counter()).update(value)
+
+
+def describe(hist: Counter) -> tuple[float, int, int]:
+    """
+    Returns:
+        tuple[float, int, int]: 直方图的平均值、最小值与最大值.
+    """
+    n = sum(hist.values())
+    return sum(k * v for k, v in hist.items()) / n, min(hist), max(hist)
+
+
+def distribution(hist: Counter) -> str:
+    n = sum(hist.values())
+    return "  ".join(f"{k}:{v / n:.1%}" for k, v in sorted(hist.items()))
+
+
+def report(levels: dict[int, dict], plays: dict):
+    """
+    打印汇总的统计结果.
+
+    Args:
+        levels (dict[int, dict]): level 数 -> 合并后的统计.
+        plays (dict): 合并后的自动对局统计，没有进行对局时为空.
+    """
+    print(
+        f"{'level':<7}{'n':>9}"
+        + "".join(f"{name:>9}" for name in LEVEL_METRICS)
+        + f"{'p50 us':>9}{'p99 us':>9}{'max us':>9}"
+    )
+    for number, stats in sorted(levels.items()):
+        times = np.concatenate(stats["time"]) * 1e6
+        p50, p99 = np.percentile(times, (50, 99))
+        means = "".join(f"{describe(stats[name])[0]:>9.2f}" for name in LEVEL_METRICS)
+        print(
+            f"{number:<7}{len(times):>9}{means}{p50:>9.1f}{p99:>9.1f}{times.max():>9.1f}"
+        )
+
+    for name in ("pies", "pins", "balks", "bonus"):
+        print(f"\n{name}")
+        for number, stats in sorted(levels.items()):
+            print(f"  {number:<5}{distribution(stats[name])}")
+    print("\ndraws (min / max)")
+    for number, stats in sorted(levels.items()):
+        _, low, high = describe(stats["draws"])
+        print(f"  {number:<5}{low} / {high}")
+
+    if plays:
+        times = np.concatenate(plays["time"])
+        print(f"\n{len(times)} plays, {times.mean() * 1e3:.1f} ms per play")
+        for name in PLAY_METRICS:
+            mean, low, high = describe(plays[name])
+            print(f"  {name:<7}mean {mean:.1f}  min {low}  max {high}")
+        print(f"  level  {distribution(plays['level'])}")
+
+
+def to_json(levels: dict[int, dict], plays: dict) -> dict:
+    def convert(stats: dict) -> dict:
+        result = {
+            name: {str(k): v for k, v in sorted(hist.items())}
+            for name, hist in stats.items()
+            if name != "time"
+        }
+        times = np.concatenate(stats["time"])
+        result["time_us"] = dict(
+            zip(
+                ("p50", "p90", "p99", "max"),
+                np.percentile(times * 1e6, (50, 90, 99, 100)),
+            )
+        )
+        return result
+
+    return {
+        "levels": {str(number): convert(stats) for number, stats in levels.items()},
+        "plays": convert(plays) if plays else None,
+    }
+
+
+def main(argv: Union[None, Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量生成 level 并统计其分布")
+    parser.add_argument(
+        "--count", type=int, default=10000, help="每个 level 生成的数量，默认 10000"
+    )
+    parser.add_argument(
+        "--max-level", type=int, default=8, help="统计 level 1 至该值，默认 8"
+    )
+    parser.add_argument("--plays", type=int, default=0, help="自动对局的局数，默认 0")
+    parser.add_argument(
+        "--pin-num",
+        type=int,
+        default=Setting.pin_num,
+        help=f"飞镖总数上限，默认为 Setting.pin_num ({Setting.pin_num})",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="总种子，默认 0")
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(), help="进程数，默认为 CPU 核数"
+    )
+    parser.add_argument(
+        "--chunk", type=int, default=2000, help="每个任务生成的 level 数，默认 2000"
+    )
+    parser.add_argument("--json", metavar="PATH", help="将完整的直方图保存为 JSON")
+    args = parser.parse_args(argv)
+
+    tasks = make_tasks(args.seed, args.max_level, args.count, args.plays, args.chunk)
+    levels: dict[int, dict] = {}
+    plays: dict = {}
+    start = perf_counter()
+    if args.plays:
+        from collision import get_shapes
+
+        get_shapes()  # 在创建进程池之前提取形状，fork 出的进程直接共享
+    with multiprocessing.Pool(
+        args.workers, initializer=init_worker, initargs=(args.pin_num,)
+    ) as pool:
+        for (kind, _, number, _), part in pool.imap_unordered(work, tasks):
+            merge(levels.setdefault(number, {}) if kind == "levels" else plays, part)
+    elapsed = perf_counter() - start
+
+    report(levels, plays)
+    generated = args.count * args.max_level
+    print(
+        f"\n{generated} levels and {args.plays} plays in {elapsed:.2f} s "
+        f"with {args.workers} workers"
+        + ("" if args.plays else f" ({generated / elapsed:.0f} levels/s)")
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(to_json(levels, plays), f, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
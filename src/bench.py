@@ -0,0 +1,414 @@
+"""
+热点路径的性能基准.
+
+在无窗口、无声卡的环境下运行(SDL_VIDEODRIVER=dummy、SDL_AUDIODRIVER=dummy)，
+需在游戏根目录(img、font、sounds 所在的目录)下执行:
+
+    python src/bench.py --save bench.json        # 运行并保存为基准
+    python src/bench.py --compare bench.json     # 与基准比较，变慢超过阈值时返回非零退出码
+    python src/bench.py -k disc                  # 只运行名称中包含 disc 的项目
+
+每个项目以 timeit 自动确定单次计时的调用次数(不少于 0.05 s)，重复若干次，记录每次调用耗时的中位数与最小值.
+比较时以中位数为准.
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+
+import pygame as pg
+
+from assets import (
+    FONTS,
+    MANIFEST,
+    AssetRegistry,
+    SoundBank,
+    get_back,
+    get_image,
+    init_mixer,
+    registry,
+    sound_bank,
+)
+from bundle import Bundle, bake
+from collision import collide, get_shapes
+from config import FPS, PRICK, SHOOT, Color, Grid
+from render import Renderer
+from sim import DiscState, PinState, PropState, RandomStreams
+from typing_lib import *
+from utils import rotate
+from views import GameOverView, GameView
+from widgets import Button, Disc, Pie
+
+# 名称 -> 准备函数，准备函数返回被计时的无参函数
+CASES: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    """
+    注册一个基准项目.
+    """
+
+    def register(setup: Callable[[], Callable[[], object]]):
+        CASES[name] = setup
+        return setup
+
+    return register
+
+
+def init_display() -> Surface:
+    init_mixer()
+    pg.init()
+    screen = pg.display.set_mode(Grid.window_size)
+    sound_bank.reserve()
+    sound_bank.preload()
+    Pie.load_textures()
+    return screen
+
+
+def make_disc_state(balks: int, pins: int) -> DiscState:
+    """
+    生成指定障碍物与飞镖数量的圆盘，物体沿圆周均匀分布.
+    """
+    random.seed(0)
+    state = DiscState(list(Color.pin_colors), 1)
+    pies = [item for item in state.items if item.kind == "pie"]
+    state.items = [PropState("balk", i * 360 / balks) for i in range(balks)] + pies
+    for i in range(pins):
+        pin = PinState(Color.pin_colors[i % 4])
+        pin.mode = PRICK
+        pin.angle = (i + 0.5) * 360 / pins
+        state.items.append(pin)
+    return state
+
+
+@case("rotate")
+def bench_rotate():
+    image = get_image("balk.png", Grid.balk_size)
+    relative_pos = (Grid.balk_size[0] / 2, Grid.balk_size[1] / 2 + Grid.balk_radius)
+    angles = iter(range(10**9))
+
+    def run():
+        rotate(image, next(angles) * 0.37, Grid.center, relative_pos)
+
+    return run
+
+
+def disc_update_case(balks: int, pins: int):
+    def setup():
+        state = make_disc_state(balks, pins)
+        disc = Disc(pg.display.get_surface(), state)
+        # 先转满一圈，使旋转缓存中已有各物体在所有角度上的结果，计时只包含稳定状态下的更新
+        for _ in range(round(360 / 0.8)):
+            state.rotate(0.8)
+            disc.update()
+
+        def run():
+            state.rotate(0.8)
+            disc.update()
+
+        return run
+
+    return setup
+
+
+for balks, pins in ((0, 0), (4, 4), (8, 8), (8, 20)):
+    case(f"disc_update[balks={balks},pins={pins}]")(disc_update_case(balks, pins))
+
+
+@case("check_hit")
+def bench_check_hit():
+    state = make_disc_state(8, 8)
+    shapes = get_shapes()
+    pin = PinState(Color.red)
+    pin.mode = SHOOT
+    start = pin.top
+    tops = range(start, int(Grid.center[1]), -30)  # 一次飞行中逐帧的位置
+    positions = iter(range(10**9))
+
+    def run():
+        pin.top = tops[next(positions) % len(tops)]
+        collide(pin, state, shapes)
+
+    return run
+
+
+@case("level_build")
+def bench_level_build():
+    random.seed(0)
+    view = GameView(pg.display.get_surface())
+    sim = view.sim
+    builds = iter(range(10**9))
+
+    def run():
+        # 以固定的种子轮流生成 level 1 ~ 8，保证各次运行生成相同的圆盘
+        i = next(builds) % 8
+        sim.rng = RandomStreams(i)
+        sim.level = 1 + i
+        sim.init_level()
+        view.init_level()
+        view.disc.update()  # 包含第一次合成圆盘图片
+
+    return run
+
+
+def asset_load_case(use_bundle: bool):
+    def setup():
+        bundle = None
+        if use_bundle:
+            path = os.path.join(tempfile.mkdtemp(), "assets.bundle")
+            bake(path)
+            bundle = Bundle(path)
+
+        def run():
+            # 新的资源表，每次都从资源包或原始文件重新加载全部图片、字体与音效
+            images, sounds = AssetRegistry(), SoundBank()
+            images.bundle = sounds.bundle = bundle
+            for args in MANIFEST:
+                images.image(*args)
+            for name in FONTS:
+                images.font(name, 16)
+            sounds.preload()
+
+        return run
+
+    return setup
+
+
+case("asset_load[files]")(asset_load_case(False))
+case("asset_load[bundle]")(asset_load_case(True))
+
+
+@case("button")
+def bench_button():
+    screen = pg.display.get_surface()
+
+    def run():
+        Button(screen, Grid.start_pos, Grid.start_size, "PLAY")
+
+    return run
+
+
+@case("get_back")
+def bench_get_back():
+    random.seed(0)
+    get_back()
+    return get_back
+
+
+@case("update_frame")
+def bench_update_frame():
+    import color_hit
+
+    class Clock:
+        """
+        固定步长的时钟，去掉帧率限制的等待，使每次运行推进相同的游戏时间.
+        """
+
+        def tick(self, fps: int) -> int:
+            return 1000 // FPS
+
+        def get_fps(self) -> float:
+            return float(FPS)
+
+    random.seed(0)
+    game = color_hit.Game()
+    game.clock = Clock()
+    game.init_game()
+    shoot = pg.event.Event(pg.KEYDOWN, key=pg.K_SPACE, mod=0, unicode=" ")
+    frames = iter(range(10**9))
+
+    def run():
+        if type(game.view) is GameOverView:
+            game.init_game()  # 游戏结束时直接重新开始
+        if next(frames) % 15 == 0:
+            pg.event.post(shoot)
+        game.update_frame()
+
+    return run
+
+
+class Replay:
+    """
+    回放录制的一个控件的绘制命令. 同一控件在各帧中对应同一个 Replay，Renderer 以此比较前后两帧.
+    """
+
+    def __init__(self):
+        self.current: list[Blit] = []
+
+    def commands(self) -> list[Blit]:
+        return self.current
+
+
+def record_frames(screen: Surface, count: int) -> list[list[tuple[Replay, list[Blit]]]]:
+    """
+    以固定的种子进行一局游戏，每 15 帧发射一次飞镖，录制每帧各控件的绘制命令.
+
+    Returns:
+        list[list[tuple[Replay, list[Blit]]]]: 每帧按绘制顺序排列的 (控件, 绘制命令).
+    """
+    random.seed(0)
+    view = GameView(screen, seed=0, record=False)
+    shoot = pg.event.Event(pg.KEYDOWN, key=pg.K_SPACE, mod=0, unicode=" ")
+    replays: dict[object, Replay] = {}
+    frames = []
+    for i in range(count):
+        if i % 15 == 0:
+            view.on_keydown(shoot)
+        view.update(1 / FPS)
+        frame = []
+        for widget in view.get_widgets():
+            commands = [(image, rect.copy()) for image, rect in widget.commands()]
+            frame.append((replays.setdefault(widget, Replay()), commands))
+        frames.append(frame)
+    return frames
+
+
+def render_case(dirty: bool):
+    def setup():
+        # 两种方式回放同样的帧: 录制 4 s 的游戏，逐帧交给 Renderer
+        screen = pg.display.get_surface()
+        frames = record_frames(screen, 4 * FPS)
+        renderer = Renderer(screen, dirty=dirty)
+        random.seed(0)
+        renderer.set_background(*get_back())
+        indices = iter(range(10**9))
+
+        def run():
+            frame = frames[next(indices) % len(frames)]
+            for replay, commands in frame:
+                replay.current = commands
+            renderer.render([replay for replay, _ in frame])
+
+        return run
+
+    return setup
+
+
+case("render[full]")(render_case(False))
+case("render[dirty]")(render_case(True))
+
+
+def measure(func: Callable[[], object], repeat: int) -> dict:
+    """
+    测量一个函数每次调用的耗时.
+
+    Args:
+        func (Callable[[], object]): 被计时的函数.
+        repeat (int): 重复计时的次数.
+
+    Returns:
+        dict: median_us、min_us 为每次调用耗时的中位数与最小值，μs; number 为每次计时的调用次数.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, number // 4)  # autorange 以 0.2 s 为目标，这里每次计时约 0.05 s
+    times = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+    return {
+        "median_us": statistics.median(times),
+        "min_us": min(times),
+        "number": number,
+    }
+
+
+def run_cases(pattern: str = "", repeat: int = 7) -> dict[str, dict]:
+    """
+    运行名称中包含 pattern 的基准项目.
+
+    Args:
+        pattern (str, optional): 名称过滤. 默认为 "", 运行全部项目.
+        repeat (int, optional): 重复计时的次数. 默认为 7.
+
+    Returns:
+        dict[str, dict]: 项目名 -> 测量结果.
+    """
+    results = {}
+    for name, setup in CASES.items():
+        if pattern not in name:
+            continue
+        results[name] = result = measure(setup(), repeat)
+        print(
+            f"{name:<36}{result['median_us']:>12.1f} us  (min {result['min_us']:.1f})"
+        )
+    return results
+
+
+def compare(
+    baseline: dict[str, dict], results: dict[str, dict], threshold: float
+) -> list[str]:
+    """
+    将测量结果与基准比较.
+
+    Args:
+        baseline (dict[str, dict]): 基准.
+        results (dict[str, dict]): 本次的测量结果.
+        threshold (float): 允许变慢的比例，如 0.1 表示 10%.
+
+    Returns:
+        list[str]: 变慢超过阈值的项目.
+    """
+    regressions = []
+    print(f"\n{'case':<36}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<36}{'-':>12}{result['median_us']:>12.1f}{'new':>9}")
+            continue
+        old, new = baseline[name]["median_us"], result["median_us"]
+        change = new / old - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36}{old:>12.1f}{new:>12.1f}{change:>+9.1%}{flag}")
+    return regressions
+
+
+def main(argv: Union[None, Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Color Hit 热点路径的性能基准")
+    parser.add_argument("--save", metavar="PATH", help="将结果保存为 JSON 基准")
+    parser.add_argument("--compare", metavar="PATH", help="与 JSON 基准比较")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1, help="允许变慢的比例，默认 0.1"
+    )
+    parser.add_argument("-k", default="", help="只运行名称中包含该字符串的项目")
+    parser.add_argument("--repeat", type=int, default=7, help="重复计时的次数，默认 7")
+    args = parser.parse_args(argv)
+
+    init_display()
+    registry.preload().join()
+    results = run_cases(args.k, args.repeat)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "pygame": pg.version.ver,
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+打包的资源文件.
+
+游戏用到的图片按实际使用的大小与角度预先缩放、旋转，音效预先解码为混音器格式的 PCM，
+与字体文件一起写入一个带索引的文件. 游戏启动时以 mmap 映射该文件，图片直接包装为 Surface，
+音效直接交给混音器，不再解码 PNG、WAV，也不再缩放.
+
+在游戏根目录(img、font、sounds 所在的目录)下生成:
+
+    python src/bundle.py                  # 写入 assets.bundle
+    python src/bundle.py -o other.bundle
+
+文件格式: MAGIC、版本号与索引长度(小端 uint32)、JSON 索引，之后是各项数据，每项按 16 字节对齐.
+图片为 RGBA 像素，音效为 (频率, 格式, 声道数) 对应的原始 PCM，字体为原始文件内容.
+索引中记录了生成时各原始文件的大小、修改时间与 SHA-1，打开时与现有的原始文件比较，
+原始文件已被修改的资源不从资源包中取用，仍读取原始文件.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+from time import perf_counter
+
+import pygame as pg
+
+from typing_lib import *
+from utils import get_path
+
+MAGIC = b"CHBUNDLE"
+VERSION = 2
+HEADER = struct.Struct("<8sII")  # MAGIC, 版本号, 索引长度
+ALIGN = 16
+
+ImageKey = tuple[str, Union[None, tuple[int, int]], float]
+# 原始文件的 (大小, 修改时间 ns, SHA-1)，以 "文件夹/文件名" 为键
+Stamp = tuple[int, int, str]
+
+
+def stamp(source: str) -> Stamp:
+    """
+    记录原始文件的大小、修改时间与内容的 SHA-1.
+
+    Args:
+        source (str): "文件夹/文件名"，如 "img/pin.png".
+
+    Returns:
+        Stamp: (大小, 修改时间 ns, SHA-1).
+    """
+    path = get_path(*source.split("/"))
+    st = os.stat(path)
+    with open(path, "rb") as f:
+        sha1 = hashlib.sha1(f.read()).hexdigest()
+    return st.st_size, st.st_mtime_ns, sha1
+
+
+def is_fresh(source: str, recorded: Stamp) -> bool:
+    """
+    判断原始文件自生成资源包以来是否未被修改. 大小与修改时间都相同时不读取文件;
+    只有修改时间不同(如复制、解压后)时才比较内容的 SHA-1.
+
+    Args:
+        source (str): "文件夹/文件名".
+        recorded (Stamp): 生成资源包时记录的 (大小, 修改时间 ns, SHA-1).
+
+    Returns:
+        bool: 原始文件不存在时为 True，此时只能使用资源包.
+    """
+    size, mtime, sha1 = recorded
+    try:
+        st = os.stat(get_path(*source.split("/")))
+        if st.st_size != size:
+            return False
+        if st.st_mtime_ns == mtime:
+            return True
+        return stamp(source)[2] == sha1
+    except OSError:
+        return True
+
+
+class Bundle:
+    """
+    以 mmap 映射的资源包，只读，可在多个线程中同时使用.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): 资源包文件.
+
+        Raises:
+            ValueError: 文件不是当前版本的资源包.
+        """
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is not an asset bundle")
+        magic, version, index_size = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} asset bundle")
+        index = json.loads(self.data[HEADER.size : HEADER.size + index_size])
+        self.view = memoryview(self.data)
+        self.images: dict[ImageKey, tuple[int, tuple[int, int]]] = {
+            (name, tuple(size) if size else None, angle): (offset, tuple(dims))
+            for name, size, angle, offset, dims in index["images"]
+        }
+        self.mixer = tuple(index["mixer"])
+        self.sounds: dict[str, tuple[int, int]] = {
+            name: tuple(entry) for name, entry in index["sounds"].items()
+        }
+        self.fonts: dict[str, tuple[int, int]] = {
+            name: tuple(entry) for name, entry in index["fonts"].items()
+        }
+        # 生成资源包之后被修改过的原始文件，其资源改为读取原始文件
+        self.stale: set[str] = {
+            source
+            for source, recorded in index["sources"].items()
+            if not is_fresh(source, tuple(recorded))
+        }
+
+    def image(self, key: ImageKey) -> Union[None, Surface]:
+        """
+        获取图片. 有窗口时转换为窗口的像素格式，否则直接引用映射的内存.
+
+        Args:
+            key (ImageKey): (文件名, 大小, 旋转角度)，与 assets.AssetRegistry.make_key 相同.
+
+        Returns:
+            Union[None, Surface]: 图片，不在资源包中或原始文件已被修改时为 None.
+        """
+        entry = self.images.get(key)
+        if entry is None or "img/" + key[0] in self.stale:
+            return None
+        offset, (w, h) = entry
+        image = pg.image.frombuffer(
+            self.view[offset : offset + 4 * w * h], (w, h), "RGBA"
+        )
+        if pg.display.get_surface() is not None:
+            image = image.convert_alpha()
+        return image
+
+    def sound(self, name: str) -> Union[None, memoryview]:
+        """
+        获取音效的 PCM 数据，可作为 pg.mixer.Sound 的 buffer 参数.
+
+        Args:
+            name (str): sounds 文件夹中的音效文件名.
+
+        Returns:
+            Union[None, memoryview]: PCM 数据，不在资源包中、原始文件已被修改或混音器格式与生成时不同时为 None.
+        """
+        entry = self.sounds.get(name)
+        if entry is None or "sounds/" + name in self.stale:
+            return None
+        if pg.mixer.get_init() != self.mixer:
+            return None
+        offset, length = entry
+        return self.view[offset : offset + length]
+
+    def font(self, name: str) -> Union[None, io.BytesIO]:
+        """
+        获取字体文件，每次调用返回新的文件对象，可作为 pg.font.Font 的参数.
+
+        Args:
+            name (str): font 文件夹中的字体文件名.
+
+        Returns:
+            Union[None, io.BytesIO]: 字体文件，不在资源包中或原始文件已被修改时为 None.
+        """
+        entry = self.fonts.get(name)
+        if entry is None or "font/" + name in self.stale:
+            return None
+        offset, length = entry
+        return io.BytesIO(self.data[offset : offset + length])
+
+
+def write_bundle(
+    path: str,
+    images: dict[ImageKey, Surface],
+    sounds: dict[str, bytes],
+    mixer: tuple[int, int, int],
+    fonts: dict[str, bytes],
+    sources: dict[str, Stamp],
+):
+    """
+    写入资源包. 先写入临时文件再替换，游戏运行中重新生成也不会读到不完整的文件.
+
+    Args:
+        path (str): 输出文件.
+        images (dict[ImageKey, Surface]): 图片.
+        sounds (dict[str, bytes]): 音效的 PCM 数据.
+        mixer (tuple[int, int, int]): PCM 数据的 (频率, 格式, 声道数).
+        fonts (dict[str, bytes]): 字体文件内容.
+        sources (dict[str, Stamp]): 各原始文件的 (大小, 修改时间 ns, SHA-1)，以 "文件夹/文件名" 为键.
+    """
+    entries: list[tuple[str, object, bytes]] = []
+    for key, image in images.items():
+        entries.append(("image", key, pg.image.tobytes(image, "RGBA")))
+    for name, pcm in sounds.items():
+        entries.append(("sound", name, pcm))
+    for name, content in fonts.items():
+        entries.append(("font", name, content))
+
+    # 索引中的偏移量依赖于索引本身的长度，先以占位的偏移量估计长度，再据此计算
+    def layout(start: int) -> tuple[dict, int]:
+        index = {
+            "images": [],
+            "mixer": list(mixer),
+            "sounds": {},
+            "fonts": {},
+            "sources": {source: list(s) for source, s in sources.items()},
+        }
+        offset = start
+        for kind, key, blob in entries:
+            offset = -(-offset // ALIGN) * ALIGN
+            if kind == "image":
+                name, size, angle = key
+                dims = images[key].get_size()
+                index["images"].append([name, size, angle, offset, dims])
+            else:
+                index[kind + "s"][key] = [offset, len(blob)]
+            offset += len(blob)
+        return index, offset
+
+    start = 0
+    while True:
+        index, _ = layout(start)
+        raw = json.dumps(index, separators=(",", ":")).encode()
+        needed = -(-(HEADER.size + len(raw)) // ALIGN) * ALIGN
+        if needed == start:
+            break
+        start = needed
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(raw)))
+        f.write(raw)
+        for _, _, blob in entries:
+            f.write(b"\0" * (-f.tell() % ALIGN))
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def bake(path: str) -> dict[str, int]:
+    """
+    从 img、sounds、font 文件夹读取 assets 中清单列出的资源，生成资源包.
+    需在游戏根目录下调用; 图片与游戏中一样经过窗口像素格式的转换后再缩放.
+
+    Args:
+        path (str): 输出文件.
+
+    Returns:
+        dict[str, int]: 各类资源的数据量，字节.
+    """
+    from assets import FONTS, MANIFEST, SOUNDS, AssetRegistry, init_mixer
+
+    init_mixer()
+    pg.init()
+    if pg.display.get_surface() is None:
+        pg.display.set_mode((1, 1))
+    # 先记录原始文件再读取，读取期间被修改的文件在打开资源包时会被视为已修改
+    sources = [f"img/{name}" for name, *_ in MANIFEST]
+    sources += [f"sounds/{name}" for name in SOUNDS]
+    sources += [f"font/{name}" for name in FONTS]
+    stamps = {source: stamp(source) for source in sources}
+    registry = AssetRegistry()  # 不使用资源包，从原始文件生成
+    images = {}
+    for args in MANIFEST:
+        key = registry.make_key(*args)
+        images[key] = registry.load(key)
+    sounds = {
+        name: pg.mixer.Sound(get_path("sounds", name)).get_raw() for name in SOUNDS
+    }
+    fonts = {}
+    for name in FONTS:
+        with open(get_path("font", name), "rb") as f:
+            fonts[name] = f.read()
+    write_bundle(path, images, sounds, pg.mixer.get_init(), fonts, stamps)
+    return {
+        "images": sum(4 * w * h for w, h in (i.get_size() for i in images.values())),
+        "sounds": sum(len(pcm) for pcm in sounds.values()),
+        "fonts": sum(len(content) for content in fonts.values()),
+    }
+
+
+def main(argv: Union[None, Sequence[str]] = None) -> int:
+    from config import Perf
+
+    # 生成时不需要真实的窗口与声卡
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    parser = argparse.ArgumentParser(description="生成 Color Hit 的资源包")
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=Perf.asset_bundle,
+        help="输出文件，默认为 Perf.asset_bundle",
+    )
+    args = parser.parse_args(argv)
+    start = perf_counter()
+    sizes = bake(args.output)
+    for kind, size in sizes.items():
+        print(f"{kind:<8}{size / 1024:>10.1f} KiB")
+    print(f"wrote {args.output} in {perf_counter() - start:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+缓存相关的工具类.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from math import pi
+
+import pygame as pg
+
+from config import Perf
+from typing_lib import *
+
+
+def surface_bytes(surface: Surface) -> int:
+    """
+    估算 Surface 像素数据占用的内存.
+
+    Args:
+        surface (Surface)
+
+    Returns:
+        int: 占用的字节数.
+    """
+    return surface.get_pitch() * surface.get_height()
+
+
+class SurfaceCache:
+    """
+    进程内共享的 Surface 缓存，相同的键只生成一次. 调用方不应修改取得的 Surface.
+    """
+
+    def __init__(self):
+        self.entries: dict[Hashable, Surface] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, factory: Callable[[], Surface]) -> Surface:
+        """
+        获取键对应的 Surface，不存在时调用 factory 生成.
+
+        Args:
+            key (Hashable): 缓存的键.
+            factory (Callable[[], Surface]): 生成 Surface 的函数.
+
+        Returns:
+            Surface: 共享的 Surface.
+        """
+        surface = self.entries.get(key)
+        if surface is None:
+            self.misses += 1
+            surface = self.entries[key] = factory()
+        else:
+            self.hits += 1
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self) -> dict:
+        """
+        返回缓存的命中统计.
+
+        Returns:
+            dict: 命中、未命中次数，缓存项数及占用的字节数.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "bytes": sum(surface_bytes(s) for s in self.entries.values()),
+        }
+
+
+# 缓存的旋转结果: (裁剪后的图片, 左上角相对于旋转中心的位置)
+Rotated = tuple[Surface, tuple[int, int]]
+
+
+def rotate_cropped(img: Surface, angle: float) -> tuple[Surface, tuple[int, int]]:
+    """
+    旋转图片，并裁去四周完全透明的部分.
+
+    Args:
+        img (Surface): 原图.
+        angle (float): 顺时针旋转的角度.
+
+    Returns:
+        Surface: 裁剪后的旋转结果.
+        tuple[int, int]: 裁剪结果左上角相对于完整旋转结果中心的位置，中心按 Rect.center 的方式取整.
+    """
+    rotated = pg.transform.rotozoom(img, -angle, 1)
+    w, h = rotated.get_size()
+    area = rotated.get_bounding_rect()
+    if area.size != (w, h):
+        rotated = rotated.subsurface(area).copy()
+    return rotated, (area.x - w // 2, area.y - h // 2)
+
+
+class RotationCache:
+    """
+    按量化角度缓存旋转后的图片，按字节上限进行 LRU 淘汰.
+
+    以 (原图, 量化后的角度) 为键，同一张原图在同一量化角度下只调用一次 rotozoom，旋转结果裁去透明的边缘后保存.
+    一张原图所有量化角度的旋转结果若超过上限的 share，缓存会被它与其他原图互相挤出，这样的原图交给 fallback
+    (步长更大、上限独立的另一级缓存)，没有 fallback 时直接旋转.
+
+    原图被回收时会自动清除其对应的缓存. 可在多个线程中同时使用，rotozoom 在锁外执行.
+    """
+
+    def __init__(
+        self,
+        step: float,
+        max_bytes: int,
+        share: float = 0.5,
+        fallback: Union[None, "RotationCache"] = None,
+    ):
+        """
+        Args:
+            step (float): 角度量化步长，度.
+            max_bytes (int): 缓存占用内存的上限，字节.
+            share (float, optional): 一张原图的旋转结果最多占上限的比例. 默认为 0.5.
+            fallback (Union[None, RotationCache], optional): 处理过大的原图的下一级缓存. 默认为 None.
+        """
+        self.step = step
+        self.max_bytes = max_bytes
+        self.share = share
+        self.fallback = fallback
+        self.slots = max(1, round(360 / step))
+        self.entries: OrderedDict[tuple[int, int], Rotated] = OrderedDict()
+        self.sources: dict[int, tuple[weakref.ref, set[int]]] = {}
+        # 原图 -> 是否进入本级缓存，每张原图只判断一次
+        self.admitted: weakref.WeakKeyDictionary[Surface, bool] = (
+            weakref.WeakKeyDictionary()
+        )
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        # 原图的回收回调可能在持有锁的线程中触发，因此使用可重入锁
+        self.lock = threading.RLock()
+
+    def quantize(self, angle: float) -> tuple[int, float]:
+        """
+        将角度量化到最近的步长上.
+
+        Args:
+            angle (float): 原始角度.
+
+        Returns:
+            int: 量化后的角度序号.
+            float: 量化后的角度.
+        """
+        index = round(angle / self.step) % self.slots
+        return index, index * self.step
+
+    def admit(self, img: Surface) -> bool:
+        """
+        判断一张图片是否应进入本级缓存.
+        不透明区域为 w * h 的图片旋转后裁剪，在所有角度上的平均面积为 w * h + (w^2 + h^2) / pi.
+
+        Args:
+            img (Surface): 原图.
+
+        Returns:
+            bool
+        """
+        w, h = img.get_bounding_rect().size
+        area = w * h + (w * w + h * h) / pi
+        return area * 4 * self.slots <= self.max_bytes * self.share
+
+    def get(self, img: Surface, angle: float) -> tuple[Surface, float, tuple[int, int]]:
+        """
+        获取旋转后的图片，未命中时旋转并缓存结果.
+
+        Args:
+            img (Surface): 原图.
+            angle (float): 旋转角度.
+
+        Returns:
+            Surface: 旋转后的图片，缓存中的图片裁去了透明的边缘.
+            float: 实际使用的(量化后的)旋转角度.
+            tuple[int, int]: 图片左上角相对于旋转中心的位置，见 rotate_cropped.
+        """
+        admitted = self.admitted.get(img)
+        if admitted is None:
+            admitted = self.admitted[img] = self.admit(img)
+        if not admitted:
+            if self.fallback is not None:
+                return self.fallback.get(img, angle)
+            self.bypasses += 1
+            _, qangle = self.quantize(angle)
+            rotated = pg.transform.rotozoom(img, -qangle, 1)
+            w, h = rotated.get_size()
+            return rotated, qangle, (-(w // 2), -(h // 2))
+
+        index, qangle = self.quantize(angle)
+        key = (id(img), index)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return entry[0], qangle, entry[1]
+            self.misses += 1
+
+        rotated, offset = rotate_cropped(img, qangle)
+        with self.lock:
+            if key in self.entries:  # 另一线程已缓存了同一结果
+                rotated, offset = self.entries[key]
+                return rotated, qangle, offset
+            self.track(img, index)
+            self.entries[key] = (rotated, offset)
+            self.bytes += surface_bytes(rotated)
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                (src_id, i), (old, _) = self.entries.popitem(last=False)
+                self.bytes -= surface_bytes(old)
+                self.sources[src_id][1].discard(i)
+        return rotated, qangle, offset
+
+    def track(self, img: Surface, index: int):
+        """
+        记录原图的缓存项，并在原图被回收时清除它们，避免 id 被复用后命中错误的图片.
+        """
+        src_id = id(img)
+        if src_id not in self.sources:
+            ref = weakref.ref(img, lambda _, src_id=src_id: self.forget(src_id))
+            self.sources[src_id] = (ref, set())
+        self.sources[src_id][1].add(index)
+
+    def forget(self, src_id: int):
+        """
+        清除某张原图的全部缓存项.
+
+        Args:
+            src_id (int): 原图的 id.
+        """
+        with self.lock:
+            _, indices = self.sources.pop(src_id, (None, set()))
+            for index in indices:
+                entry = self.entries.pop((src_id, index), None)
+                if entry is not None:
+                    self.bytes -= surface_bytes(entry[0])
+
+    def clear(self):
+        with self.lock:
+            for src_id in list(self.sources):
+                self.forget(src_id)
+
+    def stats(self) -> dict:
+        """
+        返回缓存的命中统计.
+
+        Returns:
+            dict: 命中、未命中、绕过次数，命中率，缓存项数及占用的字节数; 有 fallback 时其统计在 fallback 中.
+        """
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+        }
+        if self.fallback is not None:
+            stats["fallback"] = self.fallback.stats()
+        return stats
+
+
+# Perf.rotation_cache_bytes 是两级合计的上限. 飞镖、障碍与道具所有角度的旋转结果合计约 36 MiB，放在 1/3 的第一级中;
+# 扇形放不进第一级，以更大的步长缓存在其余 2/3 中，一个 level 的各扇形在 1 度步长下合计约 87 MiB
+rotation_cache = RotationCache(
+    Perf.rotation_step,
+    Perf.rotation_cache_bytes // 3,
+    0.5,
+    RotationCache(
+        Perf.large_rotation_step,
+        Perf.rotation_cache_bytes - Perf.rotation_cache_bytes // 3,
+    ),
+)
+back_cache = SurfaceCache()  # Button、Label 的背景与边框，剩余飞镖的色块
@@ -0,0 +1,210 @@
+"""
+比较 polar 碰撞检测与逐像素的 mask 碰撞检测.
+
+以种子生成若干圆盘(随机的 level 布局，并扎入若干飞镖)，每个圆盘取若干旋转角度，在每个角度上:
+
+- 让飞镖从下方逐像素上升，在每个位置比较 collision.collide_by_polar 与 pygame.sprite.collide_mask
+  给出的物体(检测顺序相同: 飞镖、障碍物与道具中后加入的优先，其次是扇形)，直到两者都发生碰撞;
+- 比较两者第一次发生碰撞的位置与物体.
+
+mask 一侧按原始角度旋转贴图，不量化、不使用旋转缓存. polar 按 rotozoom 的算法计算同样的像素，
+因此要求两者完全一致: 没有任何不一致的位置，每次飞行第一次碰撞的位置与物体都相同时才视为通过.
+在游戏根目录(img、font、sounds 所在的目录)下运行:
+
+    python src/check_collision.py                   # 默认 40 个圆盘，每个 6 个角度
+    python src/check_collision.py --discs 200 -v    # 逐条打印不一致的位置
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import argparse
+import sys
+from collections import Counter
+from random import Random
+from time import perf_counter
+
+import pygame as pg
+from pygame.sprite import collide_mask
+
+from collision import REACH, Shapes, collide_by_polar, get_shapes
+from config import PRICK, SHOOT, Color, Grid
+from sim import Body, DiscState, Level, PinState
+from typing_lib import *
+from utils import rotate
+
+
+def make_disc(seed: int) -> DiscState:
+    """
+    以种子生成一个圆盘: 随机 level 的布局，再在随机的角度扎入 0 ~ 8 支飞镖.
+    """
+    rng = Random(f"{seed}:check")
+    disc = Level(rng.randint(1, 8), rng).disc
+    for _ in range(rng.randint(0, 8)):
+        pin = PinState(rng.choice(Color.pin_colors))
+        pin.mode = PRICK
+        pin.angle = rng.uniform(0, 360)
+        disc.add(pin)
+    return disc
+
+
+def reference_sprites(disc: DiscState, shapes: Shapes) -> list[tuple[Body, Sprite]]:
+    """
+    按当前角度旋转圆盘上各物体的贴图，顺序与 collide_by_polar 的检测顺序相同.
+
+    Returns:
+        list[tuple[Body, Sprite]]: (物体, 带有 image 与 rect 的 sprite).
+    """
+    overlays = [item for item in reversed(disc.items) if item.kind != "pie"]
+    pies = [item for item in disc.items if item.kind == "pie"]
+    sprites = []
+    for item in overlays + pies:
+        image, relative_pos = shapes.image(item)
+        sprite = Sprite()
+        sprite.image, sprite.rect = rotate(
+            image, item.angle, Grid.center, relative_pos, cached=False
+        )
+        sprite.mask = pg.mask.from_surface(sprite.image)
+        sprites.append((item, sprite))
+    return sprites
+
+
+def collide_reference(
+    pin: PinState, pin_sprite: Sprite, sprites: list[tuple[Body, Sprite]]
+) -> Union[None, Body]:
+    pin_sprite.rect.topleft = (pin.left, pin.top)
+    for item, sprite in sprites:
+        if collide_mask(pin_sprite, sprite):
+            return item
+    return None
+
+
+def describe(item: Union[None, Body]) -> str:
+    if item is None:
+        return "none"
+    if item.kind == "pie":
+        return f"pie@{item.start_degree:g}"
+    return f"{item.kind}@{item.angle:.1f}"
+
+
+def check(
+    discs: int, angles: int, seed: int, verbose: bool
+) -> tuple[Counter, Counter, int]:
+    """
+    让飞镖在每个圆盘的每个角度上从下方逐像素上升，直到两种检测都发生碰撞.
+    只比较到两者中较晚的第一次碰撞为止，之后的位置在游戏中不会出现.
+
+    Returns:
+        Counter: 逐位置比较的结果，"same" 与各类不一致的计数.
+        Counter: 第一次碰撞位置之差(polar - mask，像素)的分布，物体不同时记为 "item".
+        int: 发生碰撞的飞行次数.
+    """
+    shapes = get_shapes()
+    rng = Random(seed)
+    pin = PinState(Color.pin_colors[0])
+    pin.mode = SHOOT
+    pin_sprite = Sprite()
+    pin_sprite.image = pin_image = shapes.images["pin"][0]
+    pin_sprite.rect = pin_image.get_rect()
+    pin_sprite.mask = shapes.pin_mask
+    cy = int(Grid.center[1])
+    lowest = cy + int(REACH) + 1  # 更低的位置不可能发生碰撞
+    tops = range(lowest, cy - Grid.pie_radius.__ceil__() - 1, -1)
+
+    positions = Counter()
+    contacts = Counter()
+    flights = 0
+    for d in range(discs):
+        disc = make_disc(seed * 100003 + d)
+        for _ in range(angles):
+            disc.rotate(rng.uniform(0, 360))
+            sprites = reference_sprites(disc, shapes)
+            first = {}
+            for top in tops:
+                pin.top = top
+                results = {}
+                if "polar" not in first:
+                    results["polar"] = collide_by_polar(pin, disc, shapes)
+                if "mask" not in first:
+                    results["mask"] = collide_reference(pin, pin_sprite, sprites)
+                if len(results) == 2:
+                    polar, mask = results["polar"], results["mask"]
+                    if polar is mask:
+                        positions["same"] += 1
+                    else:
+                        kind = "polar only" if mask is None else "mask only"
+                        positions[kind if None in (polar, mask) else "different"] += 1
+                        if verbose:
+                            print(
+                                f"disc {d} angle {disc.angle:.2f} top {top}: "
+                                f"polar {describe(polar)}, mask {describe(mask)}"
+                            )
+                for name, item in results.items():
+                    if item is not None:
+                        first[name] = (top, item)
+                if len(first) == 2:
+                    break
+            if not first:
+                continue
+            flights += 1
+            (p_top, p_item), (m_top, m_item) = (
+                first.get("polar", (None, None)),
+                first.get("mask", (None, None)),
+            )
+            if p_item is m_item:
+                contacts[p_top - m_top] += 1
+                if verbose and abs(p_top - m_top) > 1:
+                    print(
+                        f"disc {d} angle {disc.angle:.2f}: first contact "
+                        f"{describe(p_item)}, polar at {p_top}, mask at {m_top}"
+                    )
+            else:
+                contacts["item"] += 1
+                if verbose:
+                    print(
+                        f"disc {d} angle {disc.angle:.2f}: first contact "
+                        f"polar {describe(p_item)} at {p_top}, "
+                        f"mask {describe(m_item)} at {m_top}"
+                    )
+    return positions, contacts, flights
+
+
+def main(argv: Union[None, Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="比较 polar 与 mask 碰撞检测的结果")
+    parser.add_argument("--discs", type=int, default=40, help="圆盘数，默认 40")
+    parser.add_argument(
+        "--angles", type=int, default=6, help="每个圆盘的旋转角度数，默认 6"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="种子，默认 0")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="打印每个不一致的位置"
+    )
+    args = parser.parse_args(argv)
+
+    pg.init()
+    start = perf_counter()
+    positions, contacts, flights = check(
+        args.discs, args.angles, args.seed, args.verbose
+    )
+    total = sum(positions.values())
+    mismatches = total - positions["same"]
+    print(f"{total} positions in {perf_counter() - start:.1f} s")
+    for kind in ("same", "different", "polar only", "mask only"):
+        print(f"  {kind:<12}{positions[kind]:>8}")
+    print(f"{flights} flights, first contact (polar - mask, px):")
+    for diff, count in sorted(
+        contacts.items(), key=lambda kv: (kv[0] == "item", kv[0] != "item" and kv[0])
+    ):
+        print(f"  {diff!s:<12}{count:>8}")
+    differ = flights - contacts[0]
+    print(
+        f"{mismatches} mismatched positions, {differ} flights with a different first contact"
+    )
+    return 0 if mismatches == 0 and differ == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
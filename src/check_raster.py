@@ -0,0 +1,199 @@
+"""
+比较 raster 直接绘制的图形与原先 PIL 超采样绘制的结果.
+
+原先扇形、飞镖头部与 Button、Label 的圆角背景先用 PIL 以 10 倍以上的分辨率绘制，再缩小到目标大小;
+现在由 raster 在目标分辨率上解析计算覆盖率. 本脚本按原先的方法重新绘制一遍，逐像素比较两者:
+
+- 透明度: 平均差与最大差，以及差值超过 --edge-levels 且不在图形边缘上的像素数
+  (参考图中 3x3 邻域全部完全透明或全部完全不透明的像素不在边缘上);
+- 颜色: 两者都完全不透明的像素上 RGB 的最大差.
+
+平均差不超过 --tolerance 且没有边缘以外的差异时视为通过. 需要安装 pillow(只用于本脚本，游戏本身不依赖它)，
+在游戏根目录(img、font、sounds 所在的目录)下运行:
+
+    python src/check_raster.py
+"""
+
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+import argparse
+import sys
+
+import numpy as np
+import pygame as pg
+from PIL import Image, ImageDraw
+
+from assets import get_image
+from config import Color, Grid
+from typing_lib import *
+from utils import get_path
+from widgets import Pie, Pin, rounded_back
+
+# (起始角度, 扇形角度)
+SECTORS = [(0, 360), (0, 180), (0, 120), (30, 90), (45, 60), (10, 200), (300, 270)]
+# (大小, 圆角半径)
+BACKS = [((180, 60), 10), ((120, 40), 20), ((300, 80), 15), ((60, 60), 30)]
+
+
+def to_surface(image: Image.Image, size: Vect2) -> Surface:
+    """
+    将 PIL 图片转换为 Surface 并平滑缩放到指定大小，与原先的 pil2pg 相同.
+    """
+    raw = image.tobytes("raw", "RGBA")
+    surface = pg.image.fromstring(raw, image.size, "RGBA").convert_alpha()
+    return pg.transform.smoothscale(surface, size)
+
+
+def pil_sector(start_degree: float, degree_range: float) -> np.ndarray:
+    size = (2200, 2200)
+    image = Image.new("L", size, 0)
+    draw = ImageDraw.Draw(image)
+    margin = (Grid.radius - Grid.pie_radius) * size[0] / (2 * Grid.radius)
+    xy = ((margin, margin), (size[0] - margin, size[1] - margin))
+    end = start_degree + degree_range
+    draw.pieslice(xy, start_degree, end, fill=255, outline=255)
+    diameter = 2 * Grid.radius
+    image = image.resize((diameter, diameter), Image.Resampling.BOX)
+    return np.asarray(image, dtype=np.float64).T
+
+
+def pil_pin(color: str) -> Surface:
+    image = Image.open(get_path("img", "pin.png")).convert("RGBA")
+    draw = ImageDraw.Draw(image)
+    imgsize = image.size
+    size = (450, 1800)
+    w = Grid.marginal_width * imgsize[0] / Grid.pin_size[0]
+    xy = (
+        w + 125,
+        imgsize[1] - 100 - size[0] + w,
+        imgsize[0] - 125 - w,
+        imgsize[1] - 100 - w,
+    )
+    draw.ellipse(xy, fill=color)
+    return to_surface(image, Grid.pin_size)
+
+
+def pil_back(size: Vect2, radius: float, color: str) -> Surface:
+    back_size = (int(size[0] * 10), int(size[1] * 10))
+    image = Image.new("RGBA", back_size, (255, 255, 255, 0))
+    draw = ImageDraw.Draw(image)
+    xy = (10, 10, back_size[0] - 10, back_size[1] - 10)
+    draw.rounded_rectangle(xy, radius * 10, color)
+    return to_surface(image, size)
+
+
+def channels(surface: Surface) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns:
+        np.ndarray: 透明度，下标为 [x, y].
+        np.ndarray: RGB，下标为 [x, y, c].
+    """
+    alpha = pg.surfarray.array_alpha(surface).astype(np.float64)
+    rgb = pg.surfarray.array3d(surface).astype(np.float64)
+    return alpha, rgb
+
+
+def compare(
+    reference: np.ndarray,
+    actual: np.ndarray,
+    edge_levels: float,
+    ref_rgb: Union[None, np.ndarray] = None,
+    rgb: Union[None, np.ndarray] = None,
+) -> dict:
+    """
+    比较两张图的透明度(与颜色).
+
+    Returns:
+        dict: 透明度的平均差 mean、最大差 max，边缘以外差异较大的像素数 interior，
+            完全不透明像素上 RGB 的最大差 rgb.
+    """
+    diff = np.abs(reference - actual)
+    # 参考图中 3x3 邻域全部完全透明或全部完全不透明的像素不在边缘上
+    padded = np.pad(reference, 1, mode="edge")
+    w, h = reference.shape
+    windows = [padded[i : i + w, j : j + h] for i in range(3) for j in range(3)]
+    flat = np.all([win == 0 for win in windows], axis=0) | np.all(
+        [win == 255 for win in windows], axis=0
+    )
+    result = {
+        "mean": float(diff.mean()),
+        "max": float(diff.max()),
+        "interior": int(np.count_nonzero(flat & (diff > edge_levels))),
+        "rgb": 0.0,
+    }
+    if ref_rgb is not None:
+        solid = (reference == 255) & (actual == 255)
+        if solid.any():
+            result["rgb"] = float(np.abs(ref_rgb - rgb)[solid].max())
+    return result
+
+
+def check(edge_levels: float) -> list[tuple[str, dict]]:
+    results = []
+    for start, degree_range in SECTORS:
+        reference = pil_sector(start, degree_range)
+        actual = Pie.render_sector(start, degree_range) * 255
+        results.append(
+            (f"pie {start}+{degree_range}", compare(reference, actual, edge_levels))
+        )
+    base = get_image("pin.png", Grid.pin_size)
+    for color in Color.pin_colors:
+        ref_alpha, ref_rgb = channels(pil_pin(color))
+        alpha, rgb = channels(Pin.render_texture(base, color))
+        results.append(
+            (
+                f"pin {color}",
+                compare(ref_alpha, alpha, edge_levels, ref_rgb, rgb),
+            )
+        )
+    for size, radius in BACKS:
+        color = Color.pin_colors[0]
+        ref_alpha, ref_rgb = channels(pil_back(size, radius, color))
+        alpha, rgb = channels(rounded_back(size, radius, color))
+        results.append(
+            (
+                f"back {size[0]}x{size[1]} r{radius}",
+                compare(ref_alpha, alpha, edge_levels, ref_rgb, rgb),
+            )
+        )
+    return results
+
+
+def main(argv: Union[None, Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="比较 raster 与原先 PIL 超采样绘制的图形"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=3.0,
+        help="透明度平均差的上限，0 ~ 255，默认 3",
+    )
+    parser.add_argument(
+        "--edge-levels",
+        type=float,
+        default=2.0,
+        help="边缘以外允许的透明度差，默认 2",
+    )
+    args = parser.parse_args(argv)
+
+    pg.init()
+    pg.display.set_mode((1, 1))  # convert_alpha 需要窗口
+    passed = True
+    print(f"{'image':<24}{'mean':>8}{'max':>8}{'interior':>10}{'rgb':>8}")
+    for name, r in check(args.edge_levels):
+        ok = r["mean"] <= args.tolerance and not r["interior"]
+        passed &= ok
+        print(
+            f"{name:<24}{r['mean']:>8.2f}{r['max']:>8.0f}{r['interior']:>10}"
+            f"{r['rgb']:>8.0f}{'' if ok else '  FAIL'}"
+        )
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
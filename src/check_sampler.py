@@ -0,0 +1,151 @@
+"""
+以卡方检验比较 sampler 中的抽样与原先拒绝采样实现的分布.
+
+对每个项目分别用两种实现各抽样若干次，做同质性检验，p 值都不小于显著性水平时视为通过:
+
+    python src/check_sampler.py
+"""
+
+import sys
+from math import erf, sqrt
+from random import randint, sample, seed
+
+from sampler import bounded_composition, free_position, spaced_positions
+from typing_lib import *
+
+
+def reject_composition(n: int, fixed_sum: int) -> tuple[int, ...]:
+    """
+    原 utils.rand_num(n, fixed_sum, upper=True).
+    """
+    up = round(fixed_sum / n) + 2
+    while True:
+        sam = sorted([0] + sample(range(1, fixed_sum), n - 1) + [fixed_sum])
+        num = tuple(sam[i + 1] - sam[i] for i in range(n))
+        if max(num) <= up:
+            return num
+
+
+def reject_balks(bullets: list[int], total: int) -> tuple[int, ...]:
+    """
+    原 sim.DiscState.get_num_of_balks 中给定总数之后的部分.
+    """
+    n = len(bullets)
+    while True:
+        sam = sorted([0] + sample(range(1, total + n), n - 1) + [total + n])
+        balks = tuple(sam[i + 1] - sam[i] - 1 for i in range(n))
+        if max(b + k for b, k in zip(bullets, balks)) <= 24 / n:
+            return balks
+
+
+def reject_positions(start: int, stop: int, k: int, gap: int) -> tuple[int, ...]:
+    """
+    原 sim.DiscState.add_pies_balks 中一个扇形内的障碍物位置.
+    """
+    while True:
+        pos = sorted(sample(range(start, stop), k))
+        if all(b - a >= gap for a, b in zip(pos, pos[1:])):
+            return tuple(pos)
+
+
+def reject_bonus(taken: list[int]) -> int:
+    """
+    原 sim.DiscState.add_bonus 中的道具位置: 排序后相邻位置的最小差值不小于 15，最小差值从最大的位置算起，
+    因此圆盘上没有其他物体时也不接受小于 15 的位置.
+    """
+    while True:
+        pos = randint(0, 360)
+        l = sorted(taken + [pos])
+        if min([l[-1]] + [b - a for a, b in zip(l, l[1:])]) >= 15:
+            return pos
+
+
+def chi2_sf(x: float, df: int) -> float:
+    """
+    卡方分布的上尾概率，Wilson-Hilferty 近似.
+    """
+    if df <= 0:
+        return 1.0
+    z = ((x / df) ** (1 / 3) - (1 - 2 / (9 * df))) / sqrt(2 / (9 * df))
+    return 0.5 * (1 - erf(z / sqrt(2)))
+
+
+def homogeneity(a: list[Hashable], b: list[Hashable]) -> tuple[float, int, float]:
+    """
+    两组等量样本的卡方同质性检验.
+
+    Returns:
+        tuple[float, int, float]: 卡方统计量、自由度、p 值.
+    """
+    counts: dict[Hashable, list[int]] = {}
+    for i, samples in enumerate((a, b)):
+        for x in samples:
+            counts.setdefault(x, [0, 0])[i] += 1
+    stat = sum((m - n) ** 2 / (m + n) for m, n in counts.values())
+    df = len(counts) - 1
+    return stat, df, chi2_sf(stat, df)
+
+
+def equivalence_cases() -> dict[str, tuple[Callable[[], Hashable], ...]]:
+    """
+    名称 -> (原实现, 新实现)，两者返回可比较的结果.
+    """
+    cases = {}
+    for n, fixed_sum in ((2, 10), (3, 12), (4, 10), (3, 7)):
+        cases[f"composition[n={n},sum={fixed_sum}]"] = (
+            lambda n=n, s=fixed_sum: reject_composition(n, s),
+            lambda n=n, s=fixed_sum: tuple(
+                bounded_composition(s, [(1, round(s / n) + 2)] * n)
+            ),
+        )
+    for bullets, total in (([4, 3, 1], 6), ([2, 2, 3, 3], 8), ([5, 5], 4)):
+        caps = [(0, int(24 / len(bullets) - b)) for b in bullets]
+        cases[f"balks[bullets={bullets},total={total}]"] = (
+            lambda b=bullets, t=total: reject_balks(b, t),
+            lambda c=caps, t=total: tuple(bounded_composition(t, c)),
+        )
+    cases["positions[5:45,k=2]"] = (
+        lambda: reject_positions(5, 45, 2, 15),
+        lambda: tuple(spaced_positions(5, 45, 2, 15)),
+    )
+    # 组合数太多，分别比较每个次序统计量的分布
+    for i in range(3):
+        cases[f"positions[5:85,k=3][{i}]"] = (
+            lambda i=i: reject_positions(5, 85, 3, 15)[i],
+            lambda i=i: spaced_positions(5, 85, 3, 15)[i],
+        )
+    for taken in ([], [20, 100, 230], [5, 84, 110, 350]):
+        cases[f"bonus[taken={taken}]"] = (
+            lambda t=taken: reject_bonus(t),
+            lambda t=taken: free_position(t, 0 if t else 15, 360, 15),
+        )
+    return cases
+
+
+def check_equivalence(trials: int = 20000, alpha: float = 1e-3) -> bool:
+    """
+    分别以原实现与新实现抽样，检验两者的分布是否相同.
+
+    Args:
+        trials (int, optional): 每种实现的抽样次数. 默认为 20000.
+        alpha (float, optional): 显著性水平. 默认为 1e-3.
+
+    Returns:
+        bool: 所有项目的 p 值是否都不小于 alpha.
+    """
+    passed = True
+    for name, (old, new) in equivalence_cases().items():
+        seed(name)
+        stat, df, p = homogeneity(
+            [old() for _ in range(trials)], [new() for _ in range(trials)]
+        )
+        ok = p >= alpha
+        passed &= ok
+        print(
+            f"{name:<40}chi2={stat:>9.1f}  df={df:>4}  p={p:.3f}  {'ok' if ok else 'DIFFERENT'}"
+        )
+    return passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_equivalence() else 1)
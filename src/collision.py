@@ -0,0 +1,406 @@
+"""
+飞镖与圆盘之间的碰撞检测，检测只使用 sim 中的状态，不需要窗口. 由 Perf.collision_backend 选择:
+
+- polar: 圆盘上的物体都以圆心为旋转中心，只需角度即可确定位置. 先按物体的偏角范围与旋转后的矩形排除不可能相交的物体，
+  再按 pygame.transform.rotozoom 的算法只计算旋转后的物体在飞镖不透明像素上的透明度，不旋转整张图片，也不生成 mask.
+  结果与 mask 逐像素相同.
+- mask: 按状态旋转各物体的贴图，与飞镖逐像素比较 mask，即 pygame.sprite.collide_mask 的做法. 速度慢得多，
+  作为 polar 的参照，两者的比较见 src/check_collision.py.
+"""
+
+from math import asin, atan2, ceil, cos, degrees, floor, hypot, radians, sin
+
+import numpy as np
+import pygame as pg
+
+from config import Color, Grid, Perf
+from typing_lib import *
+from utils import rotate, rotation_center
+
+# 圆盘上任意物体到圆心的最远距离，飞镖尖端离圆心更远时不可能发生碰撞
+REACH = max(
+    hypot(Grid.pin_size[0] / 2, Grid.radius - Grid.prick_depth + Grid.pin_size[1]),
+    hypot(Grid.balk_size[0] / 2, Grid.balk_radius + Grid.balk_size[1]),
+    hypot(
+        Grid.heart_bonus_size[0] / 2,
+        Grid.heart_bonus_radius + Grid.heart_bonus_size[1],
+    ),
+    hypot(20, Grid.radius + 40),
+)
+OPAQUE = 127  # 透明度超过该值的像素参与碰撞，与 pygame.mask.from_surface 的默认阈值相同
+# rotozoom 以下标为 w // 2 的像素为中心旋转，再加上双线性插值，旋转结果中的不透明像素与按旋转中心精确旋转的位置
+# 相差不到 2 像素; 用于排除的范围都留出 PAD 像素的余量
+PAD = 4
+
+
+class Spans:
+    """
+    图片每一行不透明像素的范围，与 collide_mask 使用相同的透明度阈值.
+    """
+
+    def __init__(self, image: Surface):
+        mask = pg.mask.from_surface(image)
+        w, h = self.size = mask.get_size()
+        self.rows: list[Union[None, tuple[int, int]]] = []
+        for y in range(h):
+            xs = [x for x in range(w) if mask.get_at((x, y))]
+            self.rows.append((xs[0], xs[-1] + 1) if xs else None)
+        filled = [y for y, row in enumerate(self.rows) if row]
+        self.first = filled[0] if filled else h  # 第一行不透明像素，即尖端所在行
+        # 所有不透明像素的横向范围
+        self.x0 = min((row[0] for row in self.rows if row), default=0)
+        self.x1 = max((row[1] for row in self.rows if row), default=0)
+
+
+class Texture:
+    """
+    圆盘上物体未旋转的贴图. 按 pygame.transform.rotozoom 的算法(定点数的双线性插值)计算旋转后指定像素的透明度，
+    与 rotate(..., cached=False) 得到的图片逐像素相同，但只计算需要的像素.
+    """
+
+    def __init__(
+        self,
+        image: Surface,
+        relative_pos: Vect2,
+        arc: Union[None, tuple[float, float]] = None,
+    ):
+        """
+        Args:
+            image (Surface): 未旋转的贴图.
+            relative_pos (Vect2): 旋转中心(圆心)相对于贴图左上角的位置.
+            arc (Union[None, tuple[float, float]], optional): 扇形的 (起始角度, 扇形角度)，用于快速排除. 默认为 None.
+        """
+        self.image = image
+        self.relative_pos = relative_pos
+        self.arc = arc
+        self.alpha = alpha = pg.surfarray.array_alpha(image).T.astype(np.int64)
+        h, w = alpha.shape  # 下标为 [y, x]
+        # rotozoom 在边缘外一个像素以内取边缘上的像素，因此四周各扩展一个像素; 之后按一维下标取相邻的四个像素.
+        # 在左、上、下边缘外一个像素处，rotozoom 取的相邻像素与此不同，单独修改对应的那一份
+        padded = np.pad(alpha, 1, mode="edge")
+        right, below = padded.copy(), padded.copy()
+        right[0, 1:] = padded[0, :-1]
+        below[1:, 0] = padded[:-1, 0]
+        below[h + 1, :-1] = padded[h, 1:]
+        self.stride = stride = w + 2
+        self.corners = (
+            padded.ravel(),
+            right.ravel()[1:],
+            below.ravel()[stride:],
+            padded.ravel()[stride + 1 :],
+        )
+        rx, ry = relative_pos
+        ys, xs = np.nonzero(self.alpha > OPAQUE)
+        # 不透明像素的中心相对于旋转中心的位置: 横向 c，沿半径方向 s
+        c, s = np.abs(xs + 0.5 - rx), ys + 0.5 - ry
+        # 不透明像素到圆心的最远距离，及横向与沿半径方向的范围
+        self.reach = float(np.hypot(c, s).max()) + PAD if len(s) else 0.0
+        self.bounds = (
+            (float(c.max()) + PAD, float(s.min()) - PAD, float(s.max()) + PAD)
+            if len(s)
+            else (0.0, 0.0, 0.0)
+        )
+        # 不透明像素相对于物体所在方向的最大偏角，度
+        if len(s) and s.min() > PAD:
+            self.spread = float(np.degrees(np.arctan2(c + PAD, s - PAD)).max())
+        else:
+            self.spread = 180.0
+        self.unrotated: Union[None, np.ndarray] = None
+
+    def place(self, angle: float) -> tuple[Rect, Union[tuple, np.ndarray]]:
+        """
+        按 rotozoom 计算旋转后图片的大小与位置.
+
+        Args:
+            angle (float): 旋转角度，与 rotate 相同.
+
+        Returns:
+            Rect: 旋转后的图片在屏幕上的矩形区域，与 rotate(..., cached=False) 相同.
+            Union[tuple, np.ndarray]: 交给 sample 的旋转参数.
+        """
+        a = float(np.float32(-angle))  # rotozoom 以单精度接收角度
+        h, w = self.alpha.shape
+        cx, cy = rotation_center(self.image, angle, Grid.center, self.relative_pos)
+        if abs(a) <= 0.001:
+            # 角度过小时 rotozoom 只做缩放，结果与角度无关，直接使用其结果
+            if self.unrotated is None:
+                rotated = pg.transform.rotozoom(self.image, 0, 1)
+                self.unrotated = pg.surfarray.array_alpha(rotated).T
+            h, w = self.unrotated.shape
+            return Rect(cx - w // 2, cy - h // 2, w, h), self.unrotated
+        r = radians(a)
+        s, c = sin(r), cos(r)
+        x, y = w // 2, h // 2
+        half_w = max(ceil(max(abs(c * x + s * y), abs(c * x - s * y))), 1)
+        half_h = max(ceil(max(abs(s * x + c * y), abs(s * x - c * y))), 1)
+        rect = Rect(cx - half_w, cy - half_h, 2 * half_w, 2 * half_h)
+        isin, icos = int(s * 65536.0), int(c * 65536.0)
+        # 与 transformSurfaceRGBA 相同的源坐标原点，16 位小数的定点数; 另加 1 对应于扩展后的数组
+        ox = (
+            ((half_w + 1) << 16)
+            - icos * half_w
+            + ((w - 2 * half_w) << 15)
+            + isin * half_h
+        )
+        oy = (
+            ((half_h + 1) << 16)
+            - isin * half_w
+            + ((h - 2 * half_h) << 15)
+            - icos * half_h
+        )
+        return rect, (ox, oy, isin, icos)
+
+    def sample(
+        self, params: Union[tuple, np.ndarray], xs: np.ndarray, ys: np.ndarray
+    ) -> np.ndarray:
+        """
+        旋转后的图片在 (xs, ys) 处的透明度，与 rotozoom 中 transformSurfaceRGBA 的计算相同.
+
+        Args:
+            params (Union[tuple, np.ndarray]): place 返回的旋转参数.
+            xs (np.ndarray): 横坐标，相对于 place 返回的矩形的左上角，必须在矩形内.
+            ys (np.ndarray): 纵坐标，同上.
+
+        Returns:
+            np.ndarray: 透明度，0 ~ 255.
+        """
+        if type(params) is np.ndarray:
+            return params[ys, xs]
+        ox, oy, isin, icos = params
+        h, w = self.alpha.shape
+        sdx = ox + icos * xs - isin * ys
+        sdy = oy + isin * xs + icos * ys
+        ix, iy = sdx >> 16, sdy >> 16
+        # 源坐标在边缘外超过一个像素时为透明，按无符号数比较同时排除负数
+        inside = (ix.view(np.uint64) <= w) & (iy.view(np.uint64) <= h)
+        i = np.where(inside, iy * self.stride + ix, 0)
+        c00, c01, c10, c11 = (corner[i] for corner in self.corners)
+        ex, ey = sdx & 0xFFFF, sdy & 0xFFFF
+        t1 = ((c01 - c00) * ex >> 16) + c00
+        t2 = ((c11 - c10) * ex >> 16) + c10
+        return (((t2 - t1) * ey >> 16) + t1) * inside
+
+
+class Shapes:
+    """
+    碰撞检测使用的形状: 飞行中飞镖的不透明像素及圆盘上各类物体的 Texture.
+    """
+
+    def __init__(self):
+        # 贴图取自 widgets，widgets 依赖 sim，sim 又依赖本模块，因此在这里才导入
+        from widgets import Balk, Heart, Pin, Star
+
+        pin_image = Pin.get_texture(Color.pin_colors[0])  # 各颜色飞镖的形状相同
+        self.pin = Spans(pin_image)
+        self.pin_mask = pg.mask.from_surface(pin_image)
+        # 飞镖的不透明像素相对于左上角的位置，按行排列; 第 r 行的像素为 [row_start[r], row_start[r + 1])
+        self.pin_ys, self.pin_xs = np.nonzero(
+            pg.surfarray.array_alpha(pin_image).T > OPAQUE
+        )
+        self.row_start = np.searchsorted(self.pin_ys, np.arange(len(self.pin.rows) + 1))
+        # 各类物体未旋转的贴图及旋转中心相对于贴图左上角的位置
+        self.images: dict[str, tuple[Surface, Vect2]] = {
+            "pin": (pin_image, Pin.relative_pos),
+            "balk": (Balk.texture(), Balk.relative_pos),
+            "heart": (Heart.texture(), Heart.relative_pos),
+            "star": (Star.texture(), Star.relative_pos),
+        }
+        self.textures: dict[Hashable, Texture] = {
+            kind: Texture(image, relative_pos)
+            for kind, (image, relative_pos) in self.images.items()
+        }
+
+    def image(self, item) -> tuple[Surface, Vect2]:
+        """
+        Args:
+            item (sim.Body): 圆盘上的物体.
+
+        Returns:
+            tuple[Surface, Vect2]: 物体未旋转的贴图及旋转中心相对于贴图左上角的位置，扇形的形状与颜色无关.
+        """
+        if item.kind != "pie":
+            return self.images[item.kind]
+        from widgets import Pie
+
+        texture = Pie.get_texture(
+            Color.pin_colors[0], item.start_degree, item.degree_range
+        )
+        return texture, (Grid.radius, Grid.radius)
+
+    def texture(self, item) -> Texture:
+        """
+        Args:
+            item (sim.Body): 圆盘上的物体.
+
+        Returns:
+            Texture: 物体的 Texture，扇形的 Texture 在第一次用到时生成.
+        """
+        key = (
+            item.kind if item.kind != "pie" else (item.start_degree, item.degree_range)
+        )
+        if key not in self.textures:
+            arc = key if item.kind == "pie" else None
+            self.textures[key] = Texture(*self.image(item), arc)
+        return self.textures[key]
+
+
+_shapes: Union[None, Shapes] = None
+
+
+def get_shapes() -> Shapes:
+    """
+    获取共享的形状，第一次调用时从贴图中提取.
+    """
+    global _shapes
+    if _shapes is None:
+        _shapes = Shapes()
+    return _shapes
+
+
+def overlaps(
+    shapes: Shapes, texture: Texture, angle: float, left: int, top: int
+) -> bool:
+    """
+    检测飞镖与旋转后的物体是否有重叠的不透明像素，结果与 collide_mask 相同.
+
+    Args:
+        shapes (Shapes): 碰撞检测使用的形状.
+        texture (Texture): 物体的贴图.
+        angle (float): 物体的旋转角度.
+        left (int): 飞镖左边界.
+        top (int): 飞镖上边界.
+
+    Returns:
+        bool
+    """
+    spans = shapes.pin
+    cx, cy = Grid.center
+    # 飞镖不透明像素的外接矩形与圆心的距离超过物体的范围时不可能相交
+    x0, x1 = left + spans.x0, left + spans.x1
+    y0, y1 = top + spans.first, top + len(spans.rows)
+    if hypot(max(x0 - cx, 0, cx - x1), max(y0 - cy, 0, cy - y1)) > texture.reach:
+        return False
+    # 物体不透明像素所在的范围旋转后的外接矩形与飞镖不相交时不可能相交
+    c_max, s_min, s_max = texture.bounds
+    a = radians(angle)
+    ux, uy = -sin(a), cos(a)  # 沿半径方向的单位向量
+    vx, vy = cos(a), sin(a)  # 横向的单位向量
+    s_mid, s_half = (s_min + s_max) / 2, (s_max - s_min) / 2
+    ex = abs(ux) * s_half + abs(vx) * c_max
+    ey = abs(uy) * s_half + abs(vy) * c_max
+    if abs(cx + ux * s_mid - (x0 + x1) / 2) > ex + (x1 - x0) / 2:
+        return False
+    if abs(cy + uy * s_mid - (y0 + y1) / 2) > ey + (y1 - y0) / 2:
+        return False
+    depth = y0 - cy
+    if texture.arc is not None and depth > PAD:
+        # 飞镖在圆心下方时，其不透明像素与竖直向下方向(90°)的夹角不超过 beta; 扇形旋转后的不透明像素
+        # 与扇形的距离不超过 PAD，在飞镖所在的距离上对应的角度不超过 margin. 两者的角度范围不相交时不可能碰撞
+        start, degree_range = texture.arc
+        beta = degrees(atan2(max(cx - x0, x1 - cx), depth))
+        margin = degrees(asin(PAD / depth))
+        offset = (angle + start + degree_range / 2 - 90) % 360
+        if min(offset, 360 - offset) > degree_range / 2 + beta + margin:
+            return False
+    rect, params = texture.place(angle)
+    if rect.left >= x1 or rect.right <= x0:
+        return False
+    # 只需计算在旋转后的矩形内、且纵向离圆心不超过物体范围的行
+    r0 = max(rect.top - top, ceil(cy - texture.reach - top - 0.5), spans.first)
+    r1 = min(
+        rect.bottom - top, floor(cy + texture.reach - top - 0.5) + 1, len(spans.rows)
+    )
+    if r0 >= r1:
+        return False
+    i0, i1 = shapes.row_start[r0], shapes.row_start[r1]
+    xs = shapes.pin_xs[i0:i1] + (left - rect.x)
+    ys = shapes.pin_ys[i0:i1] + (top - rect.y)
+    if rect.left > x0 or rect.right < x1:
+        keep = (xs >= 0) & (xs < rect.w)
+        xs, ys = xs[keep], ys[keep]
+    return bool((texture.sample(params, xs, ys) > OPAQUE).any())
+
+
+def collide_by_polar(pin, disc, shapes: Shapes, turn: float = 0):
+    """
+    按 rotozoom 的算法计算旋转后的物体，返回与飞镖发生碰撞的物体. 检测顺序与 collide_by_mask 相同:
+    先按绘制顺序的逆序检测扇形以外的物体(后加入圆盘的物体优先)，再按加入的顺序检测扇形.
+
+    Args:
+        pin (sim.PinState): 飞行中的飞镖.
+        disc (sim.DiscState)
+        shapes (Shapes): 碰撞检测使用的形状.
+        turn (float, optional): 圆盘在当前状态基础上再旋转的角度，用于检测一步之内的中间时刻. 默认为 0.
+
+    Returns:
+        Union[None, sim.Body]: 发生碰撞的物体，没有碰撞时返回 None.
+    """
+    if pin.top - Grid.center[1] > REACH:
+        return None
+    spans = shapes.pin
+
+    # 飞镖在圆心下方时，其不透明像素相对于竖直向下方向的偏角不超过 beta;
+    # 物体的偏角范围与之不相交时不可能发生碰撞，无需计算
+    cx, cy = Grid.center
+    depth = pin.top + spans.first - cy
+    if depth > 0:
+        half_width = max(cx - pin.left - spans.x0, pin.left + spans.x1 - cx)
+        beta = degrees(atan2(half_width, depth)) + 1e-6
+    else:
+        beta = 180
+
+    for item in reversed(disc.items):
+        if item.kind == "pie":
+            continue
+        texture = shapes.textures[item.kind]
+        angle = item.angle + turn
+        offset = angle % 360
+        if min(offset, 360 - offset) > texture.spread + beta:
+            continue
+        if overlaps(shapes, texture, angle, pin.left, pin.top):
+            return item
+    for item in disc.items:
+        if item.kind == "pie" and overlaps(
+            shapes, shapes.texture(item), item.angle + turn, pin.left, pin.top
+        ):
+            return item
+    return None
+
+
+def collide_by_mask(pin, disc, shapes: Shapes, turn: float = 0):
+    """
+    旋转各物体的贴图并与飞镖逐像素比较 mask，返回与飞镖发生碰撞的物体. 角度不量化，也不使用旋转缓存.
+    检测顺序见 collide_by_polar.
+
+    Args:
+        pin (sim.PinState): 飞行中的飞镖.
+        disc (sim.DiscState)
+        shapes (Shapes): 各类物体的贴图.
+        turn (float, optional): 圆盘在当前状态基础上再旋转的角度. 默认为 0.
+
+    Returns:
+        Union[None, sim.Body]: 发生碰撞的物体，没有碰撞时返回 None.
+    """
+    if pin.top - Grid.center[1] > REACH:
+        return None
+    overlays = [item for item in reversed(disc.items) if item.kind != "pie"]
+    pies = [item for item in disc.items if item.kind == "pie"]
+    for item in overlays + pies:
+        image, relative_pos = shapes.image(item)
+        rotated, rect = rotate(
+            image, item.angle + turn, Grid.center, relative_pos, cached=False
+        )
+        offset = (rect.x - pin.left, rect.y - pin.top)
+        if shapes.pin_mask.overlap(pg.mask.from_surface(rotated), offset):
+            return item
+    return None
+
+
+backends = {"polar": collide_by_polar, "mask": collide_by_mask}
+
+
+def collide(pin, disc, shapes: Shapes, turn: float = 0):
+    """
+    使用 Perf.collision_backend 指定的方式检测碰撞，参数与返回值见 collide_by_polar.
+    """
+    return backends[Perf.collision_backend](pin, disc, shapes, turn)
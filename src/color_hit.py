@@ -1,5 +1,5 @@
 import os
-from tkinter import Tk, messagebox
+from time import perf_counter
 
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
 import pygame as pg
@@ -7,29 +7,52 @@ from pygame import KEYDOWN, MOUSEBUTTONDOWN, QUIT
 from pygame.event import get as get_events
 
 from config import FPS, Grid
-from utils import get_back, get_image, quit_game, rewrite_best_score
-from views import GameView, Label, MenuView
+from assets import (
+    get_back,
+    get_image,
+    init_mixer,
+    music,
+    open_bundle,
+    registry,
+    sound_bank,
+)
+from profiler import EVENTS, UPDATE, profiler
+from render import Renderer
+from scores import score_store
+from typing_lib import *
+from utils import quit_game
+from views import GameOverView, GameView, Label, MenuView
+from widgets import Pie, ProfilerOverlay
 
 
 class Game:
     def __init__(self):
-        tkwindow = Tk()
-        tkwindow.wm_withdraw()
+        init_mixer()
         pg.init()
         os.environ["SDL_VIDEO_CENTERED"] = "1"
         pg.event.set_allowed([QUIT, KEYDOWN, MOUSEBUTTONDOWN])
         self.screen = pg.display.set_mode(Grid.window_size)
         pg.display.set_caption("Color Hit")
-        pg.display.set_icon(get_image("color_hit_icon.png"))
+        open_bundle()
+        registry.preload()
+        score_store.load()
+        sound_bank.reserve()
+        sound_bank.preload()
+        pg.display.set_icon(get_image("color_hit_icon.png", (300, 300)))
         self.clock = pg.time.Clock()
+        Pie.load_textures()
 
         self.init_menu()
         self.background, self.back_rect = get_back()
+        self.renderer = Renderer(self.screen)
+        self.renderer.set_background(self.background, self.back_rect)
         fps_size = pg.math.Vector2(135, 30)
         self.current_fps = Label(
             self.screen, Grid.window_size - fps_size, fps_size, "", fs=14, ta="left"
         )
         self.frame = 0  # 记录帧数
+        # 按 F3 显示或隐藏的计时叠加层
+        self.overlay: Union[None, ProfilerOverlay] = None
 
     def init_menu(self):
         """
@@ -37,51 +60,88 @@ class Game:
         """
         self.view = MenuView(self.screen)
         self.view.start_button.set_callback(self.init_game)
-        self.view.quit_button.set_callback(quit_game)
-        pg.mixer.music.play(loops=-1)
+        self.view.quit_button.set_callback(self.quit)
+        music.play()
 
-    def init_game(self):
+    def init_game(self, seed: Union[None, int] = None, record: bool = True):
         """
         初始化游戏界面.
+
+        Args:
+            seed (Union[None, int], optional): 游戏的种子. 默认为 None，随机选取.
+            record (bool, optional): 是否记录本局的得分与输入. 默认为 True.
         """
-        self.view = GameView(self.screen)
-        pg.mixer.music.play(loops=-1)
+        self.view = GameView(self.screen, seed, record)
+        music.play()
 
     def update_gameview(self, past_sec: float):
         game_over = self.view.update(past_sec)
         if game_over:
-            retry = messagebox.askokcancel(message="Game over! Try again?")
-            if retry:
-                self.init_game()
-            else:
-                self.init_menu()
+            self.init_game_over()
+
+    def init_game_over(self):
+        """
+        在结束的游戏界面上方显示游戏结束的对话框.
+        """
+        self.view = GameOverView(self.screen, self.view)
+        self.view.retry_button.set_callback(self.init_game)
+        self.view.menu_button.set_callback(self.init_menu)
+
+    def quit(self):
+        """
+        退出游戏. 游戏中途退出时同样记录本局，并等待后台的写入完成.
+        """
+        if type(self.view) is GameView:
+            self.view.save_record()
+        score_store.flush()
+        quit_game()
+
+    def toggle_overlay(self):
+        if self.overlay is None:
+            self.overlay = ProfilerOverlay(self.screen, profiler)
         else:
-            self.view.draw()
+            self.overlay = None
 
     def update_frame(self):
+        profiler.next_frame()
+        start = perf_counter()
         for event in get_events():
             if event.type == QUIT:
-                if type(self.view) is GameView:
-                    rewrite_best_score(self.view.score, self.view.best_score)
-                quit_game()
+                self.quit()
             elif event.type == KEYDOWN:
-                self.view.on_keydown(event)
+                if event.key == pg.K_F3:
+                    self.toggle_overlay()
+                else:
+                    self.view.on_keydown(event)
             elif event.type == MOUSEBUTTONDOWN:
                 self.view.on_mousedown(event)
+        profiler.add(EVENTS, perf_counter() - start)
 
-        self.screen.blit(self.background, self.back_rect)
         past_sec = self.clock.tick(FPS) / 1000
-        if type(self.view) is MenuView:
-            self.view.update(past_sec)
-            self.view.draw()
-        elif type(self.view) is GameView:
+        self.advance(past_sec)
+
+    def advance(self, past_sec: float):
+        """
+        按经过的时间更新界面并绘制一帧.
+
+        Args:
+            past_sec (float): 距上一帧经过的时间，s.
+        """
+        start = perf_counter()
+        if type(self.view) is GameView:
             self.update_gameview(past_sec)
+        else:
+            self.view.update(past_sec)
 
         self.frame += 1
         if self.frame % 20 == 0:
             self.current_fps.update(f"Current FPS: {self.clock.get_fps():.2f}")
-        self.current_fps.draw()
-        pg.display.update()
+        widgets = [*self.view.get_widgets(), self.current_fps]
+        if self.overlay is not None:
+            self.overlay.update()
+            widgets.append(self.overlay)
+        profiler.add(UPDATE, perf_counter() - start)
+        self.renderer.render(widgets)
 
 
 def main():
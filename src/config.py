@@ -1,4 +1,4 @@
-from random import randint
+from random import Random, randint
 
 from pygame.math import Vector2
 
@@ -25,9 +25,11 @@ class Grid:
     pin_size = Vector2(35, 100)  # 飞镖大小
     marginal_width = 3  # 飞镖圆形头部边缘宽度
     prick_depth = 45  # 飞镖扎入深度
+    sweep_step = 10  # 飞镖飞行时每次碰撞检测之间的最大间隔
 
     center = Vector2(window_size[0] / 2, 260)  # color disc 圆心位置
     radius = 120  # color disc 半径
+    pie_radius = radius * 10 / 11  # color disc 扇形实际绘制的半径
 
     balk_size = Vector2(78, 78)  # 障碍物大小
     balk_radius = radius - 20  # 障碍物旋转半径
@@ -49,6 +51,10 @@ class Grid:
     pause_pos = Vector2(window_size[0] - 55, 10)  # 暂停按钮显示位置
     pause_size = Vector2(35, 35)  # 暂停按钮大小
 
+    dialog_size = Vector2(360, 230)  # 游戏结束对话框大小
+    dialog_pos = Vector2((window_size[0] - dialog_size[0]) / 2, 160)  # 游戏结束对话框位置
+    dialog_button_size = Vector2(140, 50)  # 游戏结束对话框按钮大小
+
 
 class Color:
     # 圆盘与飞镖颜色
@@ -69,6 +75,26 @@ class Color:
     light_red = "#ff0000"
 
 
+class Perf:
+    """
+    性能优化相关设置.
+    """
+
+    rotation_cache = True  # 是否按量化角度缓存旋转后的图片
+    rotation_step = 0.5  # 旋转角度的量化步长，度
+    rotation_cache_bytes = 192 * 1024 * 1024  # 旋转缓存(两级合计)占用内存的上限，字节; 1/3 给飞镖等小图片，2/3 给扇形
+    large_rotation_step = 1.0  # 扇形等较大图片的旋转角度量化步长，度
+    composite_disc = False  # 是否将圆盘上的 sprite 合成为一张图片，每帧只整体旋转一次; 关闭旋转缓存时更快
+    collision_backend = "polar"  # 碰撞检测方式，"polar" 只计算飞镖所在的像素，"mask" 旋转整张贴图后逐像素比较，结果相同
+    mixer_frequency = 44100  # 混音器采样率
+    mixer_buffer = 256  # 混音器缓冲区大小，采样数，越小音效延迟越低
+    dirty_rects = True  # 是否只重绘并刷新发生变化的区域，否则每帧重绘整个窗口
+    frame_history = 600  # 逐帧分阶段计时保留的帧数
+    asset_bundle = "assets.bundle"  # 资源包文件，不存在时读取 img、sounds、font 中的原始文件
+    record_replays = True  # 是否记录每局的种子与输入，保存在 data/replays 中，可用 src/replay.py 回放
+    replays_kept = 20  # data/replays 中保留最近几局的记录
+
+
 class Setting:
     """
     游戏玩法相关设置.
@@ -79,6 +105,8 @@ class Setting:
     pin_num = 10  # 飞镖总数上限，8 ~ 12
     init_hp = 2  # 初始生命值
     highest_hp = 3  # 最高生命值
+    step = 0.01  # 物理模拟的固定步长，s，与渲染帧率无关
+    max_lag = 0.25  # 一帧最多追赶的模拟时间，s，卡顿更久时游戏变慢而不是一次推进过多步
 
     def __init__(self):
         """
@@ -86,5 +114,5 @@ class Setting:
         """
         self.rotation_speed = 80  # 圆盘部分旋转速度，度/s
 
-    def change_speed(self):
-        self.rotation_speed = randint(80, 150)
+    def change_speed(self, rng: Random = None):
+        self.rotation_speed = (randint if rng is None else rng.randint)(80, 150)
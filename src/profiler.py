@@ -0,0 +1,106 @@
+"""
+逐帧的分阶段计时.
+
+每帧各阶段的耗时累加到 current 中，帧结束时写入固定大小的环形缓冲区，只保留最近 Perf.frame_history 帧.
+记录一个阶段只需两次 perf_counter 和一次列表加法，统计(分位数、直方图)只在显示叠加层时计算.
+
+阶段之间允许嵌套: update 包含 collision 与 rotate 的耗时.
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from config import FPS, Perf
+from typing_lib import *
+
+PHASES = ("events", "update", "collision", "rotate", "draw", "display")
+EVENTS, UPDATE, COLLISION, ROTATE, DRAW, DISPLAY = range(len(PHASES))
+# 互不重叠的阶段，其和为一帧中实际工作的时间
+TOP_LEVEL = (EVENTS, UPDATE, DRAW, DISPLAY)
+
+
+class FrameProfiler:
+    """
+    记录最近若干帧各阶段的耗时，单位 s.
+    缓冲区每行为一帧，前 len(PHASES) 列为各阶段耗时，最后一列为与上一帧开始之间的间隔(含 clock.tick 的等待).
+    """
+
+    def __init__(self, capacity: int = Perf.frame_history):
+        """
+        Args:
+            capacity (int, optional): 保留的帧数. 默认为 Perf.frame_history.
+        """
+        self.capacity = capacity
+        self.samples = np.zeros((capacity, len(PHASES) + 1))
+        self.current = [0.0] * len(PHASES)
+        self.index = 0  # 下一帧写入的行
+        self.count = 0  # 已记录的帧数，不超过 capacity
+        self.frame_start: Union[None, float] = None
+
+    def add(self, phase: int, seconds: float):
+        """
+        将一段耗时累加到当前帧的某个阶段.
+
+        Args:
+            phase (int): 阶段序号，如 COLLISION.
+            seconds (float): 耗时，s.
+        """
+        self.current[phase] += seconds
+
+    def next_frame(self):
+        """
+        结束当前帧并开始下一帧，每帧开始时调用一次.
+        """
+        now = perf_counter()
+        if self.frame_start is not None:
+            row = self.samples[self.index]
+            row[:-1] = self.current
+            row[-1] = now - self.frame_start
+            self.index = (self.index + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+            self.current = [0.0] * len(PHASES)
+        self.frame_start = now
+
+    def recent(self) -> np.ndarray:
+        """
+        返回已记录的帧，不保证时间顺序.
+        """
+        return self.samples[: self.count]
+
+    def summary(self) -> dict[str, tuple[float, float]]:
+        """
+        计算各阶段耗时的中位数与 99 分位数.
+
+        Returns:
+            dict[str, tuple[float, float]]: 阶段名 -> (p50, p99)，ms. 另含 work(各顶层阶段之和)与 frame(帧间隔).
+        """
+        samples = self.recent()
+        if not len(samples):
+            return {}
+        columns = np.column_stack(
+            [samples[:, :-1], samples[:, TOP_LEVEL].sum(axis=1), samples[:, -1]]
+        )
+        p50, p99 = np.percentile(columns, (50, 99), axis=0) * 1000
+        names = PHASES + ("work", "frame")
+        return {name: (p50[i], p99[i]) for i, name in enumerate(names)}
+
+    def histogram(
+        self, bins: int = 20, upper: float = 4000 / FPS
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        统计帧间隔的分布，超过上限的帧计入最后一格.
+
+        Args:
+            bins (int, optional): 格数. 默认为 20.
+            upper (float, optional): 上限，ms. 默认为 4 帧的目标时长.
+
+        Returns:
+            np.ndarray: 各格的帧数.
+            np.ndarray: 各格的边界，ms.
+        """
+        frame_ms = np.minimum(self.recent()[:, -1] * 1000, upper)
+        return np.histogram(frame_ms, bins=bins, range=(0, upper))
+
+
+profiler = FrameProfiler()
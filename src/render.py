@@ -0,0 +1,171 @@
+"""
+主循环的绘制方式.
+
+每个控件通过 commands() 返回一组绘制命令 (图片, 区域)，Renderer 将背景与所有控件的命令合并为一个列表，
+每帧只调用一次 Surface.blits 提交，不再逐个控件、逐张图片地调用 blit.
+
+- 全量重绘: 每帧绘制整个背景与全部控件，并刷新整个窗口.
+- 脏矩形: 控件的绘制命令与上一帧相比发生变化的区域才会重绘背景与控件，命令按这些区域裁剪后提交，
+  并只将这些区域提交给 pg.display.update. 游戏中每帧变化的主要是旋转中的圆盘，菜单中几乎没有变化.
+"""
+
+from time import perf_counter
+
+import pygame as pg
+
+from config import Perf
+from profiler import DISPLAY, DRAW, profiler
+from typing_lib import *
+
+
+def merge_rects(rects: list[Rect]) -> list[Rect]:
+    """
+    合并互相重叠的矩形，减少重绘次数.
+
+    Args:
+        rects (list[Rect]): 待合并的矩形.
+
+    Returns:
+        list[Rect]: 两两不相交的矩形.
+    """
+    merged: list[Rect] = []
+    for rect in rects:
+        if not (rect.w and rect.h):
+            continue
+        rect = rect.copy()
+        i = rect.collidelist(merged)
+        while i != -1:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+
+def clip_commands(commands: list[Blit], rect: Rect) -> list[tuple[Surface, Rect, Rect]]:
+    """
+    将绘制命令裁剪到一个区域内.
+
+    Args:
+        commands (list[Blit]): 绘制命令.
+        rect (Rect): 区域.
+
+    Returns:
+        list[tuple[Surface, Rect, Rect]]: (图片, 目标位置, 图片上的源区域)，可直接交给 Surface.blits.
+    """
+    clipped = []
+    for image, dest in commands:
+        part = dest.clip(rect)
+        if part.w and part.h:
+            clipped.append((image, part, part.move(-dest.x, -dest.y)))
+    return clipped
+
+
+class Renderer:
+    """
+    将背景与控件绘制到屏幕上并刷新显示.
+
+    控件需提供 commands() 方法，按绘制顺序返回 (图片, 区域) 的列表，区域的大小与图片相同.
+    图片与区域均与上一帧相同时认为该控件没有变化.
+    """
+
+    def __init__(self, screen: Surface, dirty: bool = Perf.dirty_rects):
+        """
+        Args:
+            screen (Surface): 窗口.
+            dirty (bool, optional): 是否使用脏矩形方式. 默认为 Perf.dirty_rects.
+        """
+        self.screen = screen
+        self.dirty = dirty
+        self.background: Union[None, Surface] = None
+        self.back_rect: Union[None, Rect] = None
+        # 上一帧各控件的外观、区域与绘制命令
+        self.last: dict[object, tuple[tuple, Rect, list[Blit]]] = {}
+        self.full = True  # 下一帧是否需要重绘整个窗口
+
+    def set_background(self, background: Surface, back_rect: Rect):
+        """
+        设置背景. 背景图片带有几乎不透明的透明度通道，逐帧混合会残留上一帧的内容，
+        这里预先将其裁剪为窗口大小的不透明图片，之后每帧只需直接复制.
+
+        Args:
+            background (Surface): 背景图片.
+            back_rect (Rect): 背景图片的矩形区域.
+        """
+        self.background = pg.Surface(self.screen.get_size()).convert()
+        self.background.blit(background.convert(), back_rect)
+        self.back_rect = self.background.get_rect()
+        self.full = True
+
+    def render(self, widgets: Sequence) -> list[Rect]:
+        """
+        绘制一帧.
+
+        Args:
+            widgets (Sequence): 按绘制顺序排列的控件.
+
+        Returns:
+            list[Rect]: 本帧刷新的区域.
+        """
+        start = perf_counter()
+        if not self.dirty:
+            commands = [(self.background, self.back_rect)]
+            for widget in widgets:
+                commands.extend(widget.commands())
+            self.screen.blits(commands, doreturn=False)
+            self.flip(start, None)
+            return [self.screen.get_rect()]
+
+        areas = []
+        current = {}
+        for widget in widgets:
+            commands = widget.commands()
+            look = tuple((image, tuple(rect)) for image, rect in commands)
+            area = (
+                commands[0][1].unionall([r for _, r in commands])
+                if commands
+                else Rect(0, 0, 0, 0)
+            )
+            current[widget] = (look, area, commands)
+            last = self.last.pop(widget, None)
+            if last is None:
+                areas.append(area)
+            elif last[0] != look or last[1] != area:
+                areas.append(last[1])
+                areas.append(area)
+        areas.extend(last[1] for last in self.last.values())  # 已移除的控件
+        self.last = current
+
+        screen_rect = self.screen.get_rect()
+        if self.full:
+            rects = [screen_rect]
+            self.full = False
+        else:
+            rects = [r.clip(screen_rect) for r in merge_rects(areas)]
+        batch = []
+        for rect in rects:
+            batch.append(
+                (self.background, rect, rect.move(-self.back_rect.x, -self.back_rect.y))
+            )
+            for _, area, commands in current.values():
+                if area.colliderect(rect):
+                    batch.extend(clip_commands(commands, rect))
+        if batch:
+            self.screen.blits(batch, doreturn=False)
+        self.flip(start, rects)
+        return rects
+
+    def flip(self, start: float, rects: Union[None, list[Rect]]):
+        """
+        刷新显示，并分别记录绘制与刷新的耗时.
+
+        Args:
+            start (float): 开始绘制的时刻.
+            rects (Union[None, list[Rect]]): 要刷新的区域，None 表示整个窗口.
+        """
+        drawn = perf_counter()
+        if rects is None:
+            pg.display.update()
+        else:
+            pg.display.update(rects)
+        profiler.add(DRAW, drawn - start)
+        profiler.add(DISPLAY, perf_counter() - drawn)
@@ -0,0 +1,277 @@
+"""
+一局游戏的记录与回放.
+
+游戏规则(sim.Simulation)中的随机数都由一个种子派生，游戏结果只取决于种子、每帧经过的时间与每帧是否发射了飞镖.
+GameView 在游戏中逐帧记录这些输入，一局结束(或中途退出)时由写入线程保存到 data/replays，
+只保留最近 Perf.replays_kept 局. 回放时以相同的种子与输入重新运行，得到完全相同的游戏:
+
+    python src/replay.py                    # 在窗口中按原速度回放最近的一局
+    python src/replay.py FILE --fast        # 不等待，尽快绘制每一帧
+    python src/replay.py FILE --headless    # 不创建窗口，只运行游戏规则
+
+可用于复现玩家报告的卡顿，以及在完全相同的负载上比较性能. 回放结束时检查得分与 level 是否与记录一致.
+
+文件格式(小端): 文件头为 MAGIC、版本号、种子、得分、level 与帧数，之后每帧一条 (经过的时间 ms, 标志).
+暂停中的帧不推进游戏，不记录.
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+from time import perf_counter
+
+from config import Perf
+from scores import score_store
+from sim import Simulation
+from typing_lib import *
+from utils import get_path
+
+MAGIC = b"CHREPLAY"
+VERSION = 1
+HEADER = struct.Struct("<8sHQIHI")  # MAGIC, 版本号, 种子, 得分, level, 帧数
+FRAME = struct.Struct("<HB")  # 经过的时间 ms, 标志
+SHOT = 1  # 标志: 这一帧更新前发射了飞镖
+
+# 一帧的输入: (经过的时间 ms, 是否发射了飞镖)
+Frame = tuple[int, bool]
+
+
+class Recorder:
+    """
+    记录一局游戏的输入. 每帧只在内存中追加几个字节.
+    """
+
+    def __init__(self, seed: int):
+        """
+        Args:
+            seed (int): 游戏的种子，即 Simulation.seed.
+        """
+        self.seed = seed
+        self.frames = bytearray()
+        self.shot = False  # 下一帧更新前是否发射了飞镖
+
+    def shoot(self):
+        self.shot = True
+
+    def frame(self, past_sec: float):
+        """
+        记录一帧，在以 past_sec 推进游戏之前调用.
+
+        Args:
+            past_sec (float): 这一帧经过的时间，s. 游戏中为 clock.tick 返回的整数毫秒.
+        """
+        ms = min(round(past_sec * 1000), 0xFFFF)
+        self.frames += FRAME.pack(ms, SHOT if self.shot else 0)
+        self.shot = False
+
+    def to_bytes(self, score: int, level: int) -> bytes:
+        """
+        Args:
+            score (int): 结束时的得分.
+            level (int): 结束时的 level.
+
+        Returns:
+            bytes: 记录文件的内容.
+        """
+        count = len(self.frames) // FRAME.size
+        header = HEADER.pack(MAGIC, VERSION, self.seed, score, level, count)
+        return header + self.frames
+
+    def save(self, score: int, level: int, directory: Union[None, str] = None):
+        """
+        由 scores 的写入线程保存记录，立即返回.
+
+        Args:
+            score (int): 结束时的得分.
+            level (int): 结束时的 level.
+            directory (Union[None, str], optional): 保存的文件夹. 默认为 None，即 data/replays.
+        """
+        directory = get_path("data", "replays") if directory is None else directory
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.seed:016x}.rep"
+        path = os.path.join(directory, name)
+        score_store.submit(write_replay, (path, self.to_bytes(score, level)))
+
+
+def write_replay(args: tuple[str, bytes]):
+    """
+    写入一个记录文件，并删除同一文件夹中较早的记录，只保留最近 Perf.replays_kept 个.
+
+    Args:
+        args (tuple[str, bytes]): (文件路径, 内容).
+    """
+    path, data = args
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+    # 文件名以时间开头，按名称排序即按时间排序
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".rep"))
+    for name in names[: max(len(names) - Perf.replays_kept, 0)]:
+        os.remove(os.path.join(directory, name))
+
+
+class Replay:
+    """
+    一局游戏的记录.
+    """
+
+    def __init__(self, seed: int, score: int, level: int, frames: list[Frame]):
+        self.seed = seed
+        self.score = score
+        self.level = level
+        self.frames = frames
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Replay":
+        """
+        Raises:
+            ValueError: 不是当前版本的记录，或记录不完整.
+        """
+        if len(data) < HEADER.size:
+            raise ValueError("not a replay")
+        magic, version, seed, score, level, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a version {VERSION} replay")
+        body = memoryview(data)[HEADER.size :]
+        if len(body) != count * FRAME.size:
+            raise ValueError(f"truncated replay, expected {count} frames")
+        frames = [(ms, bool(flags & SHOT)) for ms, flags in FRAME.iter_unpack(body)]
+        return cls(seed, score, level, frames)
+
+    @classmethod
+    def load(cls, path: str) -> "Replay":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+    @property
+    def duration(self) -> float:
+        """
+        记录的游戏时长，s.
+        """
+        return sum(ms for ms, _ in self.frames) / 1000
+
+    def matches(self, sim: Simulation) -> bool:
+        """
+        回放结束时的游戏与记录的结果是否一致.
+        """
+        return sim.score == self.score and sim.level == self.level
+
+
+def latest(directory: Union[None, str] = None) -> Union[None, str]:
+    """
+    Returns:
+        Union[None, str]: 文件夹中最近的记录文件，没有时为 None.
+    """
+    directory = get_path("data", "replays") if directory is None else directory
+    if not os.path.isdir(directory):
+        return None
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".rep"))
+    return os.path.join(directory, names[-1]) if names else None
+
+
+def simulate(replay: Replay) -> Simulation:
+    """
+    不创建窗口，以最快速度回放. 与 GameView.update 一样，每帧先发射飞镖再按经过的时间推进.
+
+    Args:
+        replay (Replay): 记录.
+
+    Returns:
+        Simulation: 回放结束时的游戏.
+    """
+    sim = Simulation(seed=replay.seed)
+    for ms, shot in replay.frames:
+        if shot:
+            sim.shoot()
+        sim.advance(ms / 1000)
+    return sim
+
+
+def play(replay: Replay, realtime: bool = True) -> tuple[Simulation, list[float]]:
+    """
+    在窗口中回放，与游戏一样更新界面、播放音效并绘制. 回放中的游戏不记录得分，也不再保存记录.
+    可以关闭窗口或按 F3 显示计时叠加层，其他输入被忽略.
+
+    Args:
+        replay (Replay): 记录.
+        realtime (bool, optional): 是否按记录中每帧的时间等待，否则尽快绘制每一帧. 默认为 True.
+
+    Returns:
+        tuple[Simulation, list[float]]: 回放结束时的游戏，以及每帧更新与绘制的耗时，s.
+    """
+    import pygame as pg
+
+    from color_hit import Game
+    from profiler import profiler
+
+    game = Game()
+    game.init_game(seed=replay.seed, record=False)
+    view = game.view
+    times = []
+    for ms, shot in replay.frames:
+        profiler.next_frame()
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                game.quit()
+            elif event.type == pg.KEYDOWN and event.key == pg.K_F3:
+                game.toggle_overlay()
+        # 按记录的帧率等待，使这一帧与上一帧之间相隔 ms 毫秒
+        game.clock.tick(1000 / ms if realtime and ms else 0)
+        start = perf_counter()
+        if shot:
+            view.shoot()
+        game.advance(ms / 1000)
+        times.append(perf_counter() - start)
+    return view.sim, times
+
+
+def main(argv: Union[None, Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="回放 Color Hit 的一局游戏")
+    parser.add_argument(
+        "file", nargs="?", help="记录文件，默认为 data/replays 中最近的一个"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--fast", action="store_true", help="不按原速度等待")
+    mode.add_argument("--headless", action="store_true", help="不创建窗口")
+    args = parser.parse_args(argv)
+
+    path = args.file or latest()
+    if path is None:
+        print("no replay found in data/replays", file=sys.stderr)
+        return 2
+    replay = Replay.load(path)
+    print(
+        f"{os.path.basename(path)}: seed {replay.seed:016x}, {len(replay.frames)} frames, "
+        f"{replay.duration:.1f} s, score {replay.score}, level {replay.level}"
+    )
+
+    start = perf_counter()
+    if args.headless:
+        sim = simulate(replay)
+        times = []
+    else:
+        sim, times = play(replay, realtime=not args.fast)
+    elapsed = perf_counter() - start
+    print(f"replayed in {elapsed:.2f} s ({len(replay.frames) / elapsed:.0f} frames/s)")
+    if times:
+        times.sort()
+        print(
+            f"frame ms: median {1000 * times[len(times) // 2]:.2f}, "
+            f"p99 {1000 * times[int(len(times) * 0.99)]:.2f}, max {1000 * times[-1]:.2f}"
+        )
+    if not replay.matches(sim):
+        print(
+            f"diverged: score {sim.score}, level {sim.level}; "
+            f"recorded score {replay.score}, level {replay.level}",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
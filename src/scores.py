@@ -0,0 +1,169 @@
+"""
+最高得分与每局记录的存储.
+
+最高得分在启动时由后台线程读入内存，之后只在内存中读写; 写入磁盘由另一个后台线程依次完成，
+主循环(帧线程)中不发生任何磁盘读写.
+
+- data/best_score.json: 最高得分，格式与之前相同. 先写入临时文件再以 os.replace 替换，写入中途崩溃不会损坏原文件.
+- data/history.bin: 每局的记录，每局追加固定长度的一条 (结束时刻, 得分, 到达的 level, 游戏时长).
+  追加前截去末尾不完整的记录(写入中途崩溃)，之前的记录不会被修改.
+
+其他数据文件(例如 replay 保存的每局输入)也通过 submit 交给同一个写入线程.
+"""
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+from typing_lib import *
+from utils import get_path
+
+# 一局的记录: 结束时刻(Unix 时间，s)、得分、到达的 level、游戏时长(s，不含暂停)
+GameRecord = tuple[float, int, int, float]
+RECORD = struct.Struct("<dIHf")
+
+
+def read_history(path: Union[None, str] = None) -> list[GameRecord]:
+    """
+    读取每局的记录，末尾不完整的记录(写入中途崩溃)会被忽略.
+
+    Args:
+        path (Union[None, str], optional): 记录文件. 默认为 None，即 data/history.bin.
+
+    Returns:
+        list[GameRecord]: 按时间先后排列的记录.
+    """
+    path = get_path("data", "history.bin") if path is None else path
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        data = f.read()
+    end = len(data) - len(data) % RECORD.size
+    return list(RECORD.iter_unpack(data[:end]))
+
+
+class ScoreStore:
+    """
+    内存中的最高得分，后台线程负责读写磁盘.
+    """
+
+    def __init__(self, directory: Union[None, str] = None):
+        """
+        Args:
+            directory (Union[None, str], optional): 数据文件夹. 默认为 None，即 data.
+        """
+        self.directory = get_path("data") if directory is None else directory
+        self.best_path = os.path.join(self.directory, "best_score.json")
+        self.history_path = os.path.join(self.directory, "history.bin")
+        self.best_score = 0
+        self.loaded = threading.Event()
+        self.loader: Union[None, threading.Thread] = None
+        self.tasks: queue.Queue = queue.Queue()
+        self.writer: Union[None, threading.Thread] = None
+
+    def load(self) -> threading.Thread:
+        """
+        在后台线程中读取最高得分. 文件不存在或已损坏时视为 0.
+
+        Returns:
+            threading.Thread: 执行读取的后台线程.
+        """
+
+        def run():
+            try:
+                with open(self.best_path, "r", encoding="utf-8") as f:
+                    self.best_score = max(
+                        self.best_score, int(json.load(f)["best_score"])
+                    )
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+            self.loaded.set()
+
+        self.loader = threading.Thread(target=run, name="score-load", daemon=True)
+        self.loader.start()
+        return self.loader
+
+    @property
+    def best(self) -> int:
+        """
+        最高得分. 尚未读取完成时等待读取线程，通常在菜单显示期间早已完成.
+        """
+        if self.loader is None:
+            self.load()
+        self.loaded.wait()
+        return self.best_score
+
+    def record(self, score: int, level: int, duration: float):
+        """
+        记录一局游戏，得分高于最高得分时更新最高得分. 只修改内存并交给写入线程，立即返回.
+
+        Args:
+            score (int): 得分.
+            level (int): 到达的 level.
+            duration (float): 游戏时长，s.
+        """
+        if score > self.best:
+            self.best_score = score
+            self.submit(self.write_best, score)
+        self.submit(self.append_history, (time.time(), score, level, duration))
+
+    def submit(self, task: Callable[[object], None], arg: object):
+        """
+        交给写入线程执行一次写入，按提交的顺序依次执行，立即返回. 执行中的异常会被忽略.
+
+        Args:
+            task (Callable[[object], None]): 写入函数.
+            arg (object): 写入函数的参数.
+        """
+        self.tasks.put((task, arg))
+        if self.writer is None:
+            self.writer = threading.Thread(
+                target=self.work, name="score-writer", daemon=True
+            )
+            self.writer.start()
+
+    def work(self):
+        while True:
+            task, arg = self.tasks.get()
+            try:
+                task(arg)
+            except Exception:
+                # 磁盘不可写等任何错误都只放弃本次写入，内存中的数据不受影响;
+                # 写入线程不能退出，否则之后的写入无人执行，flush 会一直等待
+                pass
+            finally:
+                self.tasks.task_done()
+
+    def write_best(self, score: int):
+        os.makedirs(self.directory, exist_ok=True)
+        temp_path = self.best_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"best_score": score}, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.best_path)
+
+    def append_history(self, record: GameRecord):
+        os.makedirs(self.directory, exist_ok=True)
+        mode = "r+b" if os.path.exists(self.history_path) else "wb"
+        with open(self.history_path, mode) as f:
+            size = f.seek(0, os.SEEK_END)
+            end = size - size % RECORD.size
+            if end != size:
+                # 上次写入中途崩溃留下了不完整的记录，先截去，否则之后的记录都会错位
+                f.truncate(end)
+                f.seek(end)
+            f.write(RECORD.pack(*record))
+
+    def flush(self):
+        """
+        等待所有写入完成，退出游戏前调用.
+        """
+        if self.writer is not None:
+            self.tasks.join()
+
+
+score_store = ScoreStore()
@@ -0,0 +1,440 @@
+"""
+与显示无关的游戏核心.
+
+level、飞镖、圆盘与得分的状态机都在这里，不创建 Surface、不播放声音、不需要窗口，
+以固定的时间步长推进，速度只受 CPU 限制，可用于平衡性调整与回归检查. pygame 界面(views.GameView)
+只根据这里的状态绘制，并根据 step 返回的事件播放音效.
+
+碰撞检测使用 collision 中从贴图提取的形状，形状只在第一次使用时生成一次.
+
+一局游戏中的随机数都取自由种子派生的 RandomStreams，游戏结果只取决于种子、每帧经过的时间与发射飞镖的时机，
+replay 模块据此记录并回放一局游戏.
+"""
+
+import random
+from random import Random
+from time import perf_counter
+
+from collision import REACH, Shapes, collide, get_shapes
+from config import DROP, PRICK, SHOOT, STILL, Grid, Setting
+from profiler import COLLISION, profiler
+from sampler import bounded_composition, free_position, spaced_positions
+from typing_lib import *
+from utils import ordered_colors
+
+# step 返回的事件
+PRICKED = "prick"  # 飞镖扎入同色扇形
+MISSED = "miss"  # 飞镖撞上异色扇形或障碍物后掉落，失去一点生命值
+BONUS = "bonus"  # 飞镖击中道具
+NEXT_PIN = "next_pin"  # 换上下一支飞镖
+LEVEL_UP = "level_up"  # 进入下一 level
+GAME_OVER = "game_over"  # 生命值耗尽
+
+
+class PinState:
+    """
+    飞镖的状态. 位置为飞镖贴图左上角的坐标，与 pygame 中 Rect 的整数运算保持一致.
+    扎入圆盘后作为圆盘上的物体，angle 为其相对于竖直向下方向的旋转角度.
+    prev 为上一步开始时的位置，用于在两步之间插值绘制.
+    """
+
+    __slots__ = ("color", "mode", "left", "top", "angle", "prev")
+    kind = "pin"
+    width, height = int(Grid.pin_size[0]), int(Grid.pin_size[1])
+
+    def __init__(self, color: str):
+        self.color = color
+        self.mode = STILL
+        self.left = int(Grid.window_size[0]) // 2 - self.width // 2
+        self.top = int(Grid.window_size[1]) - 20 - self.height
+        self.angle: float = 0
+        self.prev = (self.left, self.top)
+
+    def move(self, delta: float, setting: Setting):
+        if self.mode == SHOOT:
+            self.top -= round(setting.shoot_speed * delta)
+        elif self.mode == DROP:
+            self.top += round(setting.drop_speed * delta)
+            self.left += round(setting.drop_speed * delta) // 2
+
+
+class PieState:
+    """
+    圆盘上的扇形，角度的含义与 widgets.Pie 相同.
+    """
+
+    __slots__ = ("color", "start_degree", "degree_range", "angle")
+    kind = "pie"
+
+    def __init__(self, color: str, start_degree: float, degree_range: float):
+        self.color = color
+        self.start_degree = start_degree
+        self.degree_range = degree_range
+        self.angle: float = 0
+
+
+class PropState:
+    """
+    圆盘上的障碍物(balk)或道具(heart、star).
+    """
+
+    __slots__ = ("kind", "angle")
+
+    def __init__(self, kind: str, angle: float):
+        self.kind = kind
+        self.angle = angle
+
+
+Body = Union[PinState, PieState, PropState]
+
+
+class RandomStreams:
+    """
+    一局游戏中各部分使用的随机数流，均由同一个种子派生. 各部分抽取随机数的次数互不影响，
+    例如得分的随机数不会改变之后生成的 level. 以字符串作为种子，结果与 PYTHONHASHSEED 无关.
+    """
+
+    def __init__(self, seed: int):
+        """
+        Args:
+            seed (int): 种子，64 位无符号整数.
+        """
+        self.seed = seed
+        self.level = Random(f"{seed}:level")  # 旋转速度、飞镖颜色与圆盘布局
+        self.score = Random(f"{seed}:score")  # 每次得分的分值
+
+
+class DiscState:
+    """
+    圆盘的状态. items 按物体加入圆盘的顺序排列，与 widgets.Disc 中 sprite 的顺序一致.
+    """
+
+    def __init__(self, colors: list[str], level: int, rng: Union[None, Random] = None):
+        """
+        Args:
+            colors (list[str]): 飞镖的颜色序列.
+            level (int): level 数.
+            rng (Union[None, Random], optional): 随机数生成器. 默认为 None，即 random 模块.
+        """
+        # 按第一次出现的顺序去重，扇形的顺序不随 PYTHONHASHSEED 变化
+        self.diff_colors = list(dict.fromkeys(colors))
+        self.level = level
+        self.rng = random if rng is None else rng
+        self.angle: float = 0  # 圆盘整体的旋转角度
+        self.prev_angle: float = 0  # 上一步开始时圆盘整体的旋转角度
+        self.items: list[Body] = []
+        num_of_balks = self.get_num_of_balks(colors)
+        self.add_pies_balks(num_of_balks)
+
+        num_of_bonus = self.rng.randint(0, 3)
+        for _ in range(num_of_bonus):
+            self.add_bonus()
+
+    def add_bonus(self):
+        # 与已有的障碍物、道具相距至少 15°. 圆盘上没有其他物体时，原先的拒绝采样也不接受小于 15 的位置
+        pos = free_position(
+            self.prop_pos, 15 if not self.prop_pos else 0, 360, 15, self.rng
+        )
+        if pos is None:
+            return
+        self.prop_pos.append(pos)
+        x = self.rng.random()
+        self.items.append(PropState("heart" if 0 <= x < 1 / 4 else "star", pos))
+
+    def get_num_of_balks(self, colors: list[str]) -> list[int]:
+        n = len(self.diff_colors)
+        num_of_bullets = [colors.count(color) for color in self.diff_colors]
+        upper_of_balks = min(8, self.level)
+        total_num_of_balks = self.rng.randint(
+            max(0, upper_of_balks - 4), upper_of_balks
+        )
+        # 每种颜色的飞镖与障碍物之和不超过 24 / n
+        bounds = [(0, int(24 / n - bullets)) for bullets in num_of_bullets]
+        total_num_of_balks = min(total_num_of_balks, sum(up for _, up in bounds))
+        return bounded_composition(total_num_of_balks, bounds, self.rng)
+
+    def add_pies_balks(self, balks: list[int]):
+        sector_degree = 360 / len(self.diff_colors)
+        pies = []
+        self.prop_pos = []
+        for i, color in enumerate(self.diff_colors):
+            start_degree = i * sector_degree
+            pies.append(PieState(color, start_degree, sector_degree))
+            end_degree = start_degree + sector_degree
+            pos = spaced_positions(
+                int(start_degree) + 5, int(end_degree) - 5, balks[i], 15, self.rng
+            )
+            for p in pos:
+                self.items.append(PropState("balk", p))
+                self.prop_pos.append(p)
+        self.items.extend(pies)
+
+    def add(self, item: Body):
+        self.items.append(item)
+
+    def remove(self, item: Body):
+        self.items.remove(item)
+
+    def rotate(self, theta: float):
+        self.angle = (self.angle + theta) % 360
+        for item in self.items:
+            item.angle = (item.angle + theta) % 360
+
+
+class Level:
+    """
+    一个 level 开始时的状态: 圆盘旋转速度、飞镖颜色序列与圆盘.
+    Simulation 在每个 level 开始时就生成下一个 level，界面可以提前在后台准备它的贴图.
+    """
+
+    def __init__(self, number: int, rng: Union[None, Random] = None):
+        """
+        Args:
+            number (int): level 数.
+            rng (Union[None, Random], optional): 随机数生成器. 默认为 None，即 random 模块.
+        """
+        self.number = number
+        self.setting = Setting()
+        self.setting.change_speed(rng)
+        self.colors = ordered_colors(number, self.setting, rng)
+        self.disc = DiscState(self.colors, number, rng)
+
+
+class Simulation:
+    """
+    一局游戏. 每次调用 step 推进一个时间步长，shoot 发射当前飞镖.
+    随机数取自由 seed 派生的 RandomStreams，相同的种子与相同的输入得到相同的游戏.
+
+    界面通过 advance 按实际经过的时间推进，内部总是以 Setting.step 为步长，游戏结果与渲染帧率无关.
+    飞行中的飞镖沿路径每隔不超过 Grid.sweep_step 像素检测一次碰撞，发生碰撞时再二分到具体的像素，
+    一步移动的距离再大也不会穿过障碍物或道具.
+    """
+
+    def __init__(
+        self, shapes: Union[None, Shapes] = None, seed: Union[None, int] = None
+    ):
+        """
+        Args:
+            shapes (Union[None, Shapes], optional): 碰撞检测使用的形状. 默认为 None，使用 collision.get_shapes().
+            seed (Union[None, int], optional): 种子. 默认为 None，从 random 模块抽取，调用 random.seed 即可复现.
+        """
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.rng = RandomStreams(self.seed)
+        self.shapes = get_shapes() if shapes is None else shapes
+        self.hearts = Setting.init_hp
+        self.score = 0
+        self.level = 1
+        self.over = False
+        self.events: list[str] = []
+        self.steps = 0  # 已推进的步数
+        self.lag: float = 0  # 尚未模拟的时间，s
+        self.upcoming: Union[None, Level] = None  # 已生成的下一个 level
+        self.init_level()
+
+    def init_level(self):
+        """
+        开始 self.level. 若该 level 已经提前生成则直接使用，随后生成下一个 level.
+        """
+        level = self.upcoming
+        if level is None or level.number != self.level:
+            level = Level(self.level, self.rng.level)
+        self.setting = level.setting
+        self.colors = level.colors
+        self.pin = PinState(self.colors.pop())
+        self.disc = level.disc
+        self.upcoming = Level(self.level + 1, self.rng.level)
+
+    def next_pin(self):
+        if len(self.colors) > 0:
+            self.pin = PinState(self.colors.pop())
+            self.events.append(NEXT_PIN)
+        else:
+            self.level += 1
+            self.init_level()
+            self.events.append(LEVEL_UP)
+
+    def plus_score(self):
+        self.score += self.rng.score.randint(10, 15)
+
+    def shoot(self) -> bool:
+        """
+        发射当前飞镖.
+
+        Returns:
+            bool: 飞镖处于静止状态、成功发射时返回 True.
+        """
+        if self.over or self.pin.mode != STILL:
+            return False
+        self.pin.mode = SHOOT
+        return True
+
+    def collide(self, turn: float = 0) -> Union[None, Body]:
+        start = perf_counter()
+        collision = collide(self.pin, self.disc, self.shapes, turn)
+        profiler.add(COLLISION, perf_counter() - start)
+        return collision
+
+    def on_hit(self, collision: Body):
+        """
+        处理飞行中的飞镖与圆盘上物体的碰撞.
+        """
+        if type(collision) is PieState and collision.color == self.pin.color:
+            self.pin.mode = PRICK
+            self.disc.add(self.pin)
+            self.events.append(PRICKED)
+            self.plus_score()
+            self.next_pin()
+        elif collision.kind in ("pie", "pin", "balk"):
+            self.pin.mode = DROP
+            self.hearts -= 1
+            self.events.append(MISSED)
+        else:
+            self.disc.remove(collision)
+            self.events.append(BONUS)
+            if collision.kind == "heart":
+                self.hearts = min(self.hearts + 1, Setting.highest_hp)
+            else:
+                self.plus_score()
+
+    def sweep(self, distance: int, theta: float):
+        """
+        飞镖向上飞行 distance 像素，同时圆盘匀速旋转 theta 度. 沿途每隔不超过 Grid.sweep_step 像素检测一次碰撞，
+        检测到碰撞时在上一个没有碰撞的位置与当前位置之间二分，使飞镖停在第一个发生碰撞的像素上.
+        检测某一位置时，圆盘旋转到飞镖恰好飞到该位置的时刻，结果与检测间隔无关.
+
+        Args:
+            distance (int): 飞镖飞行的距离，像素.
+            theta (float): 圆盘旋转的角度，度.
+        """
+        pin, disc = self.pin, self.disc
+        start = pin.top
+        if start - distance - Grid.center[1] > REACH:  # 整段路径都碰不到圆盘
+            pin.top -= distance
+            disc.rotate(theta)
+            return
+
+        rotated = 0.0  # 已经作用到圆盘状态上的角度
+
+        def turn(top: int) -> float:
+            # 飞镖飞到 top 时，圆盘还需在当前状态基础上旋转的角度
+            return theta * (start - top) / distance - rotated
+
+        end = start - distance
+        while pin.top > end and pin.mode == SHOOT:
+            top = max(pin.top - Grid.sweep_step, end)
+            hi, pin.top = pin.top, top
+            if self.collide(turn(top)) is None:
+                continue
+            lo = top  # lo 处发生碰撞，hi 处没有
+            while hi - lo > 1:
+                pin.top = (lo + hi) // 2
+                if self.collide(turn(pin.top)) is None:
+                    hi = pin.top
+                else:
+                    lo = pin.top
+            pin.top = lo
+            collision = self.collide(turn(lo))
+            delta = turn(lo)
+            disc.rotate(delta)
+            rotated += delta
+            self.on_hit(collision)
+            if pin.mode == SHOOT:
+                # 击中道具后道具已被移除，从最后一个没有碰撞的位置继续检测，击中道具的位置 lo 可能还与其他物体相交
+                pin.top = lo + 1
+        disc.rotate(theta - rotated)
+
+    def step(self, delta: float = Setting.step) -> list[str]:
+        """
+        推进一个时间步长.
+
+        Args:
+            delta (float, optional): 时间步长，s. 默认为 Setting.step.
+
+        Returns:
+            list[str]: 这一步中发生的事件.
+        """
+        self.events = []
+        if self.over:
+            return self.events
+        self.steps += 1
+        if self.pin.top >= Grid.window_size[1]:
+            self.next_pin()
+
+        self.pin.prev = (self.pin.left, self.pin.top)
+        self.disc.prev_angle = self.disc.angle
+        if self.hearts > 0:
+            theta = self.setting.rotation_speed * delta
+            if self.pin.mode == SHOOT:
+                self.sweep(round(self.setting.shoot_speed * delta), theta)
+            else:
+                self.pin.move(delta, self.setting)
+                self.disc.rotate(theta)
+        else:
+            self.over = True
+            self.events.append(GAME_OVER)
+        return self.events
+
+    def advance(self, elapsed: float) -> list[str]:
+        """
+        按实际经过的时间推进若干个固定的时间步长，不足一步的时间留到下一次.
+
+        Args:
+            elapsed (float): 距上一次调用经过的时间，s. 超过 Setting.max_lag 的部分会被丢弃.
+
+        Returns:
+            list[str]: 这段时间内发生的事件.
+        """
+        self.lag = min(self.lag + elapsed, Setting.max_lag)
+        events = []
+        while self.lag >= Setting.step - 1e-9:
+            self.lag = max(self.lag - Setting.step, 0)
+            events.extend(self.step(Setting.step))
+        return events
+
+    @property
+    def alpha(self) -> float:
+        """
+        距上一步已经过去的时间占一步的比例，绘制时在上一步与当前状态之间按此插值.
+        """
+        return min(self.lag / Setting.step, 1)
+
+
+def shoot_when_ready(sim: Simulation) -> bool:
+    """
+    最简单的策略: 飞镖静止时立即发射.
+    """
+    return True
+
+
+def run(
+    policy: Callable[[Simulation], bool] = shoot_when_ready,
+    levels: int = 1,
+    delta: float = Setting.step,
+    max_steps: int = 100000,
+    sim: Union[None, Simulation] = None,
+    seed: Union[None, int] = None,
+) -> Simulation:
+    """
+    以固定步长运行一局游戏，直到完成指定数量的 level、游戏结束或达到步数上限.
+
+    Args:
+        policy (Callable[[Simulation], bool], optional): 飞镖静止时决定是否发射. 默认为 shoot_when_ready.
+        levels (int, optional): 要完成的 level 数. 默认为 1.
+        delta (float, optional): 时间步长，s. 默认为 Setting.step.
+        max_steps (int, optional): 步数上限. 默认为 100000.
+        sim (Union[None, Simulation], optional): 要继续运行的游戏. 默认为 None，新开一局.
+        seed (Union[None, int], optional): 新开一局时的种子. 默认为 None.
+
+    Returns:
+        Simulation: 运行结束时的游戏.
+    """
+    if sim is None:
+        sim = Simulation(seed=seed)
+    last_level = sim.level + levels
+    for _ in range(max_steps):
+        if sim.over or sim.level >= last_level:
+            break
+        if sim.pin.mode == STILL and policy(sim):
+            sim.shoot()
+        sim.step(delta)
+    return sim
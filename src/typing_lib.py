@@ -2,9 +2,8 @@
 导入及定义一些常用的类型以方便类型注解.
 """
 
-from typing import Callable, Iterator, Sequence, Union
+from typing import Callable, Hashable, Iterator, Sequence, Union
 
-from PIL.Image import Image as PILImage
 from pygame.event import Event
 from pygame.math import Vector2
 from pygame.rect import Rect
@@ -12,3 +11,5 @@ from pygame.sprite import Group, Sprite
 from pygame.surface import Surface
 
 Vect2 = Union[Vector2, tuple[float, float]]
+# 一条绘制命令: (图片, 图片在窗口上所占的区域)，可直接交给 Surface.blits
+Blit = tuple[Surface, Rect]
@@ -1,13 +1,14 @@
-import json
 import os
+import random
 import sys
 from itertools import chain
-from math import cos, radians, sin
-from random import randint, random, sample, shuffle
+from random import Random
 
 import pygame as pg
 
-from config import Color, Grid
+from cache import rotation_cache
+from config import Color, Grid, Perf
+from sampler import bounded_composition
 from typing_lib import *
 
 
@@ -45,18 +46,20 @@ def draw_border(screen: Surface, rect: Rect, color: str, width: int, radius: int
         pg.draw.rect(screen, color, rect, width=width, border_radius=radius)
 
 
-def get_image(img_name: str, img_size: Union[None, Vect2] = None) -> Surface:
+def load_image(img_name: str, img_size: Union[None, Vect2] = None) -> Surface:
     """
-    获取图片.
+    从 img 文件夹读取并解码图片，每次调用都会重新读取. 游戏中应使用 assets.get_image 获取共享的图片.
 
     Args:
-        img_name (str): 要获取的图片的文件名.
+        img_name (str): 要读取的图片的文件名.
         img_size (Union[None, Vect2], optional): 输出图片的大小. 默认为 None，输出为原始大小.
 
     Returns:
         Surface: 读取到的图片.
     """
-    image = pg.image.load(os.path.join("img", img_name)).convert_alpha()
+    image = pg.image.load(get_path("img", img_name))
+    if pg.display.get_surface() is not None:  # 无窗口运行(如 sim)时无法转换像素格式
+        image = image.convert_alpha()
     return pg.transform.smoothscale(image, img_size) if img_size else image
 
 
@@ -70,23 +73,6 @@ def get_path(*args) -> str:
     return os.path.join(getattr(sys, "_MEIPASS", ""), *args)
 
 
-def pil2pg(pilimg: PILImage, size: Vect2) -> Surface:
-    """
-    将 PILImage 转换为 Surface.
-
-    Args:
-        pilimg (PILImage): 要转换的 PILImage.
-        size (Vect2): 输出 Surface 的大小.
-
-    Returns:
-        Surface: 转换后的 Surface.
-    """
-    raw = pilimg.tobytes("raw", "RGBA")
-    imgsize = pilimg.size
-    pgimg = pg.image.fromstring(raw, imgsize, "RGBA").convert_alpha()  # type: ignore
-    return pg.transform.smoothscale(pgimg, size)
-
-
 def vect2vector(vect: Vect2) -> Vector2:
     """
     将 Vect2 转换为 Vector2.
@@ -101,101 +87,131 @@ def vect2vector(vect: Vect2) -> Vector2:
     return vect if type(vect) is Vector2 else Vector2(vect)
 
 
-def rotate(img: Surface, angle: float, pos: Vect2, relative_pos: Vect2):
+def rotate(
+    img: Surface, angle: float, pos: Vect2, relative_pos: Vect2, cached: bool = True
+):
     """
-    旋转图片.
+    旋转图片. 开启 Perf.rotation_cache 时，角度会按 Perf.rotation_step (较大的图片为 Perf.large_rotation_step) 量化，
+    并复用缓存中的旋转结果.
 
     Args:
         img (Surface): 要旋转的图片.
         angle (float): 旋转角度.
         pos (Vect2): 旋转中心的位置.
         relative_pos (Vect2): 旋转中心相对于图片左上角的位置.
+        cached (bool, optional): 为 False 时总是按原始角度旋转，不使用缓存. 默认为 True.
 
     Returns:
         Surface: 旋转后的图片.
         Rect: 旋转后的图片的矩形区域.
     """
+    if cached and Perf.rotation_cache:
+        rotated_img, angle, (x, y) = rotation_cache.get(img, angle)
+    else:
+        rotated_img = pg.transform.rotozoom(img, -angle, 1)
+        w, h = rotated_img.get_size()
+        x, y = -(w // 2), -(h // 2)
+    # 缓存中的图片裁去了透明的边缘，(x, y) 为其左上角相对于完整旋转结果中心的位置
+    cx, cy = rotation_center(img, angle, pos, relative_pos)
+    rotated_rect = rotated_img.get_rect(topleft=(cx + x, cy + y))
+    return rotated_img, rotated_rect
+
+
+def rotation_center(
+    img: Surface, angle: float, pos: Vect2, relative_pos: Vect2
+) -> tuple[int, int]:
+    """
+    rotate 放置旋转结果时，完整的 rotozoom 结果的中心所在的像素.
+
+    Args:
+        img (Surface): 要旋转的图片.
+        angle (float): 旋转角度.
+        pos (Vect2): 旋转中心的位置.
+        relative_pos (Vect2): 旋转中心相对于图片左上角的位置.
+
+    Returns:
+        tuple[int, int]: 与 get_rect(center=...) 的取整方式相同.
+    """
     pos = vect2vector(pos)
     relative_pos = vect2vector(relative_pos)
     rect = img.get_rect(topleft=pos - relative_pos)
     offset = pos - Vector2(rect.center)
-    rotated_offset = offset.rotate(angle)
-    rotated_center = pos - rotated_offset
-    rotated_img = pg.transform.rotozoom(img, -angle, 1)
-    rotated_rect = rotated_img.get_rect(center=rotated_center)
-    return rotated_img, rotated_rect
+    anchor = Rect(0, 0, 0, 0)
+    anchor.center = pos - offset.rotate(angle)
+    return anchor.x, anchor.y
 
 
-def expand_colors(colors: list[str], num: list[int]) -> list[str]:
+def expand_colors(
+    colors: list[str], num: list[int], rng: Union[None, Random] = None
+) -> list[str]:
     """
     将不重复的颜色及其数量扩展为可重复的列表，每种颜色在列表中出现的次数为其对应的数量，打乱后返回.
 
     Args:
         colors (list[str]): 不重复的颜色列表.
         num (list[int]): 每种颜色对应的数量.
+        rng (Union[None, Random], optional): 随机数生成器. 默认为 None，即 random 模块.
 
     Returns:
         list[str]: 扩展并打乱后的颜色列表.
     """
     expand = list(chain.from_iterable([color] * n for color, n in zip(colors, num)))
-    shuffle(expand)
+    (random if rng is None else rng).shuffle(expand)
     return expand
 
 
-def rand_colors(num: int) -> list[str]:
+def rand_colors(num: int, rng: Union[None, Random] = None) -> list[str]:
     """
     生成不重复的随机颜色列表.
 
     Args:
         num (int): 要生成颜色的数量，1 至 4 之间的整数.
+        rng (Union[None, Random], optional): 随机数生成器. 默认为 None，即 random 模块.
 
     Returns:
         list[str]: 随机生成的颜色列表.
     """
     if 1 <= num <= 4:
         colors = list(Color.pin_colors)
-        shuffle(colors)
+        (random if rng is None else rng).shuffle(colors)
         return colors[0:num]
     else:
         return [Color.black]
 
 
-def rand_num(n: int, fixed_sum: int, upper: bool = True) -> list[int]:
+def rand_num(
+    n: int, fixed_sum: int, upper: bool = True, rng: Union[None, Random] = None
+) -> list[int]:
     """
-    生成具有固定总和且不超过上限的随机数列表.
+    生成具有固定总和且不超过上限的正整数列表，在所有满足条件的列表中均匀抽取.
 
     Args:
         n (int): 要生成的列表的长度.
         fixed_sum (int): 固定总和.
-        upper (bool, optional): 是否要设置上限. 默认为 True.
+        upper (bool, optional): 是否要设置上限，上限为平均值加 2. 默认为 True.
+        rng (Union[None, Random], optional): 随机数生成器. 默认为 None，即 random 模块.
 
     Returns:
         list[int]: 生成的随机数列表.
     """
-    sam = [0] + sample(range(1, fixed_sum), n - 1) + [fixed_sum]
-    sam.sort()
-    num = [sam[i + 1] - sam[i] for i in range(n)]
-    if upper:
-        up = round(fixed_sum / n) + 2
-        while max(num) > up:
-            sam = [0] + sample(range(1, fixed_sum), n - 1) + [fixed_sum]
-            sam.sort()
-            num = [sam[i + 1] - sam[i] for i in range(n)]
-    return num
-
-
-def ordered_colors(level: int, setting) -> list[str]:
+    up = round(fixed_sum / n) + 2 if upper else fixed_sum
+    return bounded_composition(fixed_sum, [(1, up)] * n, rng)
+
+
+def ordered_colors(level: int, setting, rng: Union[None, Random] = None) -> list[str]:
     """
     根据 level 值生成有序的颜色列表.
 
     Args:
         level (int):
         setting (_type_): 设置类实例.
+        rng (Union[None, Random], optional): 随机数生成器. 默认为 None，即 random 模块.
 
     Returns:
         list[str]: 生成的有序颜色列表.
     """
-    x = random()
+    rng = random if rng is None else rng
+    x = rng.random()
     if 0 <= x < (level + 11) / (16 * level):
         num_of_pies = 1
     elif (level + 11) / (16 * level) <= x < (5 * level + 11) / (16 * level):
@@ -204,76 +220,9 @@ def ordered_colors(level: int, setting) -> list[str]:
         num_of_pies = 3
     else:
         num_of_pies = 4
-    colors = rand_colors(num_of_pies)
-    num_of_bullets = rand_num(num_of_pies, setting.pin_num - randint(0, 4))
-    return expand_colors(colors, num_of_bullets)
-
-
-def min_diff(l: list) -> float:
-    """
-    返回列表相邻两项之间的最小差值.
-
-    Args:
-        l (list)
-
-    Returns:
-        float: 最小差值.
-    """
-    l.sort()
-    diff = l[-1]
-    for i in range(len(l) - 1):
-        if l[i + 1] - l[i] < diff:
-            diff = l[i + 1] - l[i]
-    return diff
-
-
-def read_best_score() -> int:
-    """
-    读取最高得分.
-
-    Returns:
-        int: 读取的最高得分.
-    """
-    data_path = get_path("data")
-    best_score_path = get_path("data", "best_score.json")
-    if not os.path.exists(data_path):
-        os.mkdir(data_path)
-    if not os.path.exists(best_score_path):
-        with open(best_score_path, "w", encoding="utf-8") as f:
-            json.dump({"best_score": 0}, f, indent=4)
-        return 0
-    with open(best_score_path, "r", encoding="utf-8") as f:
-        return json.load(f)["best_score"]
-
-
-def rewrite_best_score(score: int, best_score: int):
-    """
-    重写最高得分.
-
-    Args:
-        score (int): 当前得分，若高于最高得分则重写.
-        best_score (int): 最高得分.
-    """
-    if score > best_score:
-        with open(get_path("data", "best_score.json"), "w", encoding="utf-8") as f:
-            json.dump({"best_score": score}, f, indent=4)
-
-
-def get_back() -> tuple[Surface, Rect]:
-    """
-    获取背景图片，并随机地将其旋转一定角度，缩放以填满可视区域.
-
-    Returns:
-        Surface: 背景图片.
-        Rect: 背景图片的矩形区域.
-    """
-    s = max(Grid.window_size[0], Grid.window_size[1])
-    background = get_image("background.png", (s, s))
-    theta = random() * 360
-    scale = random() + abs(cos(radians(theta))) + abs(sin(radians(theta)))
-    back = pg.transform.rotozoom(background, theta, scale)
-    back_rect = back.get_rect(center=Grid.window_size / 2)
-    return back, back_rect
+    colors = rand_colors(num_of_pies, rng)
+    num_of_bullets = rand_num(num_of_pies, setting.pin_num - rng.randint(0, 4), rng=rng)
+    return expand_colors(colors, num_of_bullets, rng)
 
 
 def quit_game():
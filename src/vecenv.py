@@ -0,0 +1,512 @@
+"""
+同时推进多局游戏的批量环境，供自动化的策略(agent)进行压力测试与难度测试.
+
+规则与 sim.Simulation 相同，每局的随机数同样取自由种子派生的 RandomStreams，相同的种子生成相同的 level.
+各局的圆盘角度、旋转速度、飞镖位置及圆盘上物体的种类与角度都存放在 NumPy 数组中，每一步对所有局一起计算:
+
+- 飞行中的飞镖总是沿窗口中线竖直向上，它与圆盘上一个物体是否相交只取决于飞镖的高度与物体的种类、角度.
+  预先按 collision.Texture 对每种物体、每个量化的角度求出发生碰撞的最高位置(飞镖继续上升时一直相交)，
+  之后碰撞检测只需查表与比较. 扇形覆盖整个圆盘，查表只判断飞镖是否已接近圆盘，接近后再逐局用 collision.overlaps 计算.
+- 与 Simulation.sweep 相同，每隔 Grid.sweep_step 像素检测一次，检测到碰撞时二分到发生碰撞的像素;
+  同一位置多个物体相交时后加入圆盘的物体优先，障碍物先于扇形.
+- 扎入、掉落、道具与换 level 等只发生在少数局上的事件逐局处理.
+
+角度量化为 ANGLE_RES 度，物体恰好擦过飞镖边缘时结果可能与 Simulation 不同.
+
+    env = VecEnv(1024, seed=0)
+    obs = env.reset()
+    while not obs["over"].all():
+        obs, reward, done, events = env.step(obs["pin_mode"] == STILL)
+"""
+
+from math import atan2, degrees, floor
+from random import Random
+
+import numpy as np
+
+from collision import OPAQUE, PAD, REACH, Texture, get_shapes, overlaps
+from config import DROP, SHOOT, STILL, Color, Grid, Setting
+from sim import (
+    BONUS,
+    GAME_OVER,
+    LEVEL_UP,
+    MISSED,
+    NEXT_PIN,
+    PRICKED,
+    Level,
+    PieState,
+    PinState,
+    RandomStreams,
+)
+from typing_lib import *
+
+ANGLE_RES = 0.01  # 碰撞表的角度分辨率，度
+MAX_ITEMS = 32  # 圆盘上物体数的上限: 障碍物 8 + 道具 3 + 扎入的飞镖
+MAX_PINS = 16  # 一个 level 的飞镖数上限
+
+# 圆盘上物体的种类，-1 表示空位
+KINDS = ("pin", "balk", "heart", "star")
+PIN, BALK, HEART, STAR = range(len(KINDS))
+EMPTY = -1
+COLORS = tuple(Color.pin_colors)
+EVENTS = (PRICKED, MISSED, BONUS, NEXT_PIN, LEVEL_UP, GAME_OVER)
+
+
+class HitTable:
+    """
+    飞镖与圆盘上物体的碰撞表，只依赖于贴图，所有环境共享.
+    """
+
+    def __init__(self):
+        self.shapes = shapes = get_shapes()
+        spans = shapes.pin
+        pin = PinState(COLORS[0])
+        pin.mode = SHOOT
+        self.left = pin.left
+        self.start_top = pin.top
+        cx, cy = Grid.center
+        # 飞镖高于 top_max 时不可能发生碰撞(与 collision.collide 相同);
+        # 高于 pie_top 时不透明像素都在圆盘以外(留出 PAD 的余量)，不可能碰到扇形
+        self.top_max = floor(cy + REACH)
+        xs = shapes.pin_xs + self.left + 0.5 - cx
+        ys = shapes.pin_ys + 0.5 - cy
+        radius = Grid.pie_radius + 1 + PAD
+        inner = np.abs(xs) <= radius
+        self.pie_top = floor((np.sqrt(radius**2 - xs[inner] ** 2) - ys[inner]).max())
+        # 扇形覆盖整个圆盘，飞镖低于 pie_low 之前一定已经碰到扇形
+        self.pie_low = self.pie_top - 3 * PAD
+        self.pies: dict[int, list[Texture]] = {}
+
+        # 飞镖不透明像素相对于竖直向下方向的最大偏角，飞镖在 pie_low 时最大，与 collide 中的 beta 相同
+        half_width = max(cx - pin.left - spans.x0, pin.left + spans.x1 - cx)
+        beta = degrees(atan2(half_width, self.pie_low + spans.first - cy)) + 1e-6
+        # 飞镖每一列不透明像素的最高与最低行，各列的不透明像素都是连续的
+        width = spans.x1
+        col_min = np.full(width, len(spans.rows))
+        col_max = np.full(width, -1)
+        np.minimum.at(col_min, shapes.pin_xs, shapes.pin_ys)
+        np.maximum.at(col_max, shapes.pin_xs, shapes.pin_ys)
+        x0, x1 = self.left + spans.x0, self.left + spans.x1
+        heights = self.top_max + 1 - self.pie_low
+
+        # top[kind, bin]: 物体在该角度时与飞镖相交的最高位置，不相交为 -1.
+        # 对每种物体、每个角度，相交的位置从该值一直延伸到 pie_low，因此只需记录最高位置
+        bins = round(360 / ANGLE_RES)
+        self.top = np.full((len(KINDS), bins), -1, dtype=np.int32)
+        for kind, name in enumerate(KINDS):
+            texture = shapes.textures[name]
+            for b in range(bins):
+                angle = (b + 0.5) * ANGLE_RES
+                # 物体的偏角范围与飞镖不相交时不可能碰撞
+                if min(angle, 360 - angle) > texture.spread + beta + ANGLE_RES:
+                    continue
+                rect, params = texture.place(angle)
+                a, z = max(rect.left, x0), min(rect.right, x1)
+                if a >= z:
+                    continue
+                # 旋转后的物体在飞镖各列上的不透明像素
+                dy, dx = np.mgrid[0 : rect.h, a - rect.x : z - rect.x]
+                dx, dy = dx.ravel(), dy.ravel()
+                opaque = texture.sample(params, dx, dy) > OPAQUE
+                col = dx[opaque] + rect.x - self.left
+                y = dy[opaque] + rect.y
+                # 飞镖上边界在 [y - col_max, y - col_min] 内时与该像素重叠，统计各高度是否有重叠
+                lo = np.clip(y - col_max[col] - self.pie_low, 0, heights)
+                hi = np.clip(y - col_min[col] + 1 - self.pie_low, 0, heights)
+                count = np.zeros(heights + 1, dtype=np.int32)
+                np.add.at(count, lo, 1)
+                np.add.at(count, hi, -1)
+                covered = np.cumsum(count[:-1]) > 0
+                if not covered[0]:
+                    continue
+                gaps = np.flatnonzero(~covered)
+                self.top[kind, b] = (
+                    self.pie_low + (gaps[0] if len(gaps) else heights) - 1
+                )
+
+    def pie_textures(self, count: int) -> list[Texture]:
+        """
+        圆盘分为 count 个扇形时各扇形的 Texture，与 sim.Level 中扇形的划分相同.
+        """
+        if count not in self.pies:
+            degree = 360 / count
+            self.pies[count] = [
+                self.shapes.texture(PieState(COLORS[0], i * degree, degree))
+                for i in range(count)
+            ]
+        return self.pies[count]
+
+
+_table: Union[None, HitTable] = None
+
+
+def get_table() -> HitTable:
+    """
+    获取共享的碰撞表，第一次调用时生成.
+    """
+    global _table
+    if _table is None:
+        _table = HitTable()
+    return _table
+
+
+class VecEnv:
+    """
+    同时进行的 n 局游戏. 每次 step 对所有局推进 Setting.step，已结束的局保持不变，直到被 reset.
+    """
+
+    def __init__(self, n: int, seed: Union[None, int] = None):
+        """
+        Args:
+            n (int): 游戏局数.
+            seed (Union[None, int], optional): 生成各局种子的总种子. 默认为 None，不可复现.
+        """
+        self.n = n
+        self.table = get_table()
+        self.seeds = Random(seed)
+        self.delta = Setting.step
+        self.distance = round(Setting.shoot_speed * self.delta)  # 一步飞行的距离
+        # 每步检测碰撞的位置: 与 Simulation.sweep 相同，每隔 Grid.sweep_step 像素一次
+        self.samples = list(range(Grid.sweep_step, self.distance, Grid.sweep_step))
+        self.samples.append(self.distance)
+
+        self.seed = np.zeros(n, dtype=np.uint64)
+        self.level = np.zeros(n, dtype=np.int32)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.hearts = np.zeros(n, dtype=np.int32)
+        self.over = np.ones(n, dtype=bool)
+        self.steps = np.zeros(n, dtype=np.int32)
+        self.rotation_speed = np.zeros(n)
+        self.disc_angle = np.zeros(n)
+        self.pin_mode = np.full(n, STILL, dtype=np.int8)
+        self.pin_top = np.zeros(n, dtype=np.int32)
+        self.pin_left = np.zeros(n, dtype=np.int32)
+        self.pin_color = np.zeros(n, dtype=np.int8)
+        # 剩余飞镖的颜色，从末尾取出
+        self.queue = np.zeros((n, MAX_PINS), dtype=np.int8)
+        self.queue_len = np.zeros(n, dtype=np.int32)
+        # 圆盘上的物体，按加入的顺序排列. 角度相对于圆盘，实际角度为 (item_angle + disc_angle) % 360
+        self.item_kind = np.full((n, MAX_ITEMS), EMPTY, dtype=np.int8)
+        self.item_angle = np.zeros((n, MAX_ITEMS))
+        self.item_count = np.zeros(n, dtype=np.int32)
+        self.pie_colors = np.zeros((n, 4), dtype=np.int8)
+        self.pie_count = np.ones(n, dtype=np.int32)
+
+        self.rng: list[Union[None, RandomStreams]] = [None] * n
+        self.upcoming: list[Union[None, Level]] = [None] * n
+        self.events = {name: np.zeros(n, dtype=bool) for name in EVENTS}
+
+    def reset(
+        self,
+        games: Union[None, Sequence[int], np.ndarray] = None,
+        seeds: Union[None, Sequence[int]] = None,
+    ) -> dict[str, np.ndarray]:
+        """
+        开始新的一局.
+
+        Args:
+            games (Union[None, Sequence[int], np.ndarray], optional): 要重新开始的局的下标或布尔掩码. 默认为 None，即所有局.
+            seeds (Union[None, Sequence[int]], optional): 各局的种子，与 Simulation(seed=...) 相同. 默认为 None，由总种子生成.
+
+        Returns:
+            dict[str, np.ndarray]: 所有局的观测，见 observe.
+        """
+        if games is None:
+            games = np.arange(self.n)
+        games = np.asarray(games)
+        if games.dtype == bool:
+            games = np.flatnonzero(games)
+        if seeds is None:
+            seeds = [self.seeds.getrandbits(64) for _ in games]
+        for g, seed in zip(games.tolist(), seeds):
+            self.seed[g] = seed
+            self.rng[g] = RandomStreams(seed)
+            self.upcoming[g] = None
+            self.level[g] = 1
+            self.load_level(g)
+        self.score[games] = 0
+        self.hearts[games] = Setting.init_hp
+        self.over[games] = False
+        self.steps[games] = 0
+        return self.observe()
+
+    def load_level(self, g: int):
+        """
+        开始第 g 局的当前 level，与 Simulation.init_level 相同: 优先使用已生成的 level，随后生成下一个.
+        """
+        level = self.upcoming[g]
+        number = int(self.level[g])
+        if level is None or level.number != number:
+            level = Level(number, self.rng[g].level)
+        self.rotation_speed[g] = level.setting.rotation_speed
+        colors = [COLORS.index(c) for c in level.colors]
+        self.queue[g, : len(colors)] = colors
+        self.queue_len[g] = len(colors)
+        self.disc_angle[g] = 0
+        self.item_kind[g] = EMPTY
+        props = [item for item in level.disc.items if item.kind != "pie"]
+        for i, item in enumerate(props):
+            self.item_kind[g, i] = KINDS.index(item.kind)
+            self.item_angle[g, i] = item.angle
+        self.item_count[g] = len(props)
+        pies = [COLORS.index(c) for c in level.disc.diff_colors]
+        self.pie_colors[g, : len(pies)] = pies
+        self.pie_count[g] = len(pies)
+        self.upcoming[g] = Level(number + 1, self.rng[g].level)
+        self.new_pin(np.array([g]))
+
+    def new_pin(self, games: np.ndarray):
+        """
+        从剩余飞镖的末尾取出下一支，放到发射位置.
+        """
+        self.queue_len[games] -= 1
+        self.pin_color[games] = self.queue[games, self.queue_len[games]]
+        self.pin_mode[games] = STILL
+        self.pin_top[games] = self.table.start_top
+        self.pin_left[games] = self.table.left
+
+    def next_pin(self, games: np.ndarray):
+        """
+        换上下一支飞镖，没有剩余的飞镖时进入下一 level. 与 Simulation.next_pin 相同.
+        """
+        more = self.queue_len[games] > 0
+        self.new_pin(games[more])
+        self.events[NEXT_PIN][games[more]] = True
+        for g in games[~more].tolist():
+            self.level[g] += 1
+            self.load_level(g)
+            self.events[LEVEL_UP][g] = True
+
+    def plus_score(self, g: int):
+        self.score[g] += self.rng[g].score.randint(10, 15)
+
+    def observe(self) -> dict[str, np.ndarray]:
+        """
+        所有局的状态，均为副本.
+
+        Returns:
+            dict[str, np.ndarray]: 各项的第一维为局. item_kind 为 KINDS 中的下标(-1 为空位)，
+            item_angle 为物体的实际角度(相对于竖直向下方向)，颜色为 Color.pin_colors 中的下标.
+        """
+        return {
+            "level": self.level.copy(),
+            "score": self.score.copy(),
+            "hearts": self.hearts.copy(),
+            "over": self.over.copy(),
+            "rotation_speed": self.rotation_speed.copy(),
+            "disc_angle": self.disc_angle.copy(),
+            "pin_mode": self.pin_mode.copy(),
+            "pin_top": self.pin_top.copy(),
+            "pin_color": self.pin_color.copy(),
+            "pins_left": self.queue_len.copy(),
+            "item_kind": self.item_kind.copy(),
+            "item_angle": (self.item_angle + self.disc_angle[:, None]) % 360,
+            "pie_colors": self.pie_colors.copy(),
+            "pie_count": self.pie_count.copy(),
+        }
+
+    def step(
+        self, shoot: Union[None, np.ndarray] = None
+    ) -> tuple[dict[str, np.ndarray], np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+        """
+        所有局推进一个时间步长，与先调用 Simulation.shoot 再调用 Simulation.step 相同.
+
+        Args:
+            shoot (Union[None, np.ndarray], optional): 各局是否发射飞镖，只对静止的飞镖有效. 默认为 None，都不发射.
+
+        Returns:
+            tuple: (观测, 各局得分的增加量, 各局是否已结束, 各局这一步中发生的事件).
+            事件以 sim 中的事件名为键，值为布尔数组.
+        """
+        for flags in self.events.values():
+            flags[:] = False
+        live = ~self.over
+        if shoot is not None:
+            fire = np.asarray(shoot, dtype=bool) & live & (self.pin_mode == STILL)
+            self.pin_mode[fire] = SHOOT
+        score = self.score.copy()
+        self.steps[live] += 1
+
+        gone = np.flatnonzero(live & (self.pin_top >= Grid.window_size[1]))
+        if len(gone):
+            self.next_pin(gone)
+        dead = live & (self.hearts <= 0)
+        self.over[dead] = True
+        self.events[GAME_OVER][dead] = True
+
+        active = live & ~dead
+        theta = self.rotation_speed * self.delta
+        drop = active & (self.pin_mode == DROP)
+        self.pin_top[drop] += round(Setting.drop_speed * self.delta)
+        self.pin_left[drop] += round(Setting.drop_speed * self.delta) // 2
+        # 这一步结束时圆盘整体旋转 theta 的局，扎入最后一支飞镖而换了 level 的局除外
+        rotate = active.copy()
+        shooting = np.flatnonzero(active & (self.pin_mode == SHOOT))
+        if len(shooting):
+            self.sweep(shooting, theta, rotate)
+        self.disc_angle[rotate] = (self.disc_angle[rotate] + theta[rotate]) % 360
+        events = {name: flags.copy() for name, flags in self.events.items()}
+        return self.observe(), self.score - score, self.over.copy(), events
+
+    def hits(
+        self, games: np.ndarray, offsets: np.ndarray, theta: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        检测飞镖飞行 offsets 像素时与圆盘上物体及扇形的碰撞，圆盘同时按比例旋转.
+
+        Args:
+            games (np.ndarray): 局的下标，形状 (P,).
+            offsets (np.ndarray): 本步中已经飞行的距离，形状 (J,).
+            theta (np.ndarray): 各局本步旋转的角度，形状 (P,).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: 形状 (P, J) 的数组，前者为相交的物体中最后加入圆盘的下标(没有为 -1)，
+            后者为是否可能碰到扇形.
+        """
+        table = self.table
+        top = self.pin_top[games, None] - offsets  # (P, J)
+        disc = self.disc_angle[games, None] + theta[:, None] * offsets / self.distance
+        # 只计算这些局中用到的列，之后的列都是空位
+        m = max(int(self.item_count[games].max()), 1)
+        kind = self.item_kind[games, :m]  # (P, M)
+        angle = (self.item_angle[games, None, :m] + disc[:, :, None]) % 360
+        bins = (angle / ANGLE_RES).astype(np.intp) % table.top.shape[1]
+        reach = table.top[np.maximum(kind, 0)[:, None, :], bins]
+        hit = (kind[:, None, :] != EMPTY) & (top[:, :, None] <= reach)  # (P, J, M)
+        last = m - 1 - np.argmax(hit[:, :, ::-1], axis=2)
+        last[~hit.any(axis=2)] = -1
+        return last, top <= table.pie_top
+
+    def sweep(self, games: np.ndarray, theta: np.ndarray, rotate: np.ndarray):
+        """
+        飞行中的飞镖向上飞行一步，与 Simulation.sweep 相同.
+        """
+        table = self.table
+        start = self.pin_top[games]
+        far = start - self.distance - Grid.center[1] > REACH  # 整段路径都碰不到圆盘
+        self.pin_top[games[far]] -= self.distance
+        games = games[~far]
+        if not len(games):
+            return
+        theta_g = theta[games]
+        offsets = np.array(self.samples)
+        item, pie = self.hits(games, offsets, theta_g)
+        touched = ((item >= 0) | pie).any(axis=1)
+        self.pin_top[games[~touched]] -= self.distance
+        games, theta_g = games[touched], theta_g[touched]
+        if not len(games):
+            return
+
+        # 少数在这一步发生碰撞的局，逐局处理; 先一次算出每个像素的结果
+        offsets = np.arange(1, self.distance + 1)
+        item, pie = self.hits(games, offsets, theta_g)
+        for p, g in enumerate(games.tolist()):
+            self.resolve(
+                g, float(theta_g[p]), item[p].tolist(), pie[p].tolist(), rotate
+            )
+
+    def resolve(
+        self, g: int, theta: float, item: list[int], pie: list[bool], rotate: np.ndarray
+    ):
+        """
+        按检测的位置依次处理第 g 局飞镖在这一步中的碰撞，检测与二分的位置与 Simulation.sweep 相同.
+
+        Args:
+            g (int): 局的下标.
+            theta (float): 本步旋转的角度.
+            item (list[int]): 飞行 1 ~ distance 像素时相交的物体下标.
+            pie (list[bool]): 飞行 1 ~ distance 像素时是否可能碰到扇形.
+            rotate (np.ndarray): 本步结束时是否旋转圆盘，换了 level 时清除.
+        """
+        start = int(self.pin_top[g])
+        count = int(self.pie_count[g])
+        textures = self.table.pie_textures(count)
+        shapes = self.table.shapes
+
+        def disc(offset: int) -> float:
+            return self.disc_angle[g] + theta * offset / self.distance
+
+        sectors: dict[int, int] = (
+            {}
+        )  # 各位置上碰到的扇形，-1 为没有; 与道具无关，击中道具后仍然有效
+
+        def contact(offset: int) -> Union[None, tuple[int, int]]:
+            # 飞行 offset 像素时碰到的物体: (物体下标, -1) 或 (-1, 扇形下标)，与 collision.collide 的顺序相同
+            index = item[offset - 1]
+            if index >= 0:
+                return index, -1
+            if not pie[offset - 1]:
+                return None
+            if offset not in sectors:
+                left, top = int(self.pin_left[g]), start - offset
+                sectors[offset] = next(
+                    (
+                        sector
+                        for sector, texture in enumerate(textures)
+                        if overlaps(shapes, texture, disc(offset), left, top)
+                    ),
+                    -1,
+                )
+            return None if sectors[offset] < 0 else (-1, sectors[offset])
+
+        clear = 0  # 最后一个没有碰撞的位置
+        while clear < self.distance:
+            sample = min(clear + Grid.sweep_step, self.distance)
+            hi, clear = clear, sample
+            if contact(sample) is None:
+                continue
+            lo = sample  # lo 处发生碰撞，hi 处没有
+            while lo - hi > 1:
+                mid = (lo + hi + 1) // 2
+                if contact(mid) is None:
+                    hi = mid
+                else:
+                    lo = mid
+            offset = lo
+            top = start - offset
+            index, sector = contact(offset)
+            if index < 0:
+                self.hit_pie(g, top, disc(offset), sector, rotate)
+                return
+            kind = self.item_kind[g, index]
+            if kind in (HEART, STAR):
+                # 击中道具后从上一个没有碰撞的位置继续检测，击中的像素及之后的碰撞不再包含该道具
+                self.item_kind[g, index] = EMPTY
+                self.events[BONUS][g] = True
+                if kind == HEART:
+                    self.hearts[g] = min(self.hearts[g] + 1, Setting.highest_hp)
+                else:
+                    self.plus_score(g)
+                rest = np.arange(offset, self.distance + 1)
+                found, entered = self.hits(np.array([g]), rest, np.array([theta]))
+                item[offset - 1 :] = found[0].tolist()
+                pie[offset - 1 :] = entered[0].tolist()
+                clear = offset - 1
+                continue
+            self.miss(g, top)
+            return
+        self.pin_top[g] = start - self.distance
+
+    def hit_pie(self, g: int, top: int, disc: float, sector: int, rotate: np.ndarray):
+        """
+        飞镖碰到第 sector 个扇形: 同色时扎入并得分，否则掉落.
+        """
+        if self.pie_colors[g, sector] != self.pin_color[g]:
+            self.miss(g, top)
+            return
+        index = self.item_count[g]
+        self.item_kind[g, index] = PIN
+        self.item_angle[g, index] = -disc % 360  # 扎入时位于竖直向下方向
+        self.item_count[g] += 1
+        self.events[PRICKED][g] = True
+        self.plus_score(g)
+        level = self.level[g]
+        self.next_pin(np.array([g]))
+        if self.level[g] != level:
+            rotate[g] = False  # 新的圆盘从 0° 开始
+
+    def miss(self, g: int, top: int):
+        self.pin_top[g] = top
+        self.pin_mode[g] = DROP
+        self.hearts[g] -= 1
+        self.events[MISSED][g] = True
@@ -1,16 +1,25 @@
-import os
-from random import randint
+import threading
+from time import perf_counter
 
 import pygame as pg
-from pygame.sprite import collide_mask
 
-from config import DROP, PRICK, SHOOT, STILL, Color, Grid, Setting
+from assets import music, sound_bank
+from config import Color, Grid, Perf
+from profiler import ROTATE, profiler
+from replay import Recorder
+from scores import score_store
+from sim import BONUS, GAME_OVER, LEVEL_UP, MISSED, NEXT_PIN, DiscState, Simulation
 from typing_lib import *
-from utils import get_image, ordered_colors, read_best_score, rewrite_best_score
 from widgets import *
 
 
 class View:
+    """
+    界面. layers 按绘制顺序(由下到上)列出保存控件的属性名，替换属性即替换所绘制的控件.
+    """
+
+    layers: tuple[str, ...] = ()
+
     def __init__(self, screen: Surface):
         self.screen = screen
 
@@ -18,23 +27,17 @@ class View:
 
     def on_mousedown(self, event: Event): ...
 
-    def get_widgets(self) -> Iterator[Union[Sprite, Group]]:
-        for v in self.__dict__.values():
-            if isinstance(v, (Sprite, Group)):
-                yield v
-
-    def draw(self):
-        for widget in self.get_widgets():
-            widget.draw()  # type: ignore
+    def get_widgets(self) -> list[Union[Sprite, Group]]:
+        return [getattr(self, name) for name in self.layers]
 
 
 class MenuView(View):
+    layers = ("icon", "start_button", "setting_button", "quit_button")
+
     def __init__(self, screen: Surface):
         super().__init__(screen)
-        self.icon_img = get_image("color_hit_icon.png", (300, 300))
-        self.icon_rect = self.icon_img.get_rect(
-            centerx=Grid.window_size[0] / 2, centery=200
-        )
+        icon_pos = (Grid.window_size[0] / 2 - 150, 50)
+        self.icon = Label(screen, icon_pos, (300, 300), img_name="color_hit_icon.png")
         self.start_button = Button(screen, Grid.start_pos, Grid.start_size, "PLAY")
 
         setting_pos = Grid.start_pos + Vector2(0, 90)
@@ -43,8 +46,7 @@ class MenuView(View):
         quit_pos = Grid.start_pos + Vector2(0, 180)
         self.quit_button = Button(screen, quit_pos, Grid.start_size, "QUIT")
 
-        pg.mixer.music.load(os.path.join("sounds", "happy_tune.wav"))
-        pg.mixer.music.set_volume(0.15)
+        music.load("happy_tune.wav", 0.15)
 
     def on_mousedown(self, event: Event):
         if event.button == pg.BUTTON_LEFT:
@@ -57,10 +59,6 @@ class MenuView(View):
         self.setting_button.update()
         self.quit_button.update()
 
-    def draw(self):
-        self.screen.blit(self.icon_img, self.icon_rect)
-        super().draw()
-
 
 def group_bullets(screen: Surface, colors: list[str]) -> OrderedGruop:
     bullets = OrderedGruop(screen)
@@ -70,47 +68,47 @@ def group_bullets(screen: Surface, colors: list[str]) -> OrderedGruop:
     return bullets
 
 
-def group_heart_label(screen: Surface) -> OrderedGruop:
+def group_heart_label(screen: Surface, num: int) -> OrderedGruop:
     hearts = OrderedGruop(screen)
-    for i in range(2):
+    for i in range(num):
         pos = (Grid.hearts_pos[0], Grid.hearts_pos[1] + i * Grid.heart_size[0])
         hearts.add(Label(screen, pos, Grid.heart_size, img_name="heart.png"))
     return hearts
 
 
-def check_hit(pin: Pin, disc: Disc) -> Union[None, bool, Bonus]:
+class GameView(View):
     """
-    检测碰撞.
-
-    Args:
-        pin (Pin)
-        disc (Disc)
-
-    Returns:
-        Union[None, bool, Bonus]: 返回 None 表示还未发生碰撞，返回 True 表示发生碰撞且没有掉落，返回 False 表示发生碰撞且掉落，返回 Bonus 对象表示与该实例发生碰撞.
+    游戏界面. 游戏规则由 sim.Simulation 处理，这里只负责输入、绘制与音效.
     """
-    collision = None
-    for sprite in disc:
-        if collide_mask(pin, sprite):
-            collision = sprite
-            break
-    if type(collision) is Pie:
-        if pin.color == collision.color:
-            return True
-        else:
-            return False
-    elif isinstance(collision, (Pin, Balk)):
-        return False
-    elif isinstance(collision, Bonus):
-        return collision
-
 
-class GameView(View):
-    def __init__(self, screen: Surface):
+    layers = (
+        "hearts",
+        "best_score_board",
+        "score_board",
+        "pause_button",
+        "pin",
+        "disc",
+        "bullets",
+    )
+
+    def __init__(
+        self, screen: Surface, seed: Union[None, int] = None, record: bool = True
+    ):
+        """
+        Args:
+            screen (Surface): 窗口.
+            seed (Union[None, int], optional): 游戏的种子. 默认为 None，随机选取.
+            record (bool, optional): 是否记录本局的得分与输入，回放时为 False. 默认为 True.
+        """
         super().__init__(screen)
-        self.setting = Setting()
-        self.hearts = group_heart_label(screen)
-        self.best_score = read_best_score()
+        self.sim = Simulation(seed=seed)
+        self.record = record
+        self.recorder: Union[None, Recorder] = None
+        if record and Perf.record_replays:
+            self.recorder = Recorder(self.sim.seed)
+        self.hearts = group_heart_label(screen, self.sim.hearts)
+        self.best_score = score_store.best
+        self.play_time: float = 0  # 游戏时长，不含暂停，s
         self.best_score_board = Label(
             screen,
             Grid.best_score_pos,
@@ -120,9 +118,8 @@ class GameView(View):
         self.best_score_board.set_style(
             font="TabletGothicBold.OTF", fs=16, fc=Color.aqua
         )
-        self.score = 0
         self.score_board = Label(
-            screen, Grid.score_pos, Grid.score_size, f"{self.score}"
+            screen, Grid.score_pos, Grid.score_size, f"{self.sim.score}"
         )
         self.score_board.set_style(font="TabletGothicBold.OTF", fs=20)
 
@@ -136,19 +133,24 @@ class GameView(View):
             callback=self.switch_pause,
         )
 
-        self.level = 1
+        self.prefetch: Union[None, threading.Thread] = None
+        # 后台准备好的 (圆盘状态, 圆盘)
+        self.prefetched: Union[None, tuple[DiscState, Disc]] = None
         self.init_level()
 
-        pg.mixer.music.load(os.path.join("sounds", "jazz.wav"))
-        pg.mixer.music.set_volume(0.2)
-        self.shoot_sound = pg.mixer.Sound(os.path.join("sounds", "shoot.wav"))
-        self.shoot_sound.set_volume(0.2)
-        self.hit_sound = pg.mixer.Sound(os.path.join("sounds", "metal_hit.wav"))
-        self.hit_sound.set_volume(0.2)
-        self.bonus_sound = pg.mixer.Sound(os.path.join("sounds", "bonus.wav"))
-        self.bonus_sound.set_volume(0.4)
-        self.win_sound = pg.mixer.Sound(os.path.join("sounds", "level_win.wav"))
-        self.win_sound.set_volume(0.4)
+        music.load("jazz.wav", 0.2)
+        self.shoot_sound = sound_bank.get("shoot.wav")
+        self.hit_sound = sound_bank.get("metal_hit.wav")
+        self.bonus_sound = sound_bank.get("bonus.wav")
+        self.win_sound = sound_bank.get("level_win.wav")
+
+    @property
+    def score(self) -> int:
+        return self.sim.score
+
+    @property
+    def level(self) -> int:
+        return self.sim.level
 
     def switch_pause(self):
         if self.pause:
@@ -159,83 +161,177 @@ class GameView(View):
             self.pause_button.update(img_name="go_on.png")
 
     def init_level(self):
-        if self.level > 1:
-            self.win_sound.play()
-        self.setting.change_speed()
-        self.colors = ordered_colors(self.level, self.setting)
-        self.pin = Pin(self.screen, self.colors[-1])
-        self.disc = Disc(self.screen, self.colors, self.level)
-        for bonus in self.disc.bonuses:
-            if type(bonus) is Heart:
-                bonus.set_bonusfunc(self.plus_one_heart)
-            elif type(bonus) is Star:
-                bonus.set_bonusfunc(self.plus_score)
-        self.bullets = group_bullets(self.screen, self.colors)
-        self.colors.pop()
-
-    def plus_one_heart(self):
-        num = len(self.hearts)
-        if num < 3:
+        """
+        根据新 level 的状态创建飞镖、圆盘及剩余飞镖的显示.
+        圆盘优先使用上一个 level 期间在后台准备好的. 下一个 level 的圆盘从下一帧开始准备，
+        以免后台线程与切换 level 的这一帧争抢 CPU.
+        """
+        self.pin = Pin(self.screen, self.sim.pin)
+        if self.prefetch is not None:
+            self.prefetch.join()  # 通常早已完成
+        if self.prefetched is not None and self.prefetched[0] is self.sim.disc:
+            self.disc = self.prefetched[1]
+        else:
+            self.disc = Disc(self.screen, self.sim.disc)
+        self.prefetch = self.prefetched = None
+        self.bullets = group_bullets(
+            self.screen, self.sim.colors + [self.sim.pin.color]
+        )
+
+    def prefetch_disc(self):
+        """
+        在后台线程中为下一个 level 创建圆盘并合成其图片，切换 level 时只需替换.
+        """
+        state = self.sim.upcoming.disc
+
+        def build():
+            disc = Disc(self.screen, state)
+            if Perf.composite_disc:
+                disc.bake()
+            self.prefetched = (state, disc)
+
+        self.prefetch = threading.Thread(
+            target=build, name="level-prefetch", daemon=True
+        )
+        self.prefetch.start()
+
+    def save_record(self):
+        """
+        记录本局的得分、到达的 level 与游戏时长，并保存本局的输入，写入磁盘在后台线程中完成.
+        """
+        if not self.record:
+            return
+        score_store.record(self.sim.score, self.sim.level, self.play_time)
+        if self.recorder is not None:
+            self.recorder.save(self.sim.score, self.sim.level)
+
+    def sync_hearts(self):
+        while len(self.hearts) > self.sim.hearts:
+            self.hearts.pop_widget()
+        while len(self.hearts) < self.sim.hearts:
+            num = len(self.hearts)
             pos = (Grid.hearts_pos[0], Grid.hearts_pos[1] + num * Grid.heart_size[0])
             self.hearts.add(
                 Label(self.screen, pos, Grid.heart_size, img_name="heart.png")
             )
 
-    def plus_score(self):
-        self.score += randint(10, 15)
-
-    def on_keydown(self, event: Event):
-        if not self.pause and event.key == pg.K_SPACE and self.pin.mode == STILL:
+    def shoot(self):
+        if not self.pause and self.sim.shoot():
+            if self.recorder is not None:
+                self.recorder.shoot()
             self.shoot_sound.play()
-            self.pin.mode = SHOOT
             self.bullets.pop_widget()
 
+    def on_keydown(self, event: Event):
+        if event.key == pg.K_SPACE:
+            self.shoot()
+
     def on_mousedown(self, event: Event):
         if event.button == pg.BUTTON_LEFT:
             click = self.pause_button.check_click(event)
-            if not click and not self.pause and self.pin.mode == STILL:
-                self.shoot_sound.play()
-                self.pin.mode = SHOOT
-                self.bullets.pop_widget()
-
-    def next_pin(self):
-        if len(self.colors) > 0:
-            self.pin = Pin(self.screen, self.colors.pop())
-        else:
-            self.level += 1
-            self.init_level()
+            if not click:
+                self.shoot()
 
     def update(self, past_sec: float) -> bool:
         if self.pause:
             self.pause_button.update()
             return False
-        else:
-            if self.pin.rect.top >= Grid.window_size[1]:
-                self.next_pin()
-
-            if len(self.hearts):
-                if self.pin.mode == SHOOT:
-                    collision = check_hit(self.pin, self.disc)
-                    if collision is True:
-                        self.pin.mode = PRICK
-                        self.disc.add(self.pin)
-                        self.plus_score()
-                        self.next_pin()
-                    elif collision is False:
-                        self.pin.mode = DROP
-                        self.hit_sound.play()
-                        self.hearts.pop_widget()
-                    elif isinstance(collision, Bonus):
-                        self.bonus_sound.play()
-                        collision.on_hit()
-
-                self.pin.update(past_sec, self.setting)
-                self.disc.update(past_sec, self.setting)
-                self.score_board.update(f"{self.score}")
-                self.hearts.update()
-                self.bullets.update()
-                self.pause_button.update()
-                return False
-            else:
-                rewrite_best_score(self.score, self.best_score)
-                return True
+
+        self.play_time += past_sec
+        if self.recorder is not None:
+            self.recorder.frame(past_sec)
+        events = self.sim.advance(past_sec)
+        if GAME_OVER in events:
+            self.save_record()
+            return True
+        if MISSED in events:
+            self.hit_sound.play()
+        if BONUS in events:
+            self.bonus_sound.play()
+        if LEVEL_UP in events:
+            self.win_sound.play()
+            self.init_level()
+        elif NEXT_PIN in events:
+            self.pin = Pin(self.screen, self.sim.pin)
+        elif self.prefetch is None:
+            self.prefetch_disc()
+        self.sync_hearts()
+
+        alpha = self.sim.alpha
+        self.pin.update(alpha)
+        start = perf_counter()
+        self.disc.update(alpha)
+        profiler.add(ROTATE, perf_counter() - start)
+        self.score_board.update(f"{self.sim.score}")
+        self.hearts.update()
+        self.bullets.update()
+        self.pause_button.update()
+        return False
+
+
+class GameOverView(View):
+    """
+    游戏结束的对话框，显示在停止更新的游戏界面上方. 与其他界面一样随主循环逐帧更新，不阻塞事件处理与绘制.
+    点击 RETRY 或按回车键重新开始，点击 MENU 或按 Esc 键返回菜单.
+    """
+
+    layers = ("panel", "title", "result", "retry_button", "menu_button")
+
+    def __init__(self, screen: Surface, game: GameView):
+        """
+        Args:
+            screen (Surface): 窗口.
+            game (GameView): 已结束的游戏界面，作为对话框的背景继续绘制.
+        """
+        super().__init__(screen)
+        self.game = game
+        pos, size = Grid.dialog_pos, Grid.dialog_size
+        self.panel = Label(
+            screen, pos, size, bg=Color.black, r=16, bw=2, bc=Color.aqua, br=16
+        )
+        self.title = Label(screen, pos + Vector2(0, 25), (size[0], 40), "GAME OVER")
+        self.title.set_style(font="TabletGothicBold.OTF", fs=32, fc=Color.aqua)
+        self.result = Label(
+            screen,
+            pos + Vector2(0, 80),
+            (size[0], 30),
+            f"SCORE  {game.score}      LEVEL  {game.level}",
+            fs=18,
+        )
+
+        button_size = Grid.dialog_button_size
+        gap = (size[0] - 2 * button_size[0]) / 3
+        button_y = size[1] - button_size[1] - 30
+        self.retry_button = Button(
+            screen, pos + Vector2(gap, button_y), button_size, "RETRY", fs=24
+        )
+        self.menu_button = Button(
+            screen,
+            pos + Vector2(2 * gap + button_size[0], button_y),
+            button_size,
+            "MENU",
+            fs=24,
+            bg=Color.lime_blue,
+            hb=Color.blue,
+        )
+
+    def get_widgets(self) -> list[Union[Sprite, Group]]:
+        return self.game.get_widgets() + super().get_widgets()
+
+    def on_keydown(self, event: Event):
+        # 空格键用于发射飞镖，游戏结束时可能仍在连按，不用于重新开始
+        if event.key in (pg.K_RETURN, pg.K_KP_ENTER):
+            self.retry_button.press_sound.play()
+            self.retry_button.callback()
+        elif event.key == pg.K_ESCAPE:
+            self.menu_button.press_sound.play()
+            self.menu_button.callback()
+
+    def on_mousedown(self, event: Event):
+        if event.button == pg.BUTTON_LEFT:
+            if not self.retry_button.check_click(event):
+                self.menu_button.check_click(event)
+
+    def update(self, past_sec: float):
+        self.retry_button.update()
+        self.menu_button.update()
@@ -1,22 +1,17 @@
-import os
-from random import randint, random, sample
+from abc import ABC, abstractmethod
+from math import ceil, hypot
 
+import numpy as np
 import pygame as pg
-import pygame.font as pf
-from PIL import Image, ImageDraw
 
-from config import DROP, SHOOT, STILL, Color, Grid
+import raster
+from assets import get_font, get_image, sound_bank
+from cache import back_cache
+from config import Color, Grid, Perf
+from profiler import PHASES, FrameProfiler
+from sim import Body, DiscState, PieState, PinState
 from typing_lib import *
-from utils import (
-    draw_border,
-    get_image,
-    get_path,
-    is_or_in,
-    min_diff,
-    pil2pg,
-    rand_num,
-    rotate,
-)
+from utils import draw_border, is_or_in, rotate
 
 __all__ = [
     "Button",
@@ -30,6 +25,7 @@ __all__ = [
     "Disc",
     "Bullet",
     "OrderedGruop",
+    "ProfilerOverlay",
 ]
 
 
@@ -73,7 +69,7 @@ class _Content:
         img_size: Vect2,
         img_align: str,
     ):
-        self.font = pf.Font(os.path.join("font", font), fontsize)
+        self.font = get_font(font, fontsize)
         self.fontcolor = fontcolor
         self.text_align = text_align
         self.img_size = img_size
@@ -82,18 +78,20 @@ class _Content:
         self.load_image()
 
     def update(self, text: Union[str, None], img_name: Union[str, None]):
-        if type(text) is str:
+        if type(text) is str and text != self.text:  # 文字未变化时沿用已渲染的图片
             self.text = text
             self.render_text()
         if type(img_name) is str:
             self.img_name = img_name
             self.load_image()
 
-    def draw(self):
+    def commands(self) -> list[Blit]:
+        commands = []
         if self.image:
-            self.screen.blit(self.image, self.image_rect)
+            commands.append((self.image, self.image_rect))
         if self.text_image:
-            self.screen.blit(self.text_image, self.text_rect)
+            commands.append((self.text_image, self.text_rect))
+        return commands
 
 
 class _Style(dict):
@@ -133,6 +131,68 @@ class _Style(dict):
         return self.get_values(_Style.content_style_key)
 
 
+def rounded_back(size: Vect2, radius: float, color: str) -> Surface:
+    """
+    获取 Button、Label 的圆角矩形背景，四周各留出 1 像素.
+    相同 (大小, 圆角半径, 颜色) 的背景只绘制一次，所有实例共享，统计见 cache.back_cache.stats().
+
+    Args:
+        size (Vect2): 背景大小.
+        radius (float): 圆角半径.
+        color (str): 背景颜色.
+
+    Returns:
+        Surface: 共享的背景图片，不应修改.
+    """
+    size = (int(size[0]), int(size[1]))
+    box = (1, 1, size[0] - 1, size[1] - 1)
+    return back_cache.get(
+        (size, float(radius), color),
+        lambda: raster.fill(raster.rounded_rect(size, box, radius), color),
+    )
+
+
+def rounded_border(
+    size: Vect2, color: str, width: int, radius: int
+) -> Union[None, Surface]:
+    """
+    获取 Button、Label 的边框图片，相同的 (大小, 颜色, 宽度, 圆角半径) 只绘制一次.
+
+    Args:
+        size (Vect2): 边框外沿的大小.
+        color (str): 边框颜色.
+        width (int): 边框宽度.
+        radius (int): 边框圆角半径.
+
+    Returns:
+        Union[None, Surface]: 共享的边框图片，宽度不大于 0 时为 None.
+    """
+    if width <= 0:
+        return None
+    size = (int(size[0]), int(size[1]))
+
+    def render() -> Surface:
+        image = pg.Surface(size, pg.SRCALPHA)
+        draw_border(image, image.get_rect(), color, width, radius)
+        return image
+
+    return back_cache.get(("border", size, color, width, radius), render)
+
+
+def solid_block(size: Vect2, color: str) -> Surface:
+    """
+    获取纯色的矩形图片，用于剩余飞镖的显示，相同的 (大小, 颜色) 只生成一次.
+    """
+    size = (int(size[0]), int(size[1]))
+
+    def render() -> Surface:
+        image = pg.Surface(size)
+        image.fill(color)
+        return image
+
+    return back_cache.get(("block", size, color), render)
+
+
 class Button(Sprite):
     default_style = {
         ("radius", "r"): None,
@@ -168,8 +228,7 @@ class Button(Sprite):
         self.set_style(**kwargs)
         self.hover = False
         self.callback = callback
-        self.press_sound = pg.mixer.Sound(os.path.join("sounds", "button_pressed.wav"))
-        self.press_sound.set_volume(0.4)
+        self.press_sound = sound_bank.get("button_pressed.wav")
 
     def set_style(self, **kwargs):
         self.style.update_values(**kwargs)
@@ -188,25 +247,21 @@ class Button(Sprite):
             self.set_hover_back(radius, hover_back)
         else:
             self.hover_back = None
+        style = self.style
+        self.border = rounded_border(
+            self.rect.size, style["bc"], style["bw"], style["br"]
+        )
 
     def set_callback(self, callback: Callable):
         self.callback = callback
 
     def set_back(self, radius: float, color: str):
-        back_size = (int(self.size[0] * 10), int(self.size[1] * 10))
-        back_image = Image.new("RGBA", back_size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(back_image)
-        xy = (10, 10, back_size[0] - 10, back_size[1] - 10)
-        draw.rounded_rectangle(xy, radius * 10, color)
-        self.back_image = pil2pg(back_image, self.size)
+        self.back_image = rounded_back(self.size, radius, color)
+        self.back_rect = self.back_image.get_rect(topleft=self.rect.topleft)
 
     def set_hover_back(self, radius: float, hover_color: str):
-        back_size = (int(self.size[0] * 10), int(self.size[1] * 10))
-        back_image = Image.new("RGBA", back_size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(back_image)
-        xy = (10, 10, back_size[0] - 10, back_size[1] - 10)
-        draw.rounded_rectangle(xy, radius * 10, hover_color)
-        self.hover_back = pil2pg(back_image, self.size)
+        self.hover_back = rounded_back(self.size, radius, hover_color)
+        self.back_rect = self.hover_back.get_rect(topleft=self.rect.topleft)
 
     def check_mouse_pos(self, mouse_pos) -> bool:
         return True if self.rect.collidepoint(mouse_pos) else False
@@ -227,14 +282,21 @@ class Button(Sprite):
         else:
             self.hover = False
 
-    def draw(self):
+    def get_back(self) -> Union[None, Surface]:
         if self.hover_back and self.hover:
-            self.screen.blit(self.hover_back, self.rect)
-        elif self.back_image:
-            self.screen.blit(self.back_image, self.rect)
-        self.content.draw()
-        style = self.style
-        draw_border(self.screen, self.rect, style["bc"], style["bw"], style["br"])
+            return self.hover_back
+        return self.back_image
+
+    def commands(self) -> list[Blit]:
+        """
+        返回按顺序绘制背景、图片、文字与边框的命令.
+        """
+        back = self.get_back()
+        commands = [(back, self.back_rect)] if back else []
+        commands.extend(self.content.commands())
+        if self.border:
+            commands.append((self.border, self.rect))
+        return commands
 
 
 class Label(Sprite):
@@ -278,45 +340,69 @@ class Label(Sprite):
             self.set_back(self.style["radius"], background)
         else:
             self.back_image = None
+        style = self.style
+        self.border = rounded_border(
+            self.rect.size, style["bc"], style["bw"], style["br"]
+        )
 
     def set_back(self, radius: float, color: str):
-        back_size = (int(self.size[0] * 10), int(self.size[1] * 10))
-        back_image = Image.new("RGBA", back_size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(back_image)
-        xy = (10, 10, back_size[0] - 10, back_size[1] - 10)
-        draw.rounded_rectangle(xy, radius * 10, color)
-        self.back_image = pil2pg(back_image, self.size)
+        self.back_image = rounded_back(self.size, radius, color)
+        self.back_rect = self.back_image.get_rect(topleft=self.rect.topleft)
 
     def update(self, text: Union[str, None] = None, img_name: Union[str, None] = None):
         self.content.update(text, img_name)
 
-    def draw(self):
-        if self.back_image:
-            self.screen.blit(self.back_image, self.rect)
-        self.content.draw()
-        style = self.style
-        draw_border(self.screen, self.rect, style["bc"], style["bw"], style["br"])
+    def get_back(self) -> Union[None, Surface]:
+        return self.back_image
+
+    def commands(self) -> list[Blit]:
+        commands = [(self.back_image, self.back_rect)] if self.back_image else []
+        commands.extend(self.content.commands())
+        if self.border:
+            commands.append((self.border, self.rect))
+        return commands
 
 
 class Pin(Sprite):
-    def __init__(self, screen: Surface, color: str):
+    """
+    飞镖. 同一颜色的飞镖共享同一张贴图，贴图在第一次创建飞镖时按 Color.pin_colors 一次性生成.
+    """
+
+    textures: dict[str, Surface] = {}  # 各颜色飞镖共享的贴图
+    source_size = (700, 2000)  # img/pin.png 的原始大小，头部的位置以原图的像素为单位
+    relative_pos = (Grid.pin_size[0] / 2, Grid.prick_depth - Grid.radius)
+
+    def __init__(self, screen: Surface, state: PinState):
+        """
+        Args:
+            screen (Surface): 窗口.
+            state (PinState): 飞镖的状态，位置与角度均取自该状态.
+        """
         super().__init__()
         self.screen = screen
-        self.color = color
-        self.set_image()
-        self.rect: Rect = self.image.get_rect(
-            centerx=Grid.window_size[0] // 2, bottom=Grid.window_size[1] - 20
-        )
-        self.mode = STILL
-        self.angle: float = 0
-        self.relative_pos = Vector2(
-            Grid.pin_size[0] / 2, Grid.prick_depth - Grid.radius
-        )
-
-    def set_image(self):
-        image = Image.open(get_path("img", "pin.png"))
-        draw = ImageDraw.Draw(image)
-        imgsize = image.size
+        self.state = state
+        self.color = state.color
+        self.image: Surface = Pin.get_texture(state.color)
+        self.rect: Rect = self.image.get_rect(topleft=(state.left, state.top))
+        self.angle: float = state.angle
+
+    @property
+    def origin_image(self) -> Surface:
+        return Pin.textures[self.color]
+
+    @staticmethod
+    def render_texture(base: Surface, color: str) -> Surface:
+        """
+        在飞镖图片上绘制指定颜色的圆形头部.
+
+        Args:
+            base (Surface): 缩放到 Grid.pin_size 的飞镖原图.
+            color (str): 头部颜色.
+
+        Returns:
+            Surface: 飞镖贴图.
+        """
+        imgsize = Pin.source_size
         size = (450, 1800)
         w = Grid.marginal_width * imgsize[0] / Grid.pin_size[0]
         xy = (
@@ -325,181 +411,354 @@ class Pin(Sprite):
             imgsize[0] - 125 - w,
             imgsize[1] - 100 - w,
         )
-        draw.ellipse(xy, fill=self.color)
-        self.origin_image = pil2pg(image, Grid.pin_size)
-        self.image: Surface = self.origin_image.copy()
-
-    def update(self, delta: float, setting=None):
-        if setting is not None:
-            if self.mode == SHOOT:
-                self.rect.centery -= round(setting.shoot_speed * delta)
-            elif self.mode == DROP:
-                self.rect.centery += round(setting.drop_speed * delta)
-                self.rect.centerx += round(setting.drop_speed * delta) // 2
+        sx, sy = Grid.pin_size[0] / imgsize[0], Grid.pin_size[1] / imgsize[1]
+        box = (xy[0] * sx, xy[1] * sy, xy[2] * sx, xy[3] * sy)
+        image = base.copy()
+        raster.paint(image, raster.ellipse(Grid.pin_size, box), color)
+        return image
+
+    @classmethod
+    def get_texture(cls, color: str) -> Surface:
+        """
+        获取指定颜色的飞镖贴图，第一次调用时生成 Color.pin_colors 中所有颜色的贴图.
+
+        Args:
+            color (str): 飞镖颜色.
+
+        Returns:
+            Surface: 共享的飞镖贴图，不应修改.
+        """
+        if color not in cls.textures:
+            base = get_image("pin.png", Grid.pin_size)
+            colors = [] if cls.textures else list(Color.pin_colors)
+            if color not in colors:
+                colors.append(color)
+            for c in colors:
+                cls.textures[c] = cls.render_texture(base, c)
+        return cls.textures[color]
+
+    def update(self, alpha: float = 1):
+        """
+        Args:
+            alpha (float, optional): 在上一步与当前位置之间插值的比例. 默认为 1，即当前位置.
+        """
+        state = self.state
+        left, top = state.prev
+        self.rect.topleft = (
+            round(left + (state.left - left) * alpha),
+            round(top + (state.top - top) * alpha),
+        )
 
-    def draw(self):
-        self.screen.blit(self.image, self.rect)
+    def commands(self) -> list[Blit]:
+        return [(self.image, self.rect)]
 
 
 class Pie(Sprite):
+    """
+    圆盘上的扇形. 圆盘最多分为 4 个扇形，第 i 个扇形从 i * 360 / n 度开始，
+    所有 (颜色, 扇形数, 序号) 组合的贴图在游戏启动时由 Pie.load_textures 一次性生成，创建 level 时只需查表.
+
+    旋转时同一布局的各扇形共用第 0 个扇形的贴图，再多旋转 start_degree，同一颜色的扇形在旋转缓存中只占一份;
+    完整的圆不需要旋转.
+    """
+
+    textures: dict[tuple[str, int, int], Surface] = {}  # (颜色, 扇形数, 序号) -> 贴图
+    max_sectors = 4
+
     def __init__(
         self, screen: Surface, color: str, start_degree: float, degree_range: float
     ):
         super().__init__()
         self.screen = screen
         self.color = color
-        self.set_image(start_degree, degree_range)
+        self.start_degree = start_degree
+        self.degree_range = degree_range
         self.angle: float = 0
         self.relative_pos = (Grid.radius, Grid.radius)
+        self.set_image(start_degree, degree_range)
 
-    def set_image(self, start_degree: float, degree_range: float):
-        size = (2200, 2200)
-        image = Image.new("RGBA", size, (255, 255, 255, 0))
-        draw = ImageDraw.Draw(image)
-        xy = ((100.0, 100.0), (size[0] - 100, size[1] - 100))
-        end = start_degree + degree_range
-        draw.pieslice(xy, start_degree, end, fill=self.color, outline=self.color)
-        self.origin_image = pil2pg(image, (2 * Grid.radius, 2 * Grid.radius))
-        self.image: Surface = self.origin_image.copy()
-        self.rect: Rect = self.image.get_rect(center=Grid.center)
+    @staticmethod
+    def render_sector(start_degree: float, degree_range: float) -> np.ndarray:
+        """
+        计算扇形的覆盖率.
+
+        Args:
+            start_degree (float): 起始角度.
+            degree_range (float): 扇形角度.
+
+        Returns:
+            np.ndarray: 大小为圆盘直径的覆盖率，即扇形的透明度.
+        """
+        diameter = 2 * Grid.radius
+        center = (Grid.radius, Grid.radius)
+        return raster.sector(
+            (diameter, diameter), center, Grid.pie_radius, start_degree, degree_range
+        )
 
-    def draw(self):
-        self.screen.blit(self.image, self.rect)
+    @staticmethod
+    def tint(alpha: np.ndarray, color: str) -> Surface:
+        """
+        将透明度着色为指定颜色的贴图.
+
+        Args:
+            alpha (np.ndarray): 透明度.
+            color (str): 颜色.
+
+        Returns:
+            Surface: 着色后的贴图.
+        """
+        return raster.fill(alpha, color)
+
+    @classmethod
+    def load_textures(cls):
+        """
+        生成所有扇形布局在 Color.pin_colors 各颜色下的贴图. 每种布局只绘制一次，再分别着色.
+        """
+        for n in range(1, cls.max_sectors + 1):
+            for i in range(n):
+                alpha = cls.render_sector(i * 360 / n, 360 / n)
+                for color in Color.pin_colors:
+                    cls.textures[(color, n, i)] = cls.tint(alpha, color)
+
+    @classmethod
+    def get_texture(
+        cls, color: str, start_degree: float, degree_range: float
+    ) -> Surface:
+        """
+        查表获取扇形贴图，不在表中的扇形(如非标准的颜色或角度)会即时绘制并加入表中.
+
+        Args:
+            color (str): 颜色.
+            start_degree (float): 起始角度.
+            degree_range (float): 扇形角度.
+
+        Returns:
+            Surface: 共享的扇形贴图，不应修改.
+        """
+        if not cls.textures:
+            cls.load_textures()
+        n = round(360 / degree_range)
+        i = round(start_degree / degree_range)
+        if n * degree_range != 360 or i * degree_range != start_degree:
+            return cls.tint(cls.render_sector(start_degree, degree_range), color)
+        key = (color, n, i)
+        if key not in cls.textures:
+            cls.textures[key] = cls.tint(
+                cls.render_sector(start_degree, degree_range), color
+            )
+        return cls.textures[key]
+
+    def set_image(self, start_degree: float, degree_range: float):
+        n = round(360 / degree_range)
+        self.full = n == 1 and degree_range == 360
+        if n * degree_range == 360 and start_degree % degree_range == 0:
+            self.origin_image = Pie.get_texture(self.color, 0, degree_range)
+            self.texture_angle = start_degree  # 贴图相对于扇形实际位置的角度
+        else:
+            self.origin_image = Pie.get_texture(self.color, start_degree, degree_range)
+            self.texture_angle = 0
+        self.image: Surface
+        self.rect: Rect
+        self.image, self.rect = self.place(self.angle, Grid.center)
+
+    def place(self, angle: float, pos: Vect2) -> tuple[Surface, Rect]:
+        """
+        旋转扇形.
+
+        Args:
+            angle (float): 扇形的旋转角度.
+            pos (Vect2): 圆心的位置.
+
+        Returns:
+            Surface: 旋转后的贴图.
+            Rect: 旋转后的贴图的矩形区域.
+        """
+        if self.full:
+            return self.origin_image, self.origin_image.get_rect(center=pos)
+        return rotate(
+            self.origin_image, angle + self.texture_angle, pos, self.relative_pos
+        )
 
 
 class Balk(Sprite):
+    relative_pos = (Grid.balk_size[0] // 2, -Grid.balk_radius)
+
     def __init__(self, screen: Surface, disc: Group, angle: float):
         super().__init__(disc)
         self.screen = screen
-        self.origin_image = get_image("balk.png", Grid.balk_size)
+        self.origin_image = Balk.texture()
         self.image: Surface = self.origin_image.copy()
         self.rect: Rect = self.image.get_rect()
         self.angle = angle
-        self.relative_pos = (Grid.balk_size[0] // 2, -Grid.balk_radius)
 
-    def draw(self):
-        self.screen.blit(self.image, self.rect)
+    @staticmethod
+    def texture() -> Surface:
+        return get_image("balk.png", Grid.balk_size)
+
+
+class Bonus(Sprite, ABC):
+    """
+    道具，被击中后的效果由 sim.Simulation 处理. 子类提供 relative_pos 与 texture.
+    """
 
+    relative_pos: Vect2
 
-class Bonus(Sprite):
-    def __init__(self, screen: Surface, disc: Group, angle: float, relative_pos: Vect2):
+    def __init__(self, screen: Surface, disc: Group, angle: float):
         super().__init__(disc)
         self.screen = screen
         self.angle = angle
-        self.relative_pos = relative_pos
-
-    def set_image(self, image: Surface):
-        self.origin_image = image
+        self.origin_image = self.texture()
         self.image: Surface = self.origin_image.copy()
         self.rect: Rect = self.image.get_rect()
 
-    def set_bonusfunc(self, bonusfunc: Callable):
-        self.bonusfunc = bonusfunc
-
-    def on_hit(self, *args, **kwargs):
-        self.kill()
-        self.bonusfunc(*args, **kwargs)
-
-    def draw(self):
-        self.screen.blit(self.image, self.rect)
+    @staticmethod
+    @abstractmethod
+    def texture() -> Surface:
+        """
+        Returns:
+            Surface: 共享的道具贴图，不应修改.
+        """
 
 
 class Heart(Bonus):
-    def __init__(self, screen: Surface, disc: Group, angle: float):
-        relative_pos = (Grid.heart_bonus_size[0] // 2, -Grid.heart_bonus_radius)
-        super().__init__(screen, disc, angle, relative_pos)
-        image = get_image("heart.png", Grid.heart_bonus_size)
-        self.set_image(pg.transform.rotozoom(image, 180, 1))
+    relative_pos = (Grid.heart_bonus_size[0] // 2, -Grid.heart_bonus_radius)
+
+    @staticmethod
+    def texture() -> Surface:
+        return get_image("heart.png", Grid.heart_bonus_size, 180)
 
 
 class Star(Bonus):
-    def __init__(self, screen: Surface, disc: Group, angle: float):
-        relative_pos = (20, -Grid.radius)
-        super().__init__(screen, disc, angle, relative_pos)
-        image = get_image("star.png", (40, 40))
-        self.set_image(image)
+    relative_pos = (20, -Grid.radius)
+
+    @staticmethod
+    def texture() -> Surface:
+        return get_image("star.png", (40, 40))
 
 
 class Disc(Group):
-    def __init__(self, screen: Surface, colors: list, level: int):
+    """
+    圆盘，根据 sim.DiscState 绘制. 圆盘上的物体与 sprite 一一对应，sprite 的顺序与 DiscState.items 一致.
+
+    绘制时扇形在最上层，按加入的顺序排列; 飞镖、障碍物与道具在其下层，后加入的先绘制.
+    两层在加入、移除 sprite 时维护，draw_order 为合并后的绘制顺序，逐帧遍历时不需要重新排序.
+    """
+
+    sprite_types = {"balk": Balk, "heart": Heart, "star": Star}
+
+    def __init__(self, screen: Surface, state: DiscState):
         super().__init__()
         self.screen = screen
-        self.diff_colors = set(colors)
-        self.level = level
-        num_of_balks = self.get_num_of_balks(colors)
-        self.add(*self.get_pies_balks(num_of_balks))
-
-        num_of_bonus = randint(0, 3)
-        self.bonuses = []
-        for _ in range(num_of_bonus):
-            self.add_bonus()
-
-    def add_bonus(self):
-        pos = randint(0, 360)
-        while min_diff(self.prop_pos + [pos]) < 15:
-            pos = randint(0, 360)
-        self.prop_pos.append(pos)
-        x = random()
-        if 0 <= x < 1 / 4:
-            self.bonuses.append(Heart(self.screen, self, pos))
+        self.state = state
+        self.angle: float = 0  # 圆盘整体的旋转角度
+        self.composite: Union[Surface, None] = None
+        self.composite_dirty = True
+        self.bodies: dict[Body, Sprite] = {}
+        self.pies: list[Pie] = []
+        self.overlays: list[Union[Pin, Balk, Bonus]] = []  # 后加入的在前
+        self.draw_order: list[Union[Pin, Pie, Balk, Bonus]] = []
+        self.sync()
+
+    def sync(self, alpha: float = 1):
+        """
+        为圆盘上新加入的物体创建 sprite，移除已不在圆盘上的物体的 sprite，并同步角度.
+
+        Args:
+            alpha (float, optional): 在上一步与当前角度之间插值的比例. 默认为 1，即当前角度.
+        """
+        items = self.state.items
+        if len(items) != len(self.bodies) or any(i not in self.bodies for i in items):
+            present = set(items)
+            for body in [b for b in self.bodies if b not in present]:
+                self.bodies.pop(body).kill()
+            for body in items:
+                if body not in self.bodies:
+                    self.bodies[body] = self.create_sprite(body)
+        turn = (self.state.angle - self.state.prev_angle + 180) % 360 - 180
+        offset = turn * (alpha - 1)  # 插值位置相对于当前状态的角度
+        self.angle = (self.state.angle + offset) % 360
+        for body, sprite in self.bodies.items():
+            sprite.angle = (body.angle + offset) % 360
+
+    def create_sprite(self, body: Body) -> Sprite:
+        if type(body) is PinState:
+            sprite = Pin(self.screen, body)
+            self.add(sprite)
+        elif type(body) is PieState:
+            sprite = Pie(self.screen, body.color, body.start_degree, body.degree_range)
+            self.add(sprite)
         else:
-            self.bonuses.append(Star(self.screen, self, pos))
-
-    def get_num_of_balks(self, colors: list[str]):
-        n = len(self.diff_colors)
-        num_of_bullets = [colors.count(color) for color in self.diff_colors]
-        upper_of_balks = min(8, self.level)
-        total_num_of_balks = randint(max(0, upper_of_balks - 4), upper_of_balks)
-        num_of_balks = rand_num(n, total_num_of_balks + n, False)
-        num_of_balks = [n - 1 for n in num_of_balks]
-        while max(n1 + n2 for n1, n2 in zip(num_of_bullets, num_of_balks)) > 24 / n:
-            num_of_balks = rand_num(n, total_num_of_balks + n, False)
-            num_of_balks = [n - 1 for n in num_of_balks]
-        return num_of_balks
-
-    def get_pies_balks(self, balks: list[int]) -> list[Union[Pie, Balk]]:
-        sector_degree = 360 / len(self.diff_colors)
-        pies_balks = []
-        self.prop_pos = []
-        for i, color in enumerate(self.diff_colors):
-            start_degree = i * sector_degree
-            pies_balks.append(Pie(self.screen, color, start_degree, sector_degree))
-            end_degree = start_degree + sector_degree
-            sample_seq = range(int(start_degree) + 5, int(end_degree) - 5)
-            pos = sample(sample_seq, balks[i])
-            if balks[i] > 1:
-                while min_diff(pos) < 15:
-                    pos = sample(sample_seq, balks[i])
-            for p in pos:
-                pies_balks.append(Balk(self.screen, self, p))
-                self.prop_pos.append(p)
-        return pies_balks
-
-    def sorted_sprites(self) -> list[Union[Pin, Pie, Bonus]]:
-        sorted_sprites = []
-        for spr in self.sprites():
-            if type(spr) is Pie:
-                sorted_sprites.append(spr)
-            else:
-                sorted_sprites.insert(0, spr)
-        return sorted_sprites
+            sprite = Disc.sprite_types[body.kind](self.screen, self, body.angle)
+        return sprite
 
-    def __iter__(self) -> Iterator[Union[Pin, Pie, Bonus]]:
-        return iter(self.sorted_sprites())
+    def __iter__(self) -> Iterator[Union[Pin, Pie, Balk, Bonus]]:
+        return iter(self.draw_order)
 
-    def update(self, past_sec: float, setting):
-        theta = setting.rotation_speed * past_sec
+    def add_internal(self, sprite: Sprite, layer=None):
+        super().add_internal(sprite, layer)
+        if type(sprite) is Pie:
+            self.pies.append(sprite)
+        else:
+            self.overlays.insert(0, sprite)
+        self.draw_order = self.overlays + self.pies
+        self.composite_dirty = True
+
+    def remove_internal(self, sprite: Sprite):
+        super().remove_internal(sprite)
+        (self.pies if type(sprite) is Pie else self.overlays).remove(sprite)
+        self.draw_order = self.overlays + self.pies
+        self.composite_dirty = True
+
+    def bake(self):
+        """
+        将圆盘上的所有 sprite 按当前的相对角度合成到一张图片上，合成图片的中心即圆盘圆心.
+        只在圆盘内容改变(加入飞镖、道具被击中)后调用.
+        """
+        radius = 0
+        for sprite in self:
+            w, h = sprite.origin_image.get_size()
+            rx, ry = sprite.relative_pos
+            for x, y in ((-rx, -ry), (w - rx, -ry), (-rx, h - ry), (w - rx, h - ry)):
+                radius = max(radius, hypot(x, y))
+        radius = ceil(radius) + 1
+        self.composite = pg.Surface((2 * radius, 2 * radius), pg.SRCALPHA)
+        self.composite_radius = radius
         for sprite in self:
-            sprite.angle = (sprite.angle + theta) % 360
-            sprite.image, sprite.rect = rotate(
-                sprite.origin_image, sprite.angle, Grid.center, sprite.relative_pos
+            angle, pos = sprite.angle - self.angle, (radius, radius)
+            if type(sprite) is Pie:
+                image, rect = sprite.place(angle, pos)
+            else:
+                image, rect = rotate(
+                    sprite.origin_image, angle, pos, sprite.relative_pos
+                )
+            self.composite.blit(image, rect)
+        self.composite_dirty = False
+
+    def update(self, alpha: float = 1):
+        self.sync(alpha)
+        if Perf.composite_disc:
+            if self.composite_dirty:
+                self.bake()
+            radius = self.composite_radius
+            self.image, self.rect = rotate(
+                self.composite, self.angle, Grid.center, (radius, radius)
             )
-            if hasattr(sprite, "update"):
-                sprite.update(theta)
-
-    def draw(self):
+            return
         for sprite in self:
-            sprite.draw()
+            if type(sprite) is Pie:
+                sprite.image, sprite.rect = sprite.place(sprite.angle, Grid.center)
+            else:
+                sprite.image, sprite.rect = rotate(
+                    sprite.origin_image, sprite.angle, Grid.center, sprite.relative_pos
+                )
+
+    def commands(self) -> list[Blit]:
+        """
+        返回圆盘的绘制命令. 旋转中的圆盘是游戏中每帧变化的主要区域.
+        """
+        if Perf.composite_disc:
+            return [] if self.composite is None else [(self.image, self.rect)]
+        return [(sprite.image, sprite.rect) for sprite in self.draw_order]
 
 
 class Bullet(Sprite):
@@ -508,9 +767,10 @@ class Bullet(Sprite):
         self.screen = screen
         self.color = color
         self.rect: Rect = Rect(pos[0], pos[1], Grid.bullet_size[0], Grid.bullet_size[1])
+        self.image = solid_block(self.rect.size, color)
 
-    def draw(self):
-        pg.draw.rect(self.screen, self.color, self.rect)
+    def commands(self) -> list[Blit]:
+        return [(self.image, self.rect)]
 
 
 class OrderedGruop(Group):
@@ -529,6 +789,82 @@ class OrderedGruop(Group):
     def pop_widget(self):
         self.remove(self.widget_list.pop())
 
-    def draw(self):
-        for sprite in self:
-            sprite.draw()
+    def commands(self) -> list[Blit]:
+        return [command for sprite in self for command in sprite.commands()]
+
+
+class ProfilerOverlay(Sprite):
+    """
+    显示各阶段耗时的 p50 / p99 及帧间隔直方图. 统计每隔若干帧重新计算一次，不显示时不产生任何开销.
+    """
+
+    line_height = 15
+    hist_height = 50
+
+    def __init__(
+        self,
+        screen: Surface,
+        profiler: FrameProfiler,
+        pos: Vect2 = (5, 5),
+        interval: int = 20,
+    ):
+        """
+        Args:
+            screen (Surface): 窗口.
+            profiler (FrameProfiler): 要显示的计时数据.
+            pos (Vect2, optional): 左上角位置. 默认为 (5, 5).
+            interval (int, optional): 刷新间隔，帧. 默认为 20.
+        """
+        super().__init__()
+        self.screen = screen
+        self.profiler = profiler
+        self.interval = interval
+        self.font = get_font("ARIALREGULAR.TTF", 12)
+        rows = len(PHASES) + 4  # 表头、各阶段、work、frame、直方图范围
+        size = (210, rows * self.line_height + self.hist_height + 10)
+        self.rect: Rect = Rect(pos[0], pos[1], size[0], size[1])
+        self.image = pg.Surface(size, pg.SRCALPHA)
+        self.frame = 0
+        self.refresh()
+
+    def update(self):
+        self.frame += 1
+        if self.frame % self.interval == 0:
+            self.refresh()
+
+    def refresh(self):
+        """
+        重新计算统计并绘制到 image 上.
+        """
+        image = pg.Surface(self.rect.size, pg.SRCALPHA)
+        image.fill((0, 0, 0, 160))
+        summary = self.profiler.summary()
+        lines = [("phase", "p50 ms", "p99 ms")]
+        for name, (p50, p99) in summary.items():
+            lines.append((name, f"{p50:.2f}", f"{p99:.2f}"))
+        y = 5
+        for name, p50, p99 in lines:
+            for text, x in ((name, 5), (p50, 90), (p99, 150)):
+                image.blit(self.font.render(text, True, Color.white), (x, y))
+            y += self.line_height
+
+        if summary:
+            counts, edges = self.profiler.histogram()
+            bar_width = (self.rect.w - 10) / len(counts)
+            scale = self.hist_height / max(counts.max(), 1)
+            bottom = self.rect.h - 5
+            for i, count in enumerate(counts):
+                if not count:
+                    continue
+                height = ceil(count * scale)
+                bar = Rect(
+                    5 + i * bar_width, bottom - height, ceil(bar_width) - 1, height
+                )
+                pg.draw.rect(image, Color.aqua, bar)
+            label = f"frame time: 0 ~ {edges[-1]:.0f} ms"
+            text = self.font.render(label, True, Color.white)
+            image.blit(text, (5, y))
+        self.image = image
+
+    def commands(self) -> list[Blit]:
+        return [(self.image, self.rect)]